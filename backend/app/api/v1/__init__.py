@@ -1,7 +1,8 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import outlines, files, presentation
+from app.api.v1.endpoints import outlines, files, presentation, icons
 
 api_router = APIRouter()
 api_router.include_router(outlines.router, prefix="/outlines", tags=["outlines"])
 api_router.include_router(files.router, prefix="/files", tags=["files"])
 api_router.include_router(presentation.router, prefix="/presentation", tags=["presentation"])
+api_router.include_router(icons.router, prefix="/icons", tags=["icons"])
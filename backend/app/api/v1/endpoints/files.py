@@ -1,10 +1,14 @@
-from http.client import HTTPException
 import os
 from typing import Annotated, List, Optional
-from fastapi import APIRouter, Body, File, UploadFile
+from fastapi import APIRouter, Body, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse
 
+from enums.image_variant import ImageVariant
+from services.image_asset_store import IMAGE_ASSET_STORE
+from services.storage_lifecycle_service import STORAGE_LIFECYCLE_SERVICE
 from services.temp_file_service import TEMP_FILE_SERVICE
 from models.decomposed_file_info import DecomposedFileInfo
+from models.storage_stats import StorageStats
 from services.documents_loader import DocumentsLoader
 import uuid
 
@@ -82,3 +86,24 @@ async def update_files(
 
     return {"message": "File updated successfully"}
 
+
+
+@router.get("/assets/{content_hash}/{variant}")
+async def get_image_asset(content_hash: str, variant: ImageVariant):
+    """Serves a precomputed variant of a stored image asset"""
+    if not IMAGE_ASSET_STORE.is_content_hash(content_hash):
+        raise HTTPException(status_code=400, detail="Invalid content hash")
+
+    variant_path = IMAGE_ASSET_STORE.get_variant_path(content_hash, variant)
+    if not variant_path or not os.path.exists(variant_path):
+        raise HTTPException(status_code=404, detail="Asset not found")
+
+    return FileResponse(
+        variant_path, headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+
+@router.get("/storage", response_model=StorageStats)
+async def get_storage_stats():
+    """临时文件、导出文件和导出缓存的占用与回收统计"""
+    return STORAGE_LIFECYCLE_SERVICE.get_stats()
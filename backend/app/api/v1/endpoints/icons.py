@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+
+from models.icon_search_stats import IconSearchStats
+from models.icon_service_status import IconServiceStatus
+from services.icon_finder_service import ICON_FINDER_SERVICE
+
+router = APIRouter()
+
+
+@router.get("/stats", response_model=IconSearchStats)
+async def get_icon_search_stats():
+    """图标检索各级命中率统计"""
+    return ICON_FINDER_SERVICE.get_stats()
+
+
+@router.get("/status", response_model=IconServiceStatus)
+async def get_icon_service_status():
+    """图标服务预热进度，ready 为 true 时语义检索可用"""
+    return ICON_FINDER_SERVICE.get_status()
@@ -78,7 +78,7 @@ async def run_agent(request: Request) -> Response:
     id = request_data.get('messages', [{}])[0].get('id')
     uuid_id = uuid.UUID(id)
     
-    presentation = presentation_cache.get(uuid_id)
+    presentation = await presentation_cache.get(uuid_id)
     
     instructions = presentation.content
     n_slides = presentation.n_slides
@@ -4,10 +4,15 @@ import math
 import os
 import random
 from typing import Annotated, List, Literal, Optional
-from fastapi import APIRouter, Body, Depends, HTTPException
+from urllib.parse import quote
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from models.pptx_models import PptxPresentationModel
+from models.batch_export import BatchExportItemModel, BatchExportResultModel
+from models.export_job import ExportJobModel
+from models.pptx_export_options import PptxExportOptionsModel
+from models.pptx_models import PptxPresentationModel, PptxSlideModel
 from models.presentation_outline_model import (
     PresentationOutlineModel,
     SlideOutlineModel
@@ -17,7 +22,14 @@ from models.presentation_layout import PresentationLayoutModel
 from models.presentation_structure_model import PresentationStructureModel
 from dataclasses import dataclass
 from utils.asset_directory_utils import get_exports_directory, get_images_directory
-
+from utils.etag_utils import etag_matches, get_file_etag
+from utils.get_env import get_export_spool_max_bytes_env
+
+from constants.documents import PPTX_MIME_TYPE
+from enums.batch_export_output import BatchExportOutput
+from enums.conversion_format import ConversionFormat
+from enums.export_job_status import ExportJobStatus
+from enums.thumbnail_format import ThumbnailFormat
 from enums.tone import Tone
 from enums.verbosity import Verbosity
 import uuid
@@ -29,13 +41,20 @@ from models.presentation_with_slides import (
     PresentationWithSlides,
     presentation_with_slides_cache,
 )
+from services.image_asset_store import IMAGE_ASSET_STORE
 from services.image_generation_service import ImageGenerationService
 from models.sql.slide import SlideModel
 from models.sse_response import SSECompleteResponse, SSEErrorResponse, SSEResponse
+from services.batch_export_service import BATCH_EXPORT_SERVICE
+from services.document_conversion_service import DOCUMENT_CONVERSION_SERVICE
+from services.export_job_service import EXPORT_JOB_SERVICE
+from services.export_result_cache import EXPORT_RESULT_CACHE
+from services.pptx_model_store import PPTX_MODEL_STORE
 from services.pptx_presentation_creator import PptxPresentationCreator
+from services.slide_thumbnail_service import SLIDE_THUMBNAIL_SERVICE
 from utils.process_slides import (
     process_slide_add_placeholder_assets,
-    process_slide_and_fetch_assets,
+    process_slides_and_fetch_assets,
 )
 from models.presentation_layout import SlideLayoutModel
 from utils.schema_utils import (
@@ -82,7 +101,7 @@ async def create_presentation(
         web_search=web_search,
     )
     # 将 presentation 缓存起来
-    presentation_cache.create(presentation)
+    await presentation_cache.create(presentation)
 
     return presentation
 
@@ -96,7 +115,7 @@ async def prepare_presentation(
     if not outlines:
         raise HTTPException(status_code=400, detail="Outlines are required")
     
-    presentation = presentation_cache.get(presentation_id)
+    presentation = await presentation_cache.get(presentation_id)
     if not presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
 
@@ -133,13 +152,13 @@ async def prepare_presentation(
     presentation.update_outlines(presentation_outline_model.model_dump())
     if title:
         presentation.title = title
-    presentation_cache.update(presentation)
+    await presentation_cache.update(presentation)
 
     return presentation
 
 @router.get("/stream/{id}", response_model=PresentationWithSlides)
 async def stream_presentation(id: uuid.UUID):
-    presentation = presentation_cache.get(id)
+    presentation = await presentation_cache.get(id)
     if not presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
     if not presentation.structure:
@@ -162,9 +181,6 @@ async def stream_presentation(id: uuid.UUID):
         layout = presentation.get_layout()
         outline = presentation.get_presentation_outline()
 
-        # These tasks will be gathered and awaited after all slides are generated
-        async_assets_generation_tasks = []
-
         slides: List[SlideModel] = []
         yield SSEResponse(
             event="response",
@@ -197,11 +213,6 @@ async def stream_presentation(id: uuid.UUID):
             # This will mutate slide and add placeholder assets
             process_slide_add_placeholder_assets(slide)
 
-            # This will mutate slide
-            async_assets_generation_tasks.append(
-                process_slide_and_fetch_assets(image_generation_service, slide)
-            )
-
             yield SSEResponse(
                 event="response",
                 data=json.dumps({"type": "chunk", "chunk": slide.model_dump_json()}),
@@ -212,10 +223,12 @@ async def stream_presentation(id: uuid.UUID):
             data=json.dumps({"type": "chunk", "chunk": " ] }"}),
         ).to_string()
 
-        generated_assets_lists = await asyncio.gather(*async_assets_generation_tasks)
-        generated_assets = []
-        for assets_list in generated_assets_lists:
-            generated_assets.extend(assets_list)
+        # Assets of all slides are fetched together, icons in a single batch
+        # This will mutate slides
+        generated_assets = await process_slides_and_fetch_assets(
+            image_generation_service, slides
+        )
+        await IMAGE_ASSET_STORE.add_references(generated_assets, id)
 
 
         presentationWithSlides = PresentationWithSlides(
@@ -224,7 +237,7 @@ async def stream_presentation(id: uuid.UUID):
         )
         
         # 缓存 presentationWithSlides
-        presentation_with_slides_cache.create(presentationWithSlides)
+        await presentation_with_slides_cache.create(presentationWithSlides)
         
         yield SSECompleteResponse(
             key="presentation",
@@ -237,7 +250,7 @@ async def stream_presentation(id: uuid.UUID):
 async def get_presentation(
     id: uuid.UUID
 ):
-    presentation_with_slides = presentation_with_slides_cache.get(id)  
+    presentation_with_slides = await presentation_with_slides_cache.get(id)  
     return presentation_with_slides
 
 @router.patch("/update", response_model=PresentationWithSlides)
@@ -247,7 +260,7 @@ async def update_presentation(
     title: Annotated[Optional[str], Body()] = None,
     slides: Annotated[Optional[List[SlideModel]], Body()] = None,
 ):
-    presentation = presentation_cache.get(id)
+    presentation = await presentation_cache.get(id)
     if not presentation:
         raise HTTPException(status_code=404, detail="Presentation not found")
 
@@ -271,10 +284,10 @@ async def update_presentation(
     )
     
     # 缓存或更新 presentationWithSlides
-    if presentation_with_slides_cache.get(id):
-        presentation_with_slides_cache.update(presentation_with_slides)
+    if await presentation_with_slides_cache.get(id):
+        await presentation_with_slides_cache.update(presentation_with_slides)
     else:
-        presentation_with_slides_cache.create(presentation_with_slides)
+        await presentation_with_slides_cache.create(presentation_with_slides)
     
     return presentation_with_slides
 
@@ -282,35 +295,340 @@ async def update_presentation(
 @router.post("/export/pptx", response_model=str)
 async def export_presentation_as_pptx(
     pptx_model: Annotated[PptxPresentationModel, Body()],
+    response: Response,
+    target_dpi: Annotated[Optional[int], Query(ge=72, le=600)] = None,
+    jpeg_quality: Annotated[Optional[int], Query(ge=1, le=95)] = None,
+    streaming: Optional[bool] = None,
+    presentation_id: Optional[uuid.UUID] = None,
 ):
+    """
+    导出PPTX文件
+    - target_dpi: 图片按其在幻灯片上的尺寸重采样到该DPI
+    - jpeg_quality: 不透明图片以该质量编码为JPEG，透明图片保留PNG；设置了
+      target_dpi 时默认为 85
+    - streaming: 大文件模式，内存占用不随页数增长；默认页数达到
+      EXPORT_STREAMING_MIN_SLIDES 时启用
+    - presentation_id: 保存本次导出的模型，之后可按ID批量导出
+    """
     file_id = str(uuid.uuid4())
+    if presentation_id:
+        await asyncio.to_thread(PPTX_MODEL_STORE.save, presentation_id, pptx_model)
+
+    export_options = PptxExportOptionsModel(
+        target_dpi=target_dpi, jpeg_quality=jpeg_quality
+    )
     temp_dir = TEMP_FILE_SERVICE.create_temp_dir(file_id)
+    try:
+        # 相同的模型和导出参数直接复用已生成的文件，并发的相同请求只生成一次
+        export_key = EXPORT_RESULT_CACHE.get_key(pptx_model, export_options)
+        pptx_creator = PptxPresentationCreator(
+            pptx_model, temp_dir, export_options, streaming
+        )
 
-    pptx_creator = PptxPresentationCreator(pptx_model, temp_dir)
-    await pptx_creator.create_ppt()
+        async def build(path: str):
+            await pptx_creator.create_ppt()
+            await asyncio.to_thread(pptx_creator.save, path)
 
-    export_directory = get_exports_directory()
-    filename = f"{pptx_model.name or file_id}.pptx"
-    pptx_path = os.path.join(export_directory, filename)
-    pptx_creator.save(pptx_path)
+        cache_path, cache_status = await EXPORT_RESULT_CACHE.get_or_build(
+            export_key, build
+        )
+
+        export_directory = get_exports_directory()
+        filename = f"{pptx_model.name or file_id}.pptx"
+        pptx_path = os.path.join(export_directory, filename)
+        await asyncio.to_thread(EXPORT_RESULT_CACHE.publish, cache_path, pptx_path)
+    finally:
+        await TEMP_FILE_SERVICE.remove_temp_dir(temp_dir)
+
+    # 各导出阶段耗时
+    print(f"Exported {filename} ({cache_status}): {pptx_creator.timings}")
+    # 命中缓存或等待其他请求生成时，本请求的 pptx_creator 没有运行
+    response.headers.update(
+        get_export_headers(
+            pptx_creator if cache_status == "miss" else None,
+            os.path.getsize(pptx_path),
+        )
+    )
+    response.headers["X-Export-Cache"] = cache_status
 
     return f"./api/app_data/exports/{filename}"
 
 
+@router.post("/export/pptx/file")
+async def export_presentation_as_pptx_file(
+    pptx_model: Annotated[PptxPresentationModel, Body()],
+    target_dpi: Annotated[Optional[int], Query(ge=72, le=600)] = None,
+    jpeg_quality: Annotated[Optional[int], Query(ge=1, le=95)] = None,
+    streaming: Optional[bool] = None,
+):
+    """
+    导出PPTX并在同一响应中直接返回文件内容，不写入exports目录
+    - 小文件保存在内存中，超过 EXPORT_SPOOL_MAX_BYTES 时转存到临时目录
+    - streaming: 同 /export/pptx
+    """
+    file_id = str(uuid.uuid4())
+    temp_dir = TEMP_FILE_SERVICE.create_temp_dir(file_id)
+
+    export_options = PptxExportOptionsModel(
+        target_dpi=target_dpi, jpeg_quality=jpeg_quality
+    )
+    filename = f"{pptx_model.name or file_id}.pptx"
+
+    # 已生成过相同的文件时直接返回
+    cache_path = await asyncio.to_thread(
+        EXPORT_RESULT_CACHE.lookup,
+        EXPORT_RESULT_CACHE.get_key(pptx_model, export_options),
+    )
+    if cache_path:
+        await TEMP_FILE_SERVICE.remove_temp_dir(temp_dir)
+        return FileResponse(
+            path=cache_path,
+            filename=filename,
+            media_type=PPTX_MIME_TYPE,
+            headers={"X-Export-Cache": "hit"},
+        )
+
+    pptx_creator = PptxPresentationCreator(
+        pptx_model, temp_dir, export_options, streaming
+    )
+    spool_max_bytes = int(get_export_spool_max_bytes_env() or 64 * 1024 * 1024)
+    try:
+        await pptx_creator.create_ppt()
+        buffer = await asyncio.to_thread(pptx_creator.save_to_buffer, spool_max_bytes)
+    except BaseException:
+        # 成功时由 inner() 在发送完成后清理
+        await TEMP_FILE_SERVICE.remove_temp_dir(temp_dir)
+        raise
+    file_size = buffer.tell()
+    buffer.seek(0)
+
+    print(f"Exported {filename}: {pptx_creator.timings}")
+
+    async def inner():
+        try:
+            while chunk := await asyncio.to_thread(buffer.read, 1024 * 1024):
+                yield chunk
+        finally:
+            buffer.close()
+            await TEMP_FILE_SERVICE.remove_temp_dir(temp_dir)
+
+    headers = get_export_headers(pptx_creator, file_size)
+    headers["Content-Length"] = str(file_size)
+    headers["Content-Disposition"] = get_content_disposition_header(filename)
+    headers["X-Export-Cache"] = "miss"
+    return StreamingResponse(inner(), media_type=PPTX_MIME_TYPE, headers=headers)
+
+
+@router.post("/export/jobs", response_model=ExportJobModel, status_code=202)
+async def submit_export_job(
+    pptx_model: Annotated[PptxPresentationModel, Body()],
+    target_dpi: Annotated[Optional[int], Query(ge=72, le=600)] = None,
+    jpeg_quality: Annotated[Optional[int], Query(ge=1, le=95)] = None,
+    presentation_id: Optional[uuid.UUID] = None,
+):
+    """
+    提交导出任务，立即返回任务ID，导出在后台任务池中进行
+    - presentation_id: 同 /export/pptx
+    """
+    export_options = PptxExportOptionsModel(
+        target_dpi=target_dpi, jpeg_quality=jpeg_quality
+    )
+    if presentation_id:
+        await asyncio.to_thread(PPTX_MODEL_STORE.save, presentation_id, pptx_model)
+    try:
+        return EXPORT_JOB_SERVICE.submit(pptx_model, export_options)
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many export jobs, please try again later",
+            headers={"Retry-After": "5"},
+        )
+
+
+@router.post("/export/batch", response_model=BatchExportResultModel)
+async def export_presentations_batch(
+    items: Annotated[List[BatchExportItemModel], Body()],
+    target_dpi: Annotated[Optional[int], Query(ge=72, le=600)] = None,
+    jpeg_quality: Annotated[Optional[int], Query(ge=1, le=95)] = None,
+    output: BatchExportOutput = BatchExportOutput.MANIFEST,
+):
+    """
+    批量导出多个PPTX
+    - items: 每项为 pptx_model，或之前导出时保存过模型的 presentation_id
+    - 网络图片在整批中只下载一次，处理后的图片和幻灯片在各文件间共用缓存
+    - output=manifest: 文件写入exports目录，返回每个文件的路径、状态和耗时
+    - output=zip: 返回包含所有文件和 manifest.json 的zip
+    - 单个文件失败不影响其他文件，失败原因记录在结果中
+    """
+    export_options = PptxExportOptionsModel(
+        target_dpi=target_dpi, jpeg_quality=jpeg_quality
+    )
+    if output == BatchExportOutput.MANIFEST:
+        result = await BATCH_EXPORT_SERVICE.export(items, export_options)
+        print(f"Batch exported {len(items)} presentations: {result.timings}")
+        return result
+
+    result, zip_path = await BATCH_EXPORT_SERVICE.export_zip(items, export_options)
+    print(f"Batch exported {len(items)} presentations: {result.timings}")
+    return FileResponse(
+        path=zip_path,
+        filename="presentations.zip",
+        media_type="application/zip",
+        headers={"Server-Timing": get_server_timing_header(result.timings)},
+        # 发送完成后删除临时zip
+        background=BackgroundTask(TEMP_FILE_SERVICE.cleanup_temp_file, zip_path),
+    )
+
+
+@router.get("/export/jobs/{job_id}", response_model=ExportJobModel)
+async def get_export_job(job_id: str):
+    """查询导出任务进度"""
+    job = EXPORT_JOB_SERVICE.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.get("/export/jobs/{job_id}/stream")
+async def stream_export_job(job_id: str):
+    """以SSE推送导出任务进度，任务结束时发送complete事件"""
+    if not EXPORT_JOB_SERVICE.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Export job not found")
+
+    async def inner():
+        last_progress = None
+        while True:
+            job = EXPORT_JOB_SERVICE.get_job(job_id)
+            if not job:
+                yield SSEErrorResponse(detail="Export job not found").to_string()
+                return
+            if job.finished:
+                yield SSECompleteResponse(
+                    key="job", value=job.model_dump(mode="json")
+                ).to_string()
+                return
+
+            progress = (job.status, job.phase, job.completed_slides)
+            if progress != last_progress:
+                last_progress = progress
+                yield SSEResponse(
+                    event="response",
+                    data=json.dumps(
+                        {"type": "progress", "job": job.model_dump(mode="json")}
+                    ),
+                ).to_string()
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(inner(), media_type="text/event-stream")
+
+
+@router.get("/export/jobs/{job_id}/result")
+async def get_export_job_result(job_id: str, request: Request):
+    """下载导出任务生成的PPTX文件"""
+    job = EXPORT_JOB_SERVICE.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job.status == ExportJobStatus.FAILED:
+        raise HTTPException(status_code=500, detail=job.error or "Export failed")
+    file_path = EXPORT_JOB_SERVICE.get_file_path(job_id)
+    if not job.finished or not file_path:
+        raise HTTPException(status_code=409, detail="Export job not finished")
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return await get_pptx_file_response(
+        request, file_path, EXPORT_JOB_SERVICE.get_filename(job_id)
+    )
+
+
+@router.post("/export/pdf", response_model=str)
+async def export_presentation_as_pdf(
+    pptx_model: Annotated[PptxPresentationModel, Body()],
+    target_dpi: Annotated[Optional[int], Query(ge=72, le=600)] = None,
+    jpeg_quality: Annotated[Optional[int], Query(ge=1, le=95)] = None,
+):
+    """
+    导出PDF：先生成PPTX，再由常驻的LibreOffice进程转换
+    - target_dpi / jpeg_quality: 同 /export/pptx
+    """
+    export_options = PptxExportOptionsModel(
+        target_dpi=target_dpi, jpeg_quality=jpeg_quality
+    )
+    [path] = await convert_presentation(pptx_model, export_options, ConversionFormat.PDF)
+    return path
+
+
+@router.post("/export/png", response_model=List[str])
+async def export_presentation_as_png(
+    pptx_model: Annotated[PptxPresentationModel, Body()],
+    width: Annotated[int, Query(ge=64, le=3840)] = 1280,
+    target_dpi: Annotated[Optional[int], Query(ge=72, le=600)] = None,
+    jpeg_quality: Annotated[Optional[int], Query(ge=1, le=95)] = None,
+):
+    """
+    将每页幻灯片导出为PNG，返回各页图片路径
+    - width: 图片宽度（像素），高度按幻灯片比例计算
+    """
+    export_options = PptxExportOptionsModel(
+        target_dpi=target_dpi, jpeg_quality=jpeg_quality
+    )
+    return await convert_presentation(
+        pptx_model, export_options, ConversionFormat.PNG, width
+    )
+
+
+@router.post("/thumbnails", response_model=List[Optional[str]])
+async def render_presentation_thumbnails(
+    pptx_model: Annotated[PptxPresentationModel, Body()],
+    width: Annotated[int, Query(ge=64, le=1280)] = 320,
+    format: ThumbnailFormat = ThumbnailFormat.PNG,
+):
+    """
+    生成每页幻灯片的缩略图，返回各页图片路径，无法生成的页为 null
+    - 按幻灯片内容、宽度和格式缓存，未修改的页直接复用
+    """
+    paths = await SLIDE_THUMBNAIL_SERVICE.render_slides(
+        pptx_model.slides, width, format
+    )
+    return [
+        f"./api/app_data/thumbnails/{os.path.basename(path)}" if path else None
+        for path in paths
+    ]
+
+
+@router.post("/thumbnail")
+async def get_slide_thumbnail(
+    slide_model: Annotated[PptxSlideModel, Body()],
+    request: Request,
+    width: Annotated[int, Query(ge=64, le=1280)] = 320,
+    format: ThumbnailFormat = ThumbnailFormat.PNG,
+):
+    """生成单页幻灯片的缩略图并直接返回图片"""
+    [path] = await SLIDE_THUMBNAIL_SERVICE.render_slides([slide_model], width, format)
+    if not path:
+        raise HTTPException(status_code=500, detail="Could not render thumbnail")
+
+    etag = await get_file_etag(path)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path=path, media_type=f"image/{format.value}", headers=headers)
+
+
 @router.get("/download/{filename}")
-async def download_presentation(filename: str):
-    """下载导出的PPTX文件"""
+async def download_presentation(filename: str, request: Request):
+    """
+    下载导出的PPTX文件
+    - ETag 为文件内容哈希，If-None-Match 命中时返回 304
+    - 支持 Range 断点续传
+    """
     export_directory = get_exports_directory()
-    file_path = os.path.join(export_directory, filename)
-    
+    file_path = os.path.join(export_directory, os.path.basename(filename))
+
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
-    
-    return FileResponse(
-        path=file_path,
-        filename=filename,
-        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-    )
+
+    return await get_pptx_file_response(request, file_path, filename)
 
 
 @router.patch("/update", response_model=PresentationWithSlides)
@@ -320,11 +638,128 @@ async def update_presentation(
     title: Annotated[Optional[str], Body()] = None,
     slides: Annotated[Optional[List[SlideModel]], Body()] = None,
 ):
-    presentation_with_slides = presentation_with_slides_cache.get(id)
+    presentation_with_slides = await presentation_with_slides_cache.get(id)
     
     return presentation_with_slides;
 
 
+async def convert_presentation(
+    pptx_model: PptxPresentationModel,
+    export_options: PptxExportOptionsModel,
+    conversion_format: ConversionFormat,
+    width: Optional[int] = None,
+) -> List[str]:
+    file_id = str(uuid.uuid4())
+    temp_dir = TEMP_FILE_SERVICE.create_temp_dir(file_id)
+    name = pptx_model.name or file_id
+    try:
+        # 与 /export/pptx 共用导出缓存
+        export_key = EXPORT_RESULT_CACHE.get_key(pptx_model, export_options)
+        pptx_creator = PptxPresentationCreator(pptx_model, temp_dir, export_options)
+
+        async def build(path: str):
+            await pptx_creator.create_ppt()
+            await asyncio.to_thread(pptx_creator.save, path)
+
+        cache_path, _ = await EXPORT_RESULT_CACHE.get_or_build(export_key, build)
+        pptx_path = os.path.join(temp_dir, f"{file_id}.pptx")
+        await asyncio.to_thread(EXPORT_RESULT_CACHE.publish, cache_path, pptx_path)
+
+        try:
+            paths = await DOCUMENT_CONVERSION_SERVICE.convert(
+                pptx_path,
+                os.path.join(temp_dir, "converted"),
+                conversion_format,
+                width,
+            )
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many conversions, please try again later",
+                headers={"Retry-After": "5"},
+            )
+        except RuntimeError as e:
+            # 转换超时或LibreOffice报错
+            raise HTTPException(status_code=500, detail=str(e))
+
+        export_directory = get_exports_directory()
+        filenames = []
+        for index, path in enumerate(paths):
+            filename = (
+                f"{name}.pdf"
+                if conversion_format == ConversionFormat.PDF
+                else f"{name}-slide-{index + 1}.png"
+            )
+            await asyncio.to_thread(
+                EXPORT_RESULT_CACHE.publish,
+                path,
+                os.path.join(export_directory, filename),
+            )
+            filenames.append(filename)
+    finally:
+        await TEMP_FILE_SERVICE.remove_temp_dir(temp_dir)
+
+    print(f"Converted {name} to {conversion_format.value}: {len(filenames)} file(s)")
+    return [f"./api/app_data/exports/{filename}" for filename in filenames]
+
+
+def get_server_timing_header(timings: dict) -> str:
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+    )
+
+
+def get_export_headers(
+    pptx_creator: Optional[PptxPresentationCreator], file_bytes: int
+) -> dict:
+    """pptx_creator 为 None 表示文件来自导出缓存，没有本次生成的统计"""
+    headers = {"X-Export-File-Bytes": str(file_bytes)}
+    if pptx_creator is None:
+        return headers
+    headers.update(
+        {
+            "Server-Timing": get_server_timing_header(pptx_creator.timings),
+            # 图片体积：原图与实际嵌入的图片
+            "X-Export-Source-Media-Bytes": str(pptx_creator.source_media_bytes),
+            "X-Export-Media-Bytes": str(pptx_creator.embedded_media_bytes),
+            # 从单页缓存复用、未重新生成的幻灯片数
+            "X-Export-Cached-Slides": str(pptx_creator.cached_slides),
+            # 导出过程中进程内存占用峰值
+            "X-Export-Peak-Memory-Bytes": str(pptx_creator.peak_memory_bytes),
+        }
+    )
+    return headers
+
+
+async def get_pptx_file_response(
+    request: Request, file_path: str, filename: str
+) -> Response:
+    etag = await get_file_etag(file_path)
+    # 同名文件可能被重新导出，客户端每次需用 ETag 校验
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # Range 和 If-Range 由 FileResponse 按上面的 ETag 处理
+    return FileResponse(
+        path=file_path,
+        filename=filename,
+        media_type=PPTX_MIME_TYPE,
+        headers=headers,
+    )
+
+
+def get_content_disposition_header(filename: str) -> str:
+    # 中文文件名按 RFC 5987 编码，旧客户端使用ASCII回退名
+    ascii_stem = os.path.splitext(filename)[0].encode("ascii", "ignore").decode()
+    ascii_stem = ascii_stem.replace('"', "").replace("\\", "").strip()
+    ascii_filename = f"{ascii_stem or 'presentation'}.pptx"
+    return (
+        f'attachment; filename="{ascii_filename}"; '
+        f"filename*=UTF-8''{quote(filename)}"
+    )
+
+
 async def generate_presentation_structure(
     presentation_outline: PresentationOutlineModel,
     presentation_layout: PresentationLayoutModel,
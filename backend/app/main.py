@@ -1,8 +1,17 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.v1 import api_router
 from fastapi.middleware.cors import CORSMiddleware
 from langfuse import get_client
 from app.core.config import settings
+from services.asset_downloader import ASSET_DOWNLOADER
+from services.database import create_tables, dispose_engine
+from services.document_conversion_service import DOCUMENT_CONVERSION_SERVICE
+from services.export_job_service import EXPORT_JOB_SERVICE
+from services.icon_finder_service import ICON_FINDER_SERVICE
+from services.storage_lifecycle_service import STORAGE_LIFECYCLE_SERVICE
+from utils.process_pool import get_process_pool, shutdown_process_pool
  
 from pydantic_ai.agent import Agent
  
@@ -24,8 +33,32 @@ from langfuse import Langfuse
 # Agent.instrument_all()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 导出和缩略图用的进程池，worker 由 forkserver 启动
+    get_process_pool()
+    # 演示文稿与幻灯片的数据表
+    await create_tables()
+    # 图标服务在后台预热，不阻塞启动
+    ICON_FINDER_SERVICE.start_warm_up()
+    # 导出任务池
+    EXPORT_JOB_SERVICE.start()
+    # 定期清理临时文件和导出文件
+    STORAGE_LIFECYCLE_SERVICE.start()
+    # 常驻的LibreOffice转换进程，未安装时跳过
+    DOCUMENT_CONVERSION_SERVICE.start()
+    yield
+    await STORAGE_LIFECYCLE_SERVICE.stop()
+    await DOCUMENT_CONVERSION_SERVICE.stop()
+    await EXPORT_JOB_SERVICE.stop()
+    await ASSET_DOWNLOADER.close()
+    await asyncio.to_thread(shutdown_process_pool)
+    await dispose_engine()
+
+
 app = FastAPI(
     title="TD Smart PPT Backend",
+    lifespan=lifespan,
     version="1.0.0",
     docs_url="/swagger",     # 改 Swagger 文档路径
     openapi_url="/openapi.json"  # OpenAPI schema 地址
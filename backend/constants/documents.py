@@ -1,8 +1,9 @@
 PDF_MIME_TYPES = ["application/pdf"]
 TEXT_MIME_TYPES = ["text/plain"]
-POWERPOINT_TYPES = [
+PPTX_MIME_TYPE = (
     "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-]
+)
+POWERPOINT_TYPES = [PPTX_MIME_TYPE]
 WORD_TYPES = [
     "application/msword",
     "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
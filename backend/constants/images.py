@@ -0,0 +1,16 @@
+from enums.image_variant import ImageVariant
+
+# Longest side (in pixels) of each precomputed variant, None keeps the original
+IMAGE_VARIANT_MAX_SIZES = {
+    ImageVariant.THUMBNAIL: 320,
+    ImageVariant.SLIDE: 1280,
+    ImageVariant.FULL: None,
+}
+
+IMAGE_VARIANT_JPEG_QUALITY = 85
+
+PLACEHOLDER_IMAGE_URL = "/static/images/placeholder.jpg"
+PLACEHOLDER_ICON_URL = "/static/icons/placeholder.svg"
+
+# Opaque pictures of resampled exports, unless a quality is requested
+EXPORT_JPEG_QUALITY = 85
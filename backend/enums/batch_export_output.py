@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class BatchExportOutput(str, Enum):
+    MANIFEST = "manifest"
+    ZIP = "zip"
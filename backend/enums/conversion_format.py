@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class ConversionFormat(str, Enum):
+    PDF = "pdf"
+    PNG = "png"
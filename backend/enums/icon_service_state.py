@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class IconServiceState(str, Enum):
+    PENDING = "pending"
+    WARMING_UP = "warming_up"
+    READY = "ready"
+    FAILED = "failed"
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class ImageVariant(str, Enum):
+    THUMBNAIL = "thumbnail"
+    SLIDE = "slide"
+    FULL = "full"
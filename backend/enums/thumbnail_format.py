@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class ThumbnailFormat(str, Enum):
+    PNG = "png"
+    WEBP = "webp"
@@ -0,0 +1,31 @@
+from typing import Dict, List, Optional
+import uuid
+from pydantic import BaseModel, Field
+
+from enums.export_job_status import ExportJobStatus
+from models.pptx_models import PptxPresentationModel
+
+
+class BatchExportItemModel(BaseModel):
+    pptx_model: Optional[PptxPresentationModel] = None
+    # Without a model, the model last exported for this presentation is used
+    presentation_id: Optional[uuid.UUID] = None
+
+
+class BatchExportDeckResultModel(BaseModel):
+    index: int
+    name: Optional[str] = None
+    presentation_id: Optional[uuid.UUID] = None
+    status: ExportJobStatus = ExportJobStatus.QUEUED
+    path: Optional[str] = None
+    error: Optional[str] = None
+    cache: Optional[str] = None
+    timings: Dict[str, float] = Field(default_factory=dict)
+    file_bytes: int = 0
+    seconds: float = 0.0
+
+
+class BatchExportResultModel(BaseModel):
+    decks: List[BatchExportDeckResultModel] = Field(default_factory=list)
+    timings: Dict[str, float] = Field(default_factory=dict)
+    seconds: float = 0.0
@@ -0,0 +1,16 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class DownloadResult(BaseModel):
+    url: str
+    path: Optional[str] = None
+    status: Optional[int] = None
+    bytes: int = 0
+    attempts: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.path is not None
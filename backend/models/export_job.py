@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Dict, Optional
+from pydantic import BaseModel, Field
+
+from enums.export_job_status import ExportJobStatus
+from utils.datetime_utils import get_current_utc_datetime
+
+
+class ExportJobModel(BaseModel):
+    id: str
+    status: ExportJobStatus = ExportJobStatus.QUEUED
+    phase: Optional[str] = None
+    progress: float = 0.0
+    completed_slides: int = 0
+    total_slides: int = 0
+    path: Optional[str] = None
+    error: Optional[str] = None
+    timings: Dict[str, float] = Field(default_factory=dict)
+    peak_memory_bytes: int = 0
+    created_at: datetime = Field(default_factory=get_current_utc_datetime)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (ExportJobStatus.COMPLETED, ExportJobStatus.FAILED)
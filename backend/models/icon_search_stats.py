@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class IconSearchStats(BaseModel):
+    lookups: int = 0
+    cache_hits: int = 0
+    lexical_hits: int = 0
+    semantic_lookups: int = 0
+    placeholder_lookups: int = 0
+    cache_hit_ratio: float = 0.0
+    lexical_hit_ratio: float = 0.0
+    semantic_ratio: float = 0.0
+    cache_size: int = 0
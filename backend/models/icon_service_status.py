@@ -0,0 +1,12 @@
+from typing import Optional
+from pydantic import BaseModel
+
+from enums.icon_service_state import IconServiceState
+
+
+class IconServiceStatus(BaseModel):
+    state: IconServiceState
+    progress: float
+    step: Optional[str] = None
+    error: Optional[str] = None
+    ready: bool = False
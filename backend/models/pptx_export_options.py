@@ -0,0 +1,18 @@
+from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+
+from constants.images import EXPORT_JPEG_QUALITY
+
+
+class PptxExportOptionsModel(BaseModel):
+    # Pictures are resampled to their on-slide size at this resolution
+    target_dpi: Optional[int] = Field(default=None, ge=72, le=600)
+    # Opaque pictures are encoded as JPEG at this quality, PNG is kept for
+    # transparency. Defaults to EXPORT_JPEG_QUALITY once target_dpi is set.
+    jpeg_quality: Optional[int] = Field(default=None, ge=1, le=95)
+
+    @model_validator(mode="after")
+    def set_default_jpeg_quality(self):
+        if self.target_dpi and self.jpeg_quality is None:
+            self.jpeg_quality = EXPORT_JPEG_QUALITY
+        return self
@@ -1,10 +1,19 @@
-from typing import List, Optional, Dict
+import asyncio
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import hashlib
 import uuid
 
 from pydantic import BaseModel
 
+from models.sql.presentation_sql import PresentationSqlModel
 from models.sql.slide import SlideModel
+from services.image_asset_store import IMAGE_ASSET_STORE
+from services.pptx_model_store import PPTX_MODEL_STORE
+from services.presentation_store import PRESENTATION_STORE
+from utils.datetime_utils import get_current_utc_datetime
+from utils.get_env import get_presentation_cache_size_env
+from utils.lru_cache import LRUCache
 
 
 class PresentationWithSlides(BaseModel):
@@ -19,46 +28,121 @@ class PresentationWithSlides(BaseModel):
     verbosity: Optional[str] = None
     slides: List[SlideModel]
 
+
+def get_slide_hashes(slides: List[SlideModel]) -> Dict[str, str]:
+    return {
+        str(slide.id): hashlib.sha1(slide.model_dump_json().encode()).hexdigest()
+        for slide in slides
+    }
+
+
 class PresentationWithSlidesCache:
-    """演示文稿与幻灯片内存缓存管理器"""
-    
-    def __init__(self):
-        self._cache: Dict[uuid.UUID, PresentationWithSlides] = {}
-    
-    def create(self, presentation_with_slides: PresentationWithSlides) -> PresentationWithSlides:
+    """
+    演示文稿与幻灯片缓存管理器，数据保存在数据库中
+    - 内存中按 LRU 缓存最近使用的演示文稿与幻灯片
+    - 保存时只写入有变化的幻灯片，并删除已移除的幻灯片
+    - 读取时比较数据库中的版本号，其他 worker 的修改也能读到
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self._cache: LRUCache[Tuple[int, PresentationWithSlides, Dict[str, str]]] = (
+            LRUCache(max_size or int(get_presentation_cache_size_env() or 128))
+        )
+
+    async def create(self, presentation_with_slides: PresentationWithSlides) -> PresentationWithSlides:
         """创建新的演示文稿与幻灯片"""
-        self._cache[presentation_with_slides.id] = presentation_with_slides
+        presentation_id = presentation_with_slides.id
+        saved_hashes = await self._get_saved_hashes(presentation_id)
+        slide_hashes = get_slide_hashes(presentation_with_slides.slides)
+        changed_slides = [
+            slide
+            for slide in presentation_with_slides.slides
+            if saved_hashes.get(str(slide.id)) != slide_hashes[str(slide.id)]
+        ]
+        removed_slide_ids = saved_hashes.keys() - slide_hashes.keys()
+
+        version = await PRESENTATION_STORE.save_slides(
+            presentation_id,
+            presentation_with_slides.model_dump(exclude={"slides"}),
+            changed_slides,
+            removed_slide_ids,
+        )
+        self._cache.set(
+            presentation_id, (version, presentation_with_slides, slide_hashes)
+        )
         return presentation_with_slides
-    
-    def get(self, presentation_id: uuid.UUID) -> Optional[PresentationWithSlides]:
+
+    async def get(self, presentation_id: uuid.UUID) -> Optional[PresentationWithSlides]:
         """根据ID获取演示文稿与幻灯片"""
-        return self._cache.get(presentation_id)
-    
-    def update(self, presentation_with_slides: PresentationWithSlides) -> PresentationWithSlides:
+        entry = await self._get_entry(presentation_id)
+        return entry[1] if entry else None
+
+    async def update(self, presentation_with_slides: PresentationWithSlides) -> PresentationWithSlides:
         """更新演示文稿与幻灯片"""
-        presentation_with_slides.updated_at = datetime.utcnow()
-        self._cache[presentation_with_slides.id] = presentation_with_slides
-        return presentation_with_slides
-    
-    def delete(self, presentation_id: uuid.UUID) -> bool:
-        """删除演示文稿与幻灯片"""
-        if presentation_id in self._cache:
-            del self._cache[presentation_id]
-            return True
-        return False
-    
-    def list_all(self) -> List[PresentationWithSlides]:
+        presentation_with_slides.updated_at = get_current_utc_datetime()
+        return await self.create(presentation_with_slides)
+
+    async def delete(self, presentation_id: uuid.UUID) -> bool:
+        """删除演示文稿与幻灯片及其导出模型，并释放幻灯片引用的图片资源"""
+        self._cache.pop(presentation_id)
+        deleted = await PRESENTATION_STORE.delete_slides(presentation_id) is not None
+        await asyncio.to_thread(PPTX_MODEL_STORE.delete, presentation_id)
+        if deleted:
+            await IMAGE_ASSET_STORE.release_presentation(presentation_id)
+        return deleted
+
+    async def list_all(self) -> List[PresentationWithSlides]:
         """获取所有演示文稿与幻灯片"""
-        return list(self._cache.values())
-    
+        presentations = []
+        for row in await PRESENTATION_STORE.list_presentations(with_slides=True):
+            entry = await self._get_entry(row.id)
+            if entry:
+                presentations.append(entry[1])
+        return presentations
+
     def clear(self):
-        """清空所有缓存"""
+        """清空内存缓存，数据库中的数据保留"""
         self._cache.clear()
-    
-    def count(self) -> int:
-        """获取缓存中的演示文稿与幻灯片数量"""
-        return len(self._cache)
+
+    async def count(self) -> int:
+        """获取演示文稿与幻灯片数量"""
+        return await PRESENTATION_STORE.count_presentations(with_slides=True)
+
+    async def _get_entry(
+        self, presentation_id: uuid.UUID
+    ) -> Optional[Tuple[int, PresentationWithSlides, Dict[str, str]]]:
+        version = await PRESENTATION_STORE.get_version(presentation_id)
+        if version is None:
+            self._cache.pop(presentation_id)
+            return None
+        entry = self._cache.get(presentation_id)
+        if entry and entry[0] == version:
+            return entry
+
+        row = await PRESENTATION_STORE.get_presentation(presentation_id)
+        if row is None or not row.has_slides:
+            self._cache.pop(presentation_id)
+            return None
+        slides = await PRESENTATION_STORE.get_slides(presentation_id)
+        entry = (
+            row.version,
+            get_presentation_with_slides(row, slides),
+            get_slide_hashes(slides),
+        )
+        self._cache.set(presentation_id, entry)
+        return entry
+
+    async def _get_saved_hashes(self, presentation_id: uuid.UUID) -> Dict[str, str]:
+        """保存前数据库中幻灯片的哈希，用来找出有变化的幻灯片"""
+        entry = await self._get_entry(presentation_id)
+        return entry[2] if entry else {}
+
+
+def get_presentation_with_slides(
+    row: PresentationSqlModel, slides: List[SlideModel]
+) -> PresentationWithSlides:
+    return PresentationWithSlides(**row.get_fields(), slides=slides)
 
 
 # 全局缓存实例
-presentation_with_slides_cache = PresentationWithSlidesCache()
\ No newline at end of file
+presentation_with_slides_cache = PresentationWithSlidesCache()
@@ -0,0 +1,9 @@
+from typing import Dict
+from pydantic import BaseModel
+
+
+class SlidePartCacheEntry(BaseModel):
+    # Serialized p:sld element of the slide part
+    xml: str
+    # Relationship id in the xml -> cached media file name
+    media: Dict[str, str] = {}
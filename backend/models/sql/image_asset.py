@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 import uuid
 
 from pydantic import BaseModel, Field
@@ -12,4 +12,6 @@ class ImageAsset(BaseModel):
     created_at: datetime = Field(default_factory=get_current_utc_datetime)
     is_uploaded: bool = Field(default=False)
     path: str
+    content_hash: Optional[str] = Field(default=None)
+    variants: Optional[Dict[str, str]] = Field(default=None)
     extras: Optional[dict] = Field(default=None)
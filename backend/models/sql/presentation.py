@@ -1,12 +1,19 @@
+import asyncio
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import List, Optional, Tuple
 import uuid
 from pydantic import BaseModel, Field
 
 from models.presentation_layout import PresentationLayoutModel
 from models.presentation_outline_model import PresentationOutlineModel
 from models.presentation_structure_model import PresentationStructureModel
-from utils.datetime_utils import get_current_utc_datetime
+from models.sql.presentation_sql import PresentationSqlModel
+from services.image_asset_store import IMAGE_ASSET_STORE
+from services.pptx_model_store import PPTX_MODEL_STORE
+from services.presentation_store import PRESENTATION_STORE
+from utils.datetime_utils import as_utc_datetime, get_current_utc_datetime
+from utils.get_env import get_presentation_cache_size_env
+from utils.lru_cache import LRUCache
 
 
 class PresentationModel(BaseModel):
@@ -87,44 +94,76 @@ class PresentationModel(BaseModel):
 
 
 class PresentationCache:
-    """演示文稿内存缓存管理器"""
-    
-    def __init__(self):
-        self._cache: Dict[uuid.UUID, PresentationModel] = {}
-    
-    def create(self, presentation: PresentationModel) -> PresentationModel:
+    """
+    演示文稿缓存管理器，数据保存在数据库中
+    - 内存中按 LRU 缓存最近使用的演示文稿
+    - 读取时比较数据库中的版本号，其他 worker 的修改也能读到
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self._cache: LRUCache[Tuple[int, PresentationModel]] = LRUCache(
+            max_size or int(get_presentation_cache_size_env() or 128)
+        )
+
+    async def create(self, presentation: PresentationModel) -> PresentationModel:
         """创建新的演示文稿"""
-        self._cache[presentation.id] = presentation
+        version = await PRESENTATION_STORE.save_presentation(
+            presentation.id, presentation.model_dump()
+        )
+        self._cache.set(presentation.id, (version, presentation))
         return presentation
-    
-    def get(self, presentation_id: uuid.UUID) -> Optional[PresentationModel]:
+
+    async def get(self, presentation_id: uuid.UUID) -> Optional[PresentationModel]:
         """根据ID获取演示文稿"""
-        return self._cache.get(presentation_id)
-    
-    def update(self, presentation: PresentationModel) -> PresentationModel:
+        version = await PRESENTATION_STORE.get_version(presentation_id)
+        if version is None:
+            self._cache.pop(presentation_id)
+            return None
+        entry = self._cache.get(presentation_id)
+        if entry and entry[0] == version:
+            return entry[1]
+
+        row = await PRESENTATION_STORE.get_presentation(presentation_id)
+        if row is None:
+            self._cache.pop(presentation_id)
+            return None
+        presentation = get_presentation_model(row)
+        self._cache.set(presentation_id, (row.version, presentation))
+        return presentation
+
+    async def update(self, presentation: PresentationModel) -> PresentationModel:
         """更新演示文稿"""
         presentation.updated_at = get_current_utc_datetime()
-        self._cache[presentation.id] = presentation
-        return presentation
-    
-    def delete(self, presentation_id: uuid.UUID) -> bool:
-        """删除演示文稿"""
-        if presentation_id in self._cache:
-            del self._cache[presentation_id]
-            return True
-        return False
-    
-    def list_all(self) -> List[PresentationModel]:
+        return await self.create(presentation)
+
+    async def delete(self, presentation_id: uuid.UUID) -> bool:
+        """删除演示文稿及其导出模型，并释放其引用的图片资源"""
+        self._cache.pop(presentation_id)
+        deleted = await PRESENTATION_STORE.delete_presentation(presentation_id)
+        await asyncio.to_thread(PPTX_MODEL_STORE.delete, presentation_id)
+        if deleted:
+            await IMAGE_ASSET_STORE.release_presentation(presentation_id)
+        return deleted
+
+    async def list_all(self) -> List[PresentationModel]:
         """获取所有演示文稿"""
-        return list(self._cache.values())
-    
+        rows = await PRESENTATION_STORE.list_presentations()
+        return [get_presentation_model(row) for row in rows]
+
     def clear(self):
-        """清空所有缓存"""
+        """清空内存缓存，数据库中的数据保留"""
         self._cache.clear()
-    
-    def count(self) -> int:
-        """获取缓存中的演示文稿数量"""
-        return len(self._cache)
+
+    async def count(self) -> int:
+        """获取演示文稿数量"""
+        return await PRESENTATION_STORE.count_presentations()
+
+
+def get_presentation_model(row: PresentationSqlModel) -> PresentationModel:
+    presentation = PresentationModel.model_validate(row.get_fields())
+    # model_post_init 会重置 updated_at
+    presentation.updated_at = as_utc_datetime(row.updated_at)
+    return presentation
 
 
 # 全局缓存实例
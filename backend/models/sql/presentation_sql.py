@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import List, Optional
+import uuid
+from sqlalchemy import Column, DateTime, JSON, Text
+from sqlmodel import SQLModel, Field
+
+from utils.datetime_utils import as_utc_datetime, get_current_utc_datetime
+
+
+class PresentationSqlModel(SQLModel, table=True):
+    """Persisted presentation, the row behind PresentationModel and PresentationWithSlides"""
+
+    __tablename__ = "presentations"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    content: str = Field(sa_column=Column(Text, nullable=False))
+    n_slides: int
+    language: str
+    title: Optional[str] = None
+    file_paths: Optional[List[str]] = Field(sa_column=Column(JSON), default=None)
+    outlines: Optional[dict] = Field(sa_column=Column(JSON), default=None)
+    layout: Optional[dict] = Field(sa_column=Column(JSON), default=None)
+    structure: Optional[dict] = Field(sa_column=Column(JSON), default=None)
+    instructions: Optional[str] = Field(sa_column=Column(Text), default=None)
+    tone: Optional[str] = None
+    verbosity: Optional[str] = None
+    include_table_of_contents: bool = False
+    include_title_slide: bool = True
+    web_search: bool = False
+    created_at: datetime = Field(
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, default=get_current_utc_datetime
+        )
+    )
+    updated_at: datetime = Field(
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, default=get_current_utc_datetime
+        )
+    )
+    # Set once slides were saved, PresentationWithSlides only exists then
+    has_slides: bool = False
+    # Bumped on every write, in-memory copies compare it to detect changes
+    # made by other workers
+    version: int = 0
+
+    def get_fields(self) -> dict:
+        """Fields of the cached models, without the bookkeeping columns"""
+        fields = self.model_dump(exclude={"has_slides", "version"})
+        fields["created_at"] = as_utc_datetime(self.created_at)
+        fields["updated_at"] = as_utc_datetime(self.updated_at)
+        return fields
@@ -15,9 +15,9 @@ class SlideModel(SQLModel, table=True):
     layout: str
     index: int
     content: dict = Field(sa_column=Column(JSON))
-    html_content: Optional[str]
+    html_content: Optional[str] = None
     speaker_note: Optional[str] = None
-    properties: Optional[dict] = Field(sa_column=Column(JSON))
+    properties: Optional[dict] = Field(sa_column=Column(JSON), default=None)
 
     def get_new_slide(self, presentation: uuid.UUID, content: Optional[dict] = None):
         return SlideModel(
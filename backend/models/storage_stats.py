@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class StorageAreaStats(BaseModel):
+    name: str
+    directory: str
+    ttl: float
+    max_bytes: Optional[int] = None
+    bytes_used: int = 0
+    entries: int = 0
+    reclaimed_bytes: int = 0
+    removed_entries: int = 0
+    last_collected_at: Optional[datetime] = None
+    last_duration: float = 0.0
+
+
+class StorageStats(BaseModel):
+    areas: List[StorageAreaStats]
+    bytes_used: int = 0
+    reclaimed_bytes: int = 0
@@ -0,0 +1,224 @@
+import asyncio
+import mimetypes
+import os
+import random
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+import uuid
+
+import aiohttp
+
+from models.download_result import DownloadResult
+from utils.get_env import (
+    get_download_max_bytes_env,
+    get_download_max_per_host_env,
+    get_download_retries_env,
+    get_download_timeout_env,
+)
+
+CHUNK_SIZE = 64 * 1024
+# Chunks are written to disk in a worker thread once this much is buffered
+WRITE_BUFFER_SIZE = 1024 * 1024
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class DownloadError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None, retry: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retry = retry
+
+
+class AssetDownloader:
+    """
+    Downloads remote assets for exports.
+    - One shared session, every url is fetched with a single GET and the file
+    name is derived from that response.
+    - At most `max_per_host` concurrent downloads per host.
+    - Connection errors, timeouts, 429 and 5xx are retried with jittered
+    exponential backoff.
+    - Bodies above `max_bytes` and attempts above `timeout` seconds are aborted.
+    - Disk writes run in worker threads, files appear only once complete.
+    """
+
+    def __init__(
+        self,
+        max_per_host: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+    ):
+        self.max_per_host = max_per_host or int(get_download_max_per_host_env() or 4)
+        self.max_bytes = max_bytes or int(
+            get_download_max_bytes_env() or 50 * 1024 * 1024
+        )
+        self.timeout = timeout or float(get_download_timeout_env() or 30)
+        self.retries = (
+            retries if retries is not None else int(get_download_retries_env() or 3)
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # Sessions and semaphores belong to the loop they were created on
+            self._session = aiohttp.ClientSession(
+                trust_env=True,
+                connector=aiohttp.TCPConnector(limit_per_host=self.max_per_host),
+            )
+            self._loop = loop
+            self._host_semaphores = {}
+        return self._session
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_semaphores[host]
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def download(
+        self, url: str, save_directory: str, headers: Optional[dict] = None
+    ) -> DownloadResult:
+        result = DownloadResult(url=url)
+        start_time = time.perf_counter()
+        session = self._get_session()
+
+        for attempt in range(self.retries + 1):
+            result.attempts = attempt + 1
+            try:
+                # The host slot is released while backing off
+                async with self._get_host_semaphore(url):
+                    result.path, result.bytes = await self._download_once(
+                        session, url, save_directory, headers, result
+                    )
+                result.error = None
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                result.error = str(e) or e.__class__.__name__
+                retry = True
+            except DownloadError as e:
+                result.error = str(e)
+                retry = e.retry
+            except Exception as e:
+                result.error = str(e)
+                retry = False
+
+            if not retry or attempt == self.retries:
+                break
+            await asyncio.sleep(self._get_retry_delay(attempt))
+
+        result.seconds = time.perf_counter() - start_time
+        if result.error:
+            print(f"Error downloading file from {url}: {result.error}")
+        return result
+
+    def _get_retry_delay(self, attempt: int) -> float:
+        # Full jitter, retries of many failed urls do not hit the host together
+        return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt))
+
+    async def _download_once(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        save_directory: str,
+        headers: Optional[dict],
+        result: DownloadResult,
+    ):
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with session.get(url, headers=headers, timeout=timeout) as response:
+            result.status = response.status
+            if response.status != 200:
+                raise DownloadError(
+                    f"HTTP status {response.status}",
+                    status=response.status,
+                    retry=response.status in RETRY_STATUSES,
+                )
+            if response.content_length and response.content_length > self.max_bytes:
+                raise DownloadError(
+                    f"File is larger than {self.max_bytes} bytes ({response.content_length})"
+                )
+
+            save_path = os.path.join(save_directory, self.get_filename(url, response))
+            temp_path = f"{save_path}.part"
+            file = await asyncio.to_thread(self._open_file, save_directory, temp_path)
+            try:
+                size = 0
+                buffer = bytearray()
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise DownloadError(
+                            f"File is larger than {self.max_bytes} bytes"
+                        )
+                    buffer.extend(chunk)
+                    if len(buffer) >= WRITE_BUFFER_SIZE:
+                        await asyncio.to_thread(file.write, bytes(buffer))
+                        buffer.clear()
+                if buffer:
+                    await asyncio.to_thread(file.write, bytes(buffer))
+                await asyncio.to_thread(file.close)
+                await asyncio.to_thread(os.replace, temp_path, save_path)
+            except BaseException:
+                await asyncio.to_thread(self._discard_file, file, temp_path)
+                raise
+
+        return save_path, size
+
+    @staticmethod
+    def _open_file(save_directory: str, path: str):
+        os.makedirs(save_directory, exist_ok=True)
+        return open(path, "wb")
+
+    @staticmethod
+    def _discard_file(file, path: str):
+        file.close()
+        if os.path.exists(path):
+            os.remove(path)
+
+    @staticmethod
+    def get_filename(url: str, response: aiohttp.ClientResponse) -> str:
+        """
+        Unique file name keeping the extension of, in order, the
+        Content-Disposition file name, the url path or the Content-Type.
+        """
+        names = []
+        if response.content_disposition and response.content_disposition.filename:
+            names.append(response.content_disposition.filename)
+        names.append(urlparse(url).path)
+
+        extension = ""
+        for name in names:
+            extension = os.path.splitext(os.path.basename(name))[1]
+            if extension:
+                break
+        if not extension and response.content_type:
+            extension = mimetypes.guess_extension(response.content_type) or ""
+
+        return f"{uuid.uuid4()}{extension.lower()}"
+
+    async def download_all(
+        self, urls: List[str], save_directory: str, headers: Optional[dict] = None
+    ) -> List[DownloadResult]:
+        print(f"Starting download of {len(urls)} files to {save_directory}")
+        results = await asyncio.gather(
+            *[self.download(url, save_directory, headers) for url in urls]
+        )
+
+        successful_downloads = sum(1 for result in results if result.ok)
+        print(
+            f"Download completed: {successful_downloads}/{len(urls)} files downloaded successfully"
+        )
+        return results
+
+
+ASSET_DOWNLOADER = AssetDownloader()
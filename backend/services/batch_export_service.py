@@ -0,0 +1,301 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+import uuid
+import zipfile
+
+from fastapi import HTTPException
+
+from enums.export_job_status import ExportJobStatus
+from models.batch_export import (
+    BatchExportDeckResultModel,
+    BatchExportItemModel,
+    BatchExportResultModel,
+)
+from models.pptx_export_options import PptxExportOptionsModel
+from models.pptx_models import PptxPictureBoxModel, PptxPresentationModel
+from services.asset_downloader import ASSET_DOWNLOADER
+from services.export_result_cache import EXPORT_RESULT_CACHE
+from services.pptx_model_store import PPTX_MODEL_STORE
+from services.pptx_presentation_creator import PptxPresentationCreator
+from services.slide_part_cache import SLIDE_PART_CACHE
+from services.temp_file_service import TEMP_FILE_SERVICE
+from utils.asset_directory_utils import get_exports_directory
+from utils.get_env import (
+    get_batch_export_concurrency_env,
+    get_batch_export_max_decks_env,
+)
+
+
+class BatchExportService:
+    """
+    Exports many decks in one request.
+    - Network pictures used by any deck are downloaded once for the batch,
+    processed pictures and built slides are shared through their caches.
+    - Decks are exported `concurrency` at a time, through the export result
+    cache, a failing deck is reported without failing the others.
+    - Results are either published to the exports directory or packed into a
+    single zip with a manifest.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, max_decks: Optional[int] = None):
+        self.concurrency = concurrency or int(get_batch_export_concurrency_env() or 4)
+        self.max_decks = max_decks or int(get_batch_export_max_decks_env() or 50)
+
+    async def export(
+        self,
+        items: List[BatchExportItemModel],
+        export_options: Optional[PptxExportOptionsModel] = None,
+    ) -> BatchExportResultModel:
+        """Publishes every deck to the exports directory"""
+        result, cache_paths = await self._export_decks(items, export_options)
+
+        started_at = time.perf_counter()
+        export_directory = get_exports_directory()
+        filenames = self._get_filenames(result.decks, cache_paths)
+        for deck, cache_path, filename in zip(result.decks, cache_paths, filenames):
+            if not cache_path:
+                continue
+            await asyncio.to_thread(
+                EXPORT_RESULT_CACHE.publish,
+                cache_path,
+                os.path.join(export_directory, filename),
+            )
+            deck.path = f"./api/app_data/exports/{filename}"
+        result.timings["publish"] = time.perf_counter() - started_at
+        result.seconds = sum(result.timings.values())
+        return result
+
+    async def export_zip(
+        self,
+        items: List[BatchExportItemModel],
+        export_options: Optional[PptxExportOptionsModel] = None,
+    ) -> Tuple[BatchExportResultModel, str]:
+        """
+        Packs every deck and a manifest.json into a zip in the temp directory,
+        the caller removes it once sent.
+        """
+        result, cache_paths = await self._export_decks(items, export_options)
+
+        started_at = time.perf_counter()
+        zip_path = TEMP_FILE_SERVICE.create_temp_file_path(
+            f"batch-export-{uuid.uuid4()}.zip"
+        )
+        await asyncio.to_thread(self._write_zip, zip_path, result, cache_paths)
+        result.timings["package"] = time.perf_counter() - started_at
+        result.seconds = sum(result.timings.values())
+        return result, zip_path
+
+    async def _export_decks(
+        self,
+        items: List[BatchExportItemModel],
+        export_options: Optional[PptxExportOptionsModel],
+    ) -> Tuple[BatchExportResultModel, List[Optional[str]]]:
+        if len(items) > self.max_decks:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch can export at most {self.max_decks} presentations",
+            )
+
+        started_at = time.perf_counter()
+        result = BatchExportResultModel()
+        pptx_models = await asyncio.to_thread(
+            self._resolve_models, items, result.decks
+        )
+        # Computed before the export, the creator mutates the model
+        export_keys = [
+            EXPORT_RESULT_CACHE.get_key(pptx_model, export_options) if pptx_model else None
+            for pptx_model in pptx_models
+        ]
+        result.timings["resolve"] = time.perf_counter() - started_at
+
+        batch_dir = TEMP_FILE_SERVICE.create_temp_dir(f"batch-{uuid.uuid4()}")
+        try:
+            started_at = time.perf_counter()
+            asset_paths = await self._download_assets(
+                pptx_models, export_keys, export_options, batch_dir
+            )
+            result.timings["download"] = time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            semaphore = asyncio.Semaphore(self.concurrency)
+            cache_paths = await asyncio.gather(
+                *[
+                    self._export_deck(
+                        semaphore,
+                        deck,
+                        pptx_model,
+                        export_key,
+                        export_options,
+                        asset_paths,
+                        batch_dir,
+                    )
+                    for deck, pptx_model, export_key in zip(
+                        result.decks, pptx_models, export_keys
+                    )
+                ]
+            )
+            result.timings["export"] = time.perf_counter() - started_at
+        finally:
+            await TEMP_FILE_SERVICE.remove_temp_dir(batch_dir)
+
+        result.seconds = sum(result.timings.values())
+        return result, list(cache_paths)
+
+    @staticmethod
+    def _resolve_models(
+        items: List[BatchExportItemModel], decks: List[BatchExportDeckResultModel]
+    ) -> List[Optional[PptxPresentationModel]]:
+        pptx_models = []
+        for index, item in enumerate(items):
+            deck = BatchExportDeckResultModel(
+                index=index, presentation_id=item.presentation_id
+            )
+            decks.append(deck)
+
+            pptx_model = item.pptx_model
+            if pptx_model:
+                if item.presentation_id:
+                    PPTX_MODEL_STORE.save(item.presentation_id, pptx_model)
+            elif item.presentation_id:
+                pptx_model = PPTX_MODEL_STORE.load(item.presentation_id)
+                if not pptx_model:
+                    deck.error = "No exported model found for this presentation"
+            else:
+                deck.error = "Either pptx_model or presentation_id is required"
+
+            if pptx_model:
+                deck.name = pptx_model.name
+            else:
+                deck.status = ExportJobStatus.FAILED
+            pptx_models.append(pptx_model)
+        return pptx_models
+
+    @staticmethod
+    def _get_network_urls(
+        pptx_model: PptxPresentationModel,
+        export_options: Optional[PptxExportOptionsModel],
+    ) -> List[str]:
+        """Urls the creator would download, slides in the slide part cache are skipped"""
+        # The creator keys slides with its default options when none are given
+        export_options = export_options or PptxExportOptionsModel()
+        shapes = list(pptx_model.shapes or [])
+        for slide_model in pptx_model.slides:
+            key = SLIDE_PART_CACHE.get_key(slide_model, export_options)
+            if not os.path.isfile(SLIDE_PART_CACHE.get_path(f"{key}.json")):
+                shapes.extend(slide_model.shapes)
+        return [
+            shape.picture.path
+            for shape in shapes
+            if isinstance(shape, PptxPictureBoxModel)
+            and shape.picture.path.startswith("http")
+            and "app_data" not in shape.picture.path
+        ]
+
+    async def _download_assets(
+        self,
+        pptx_models: List[Optional[PptxPresentationModel]],
+        export_keys: List[Optional[str]],
+        export_options: Optional[PptxExportOptionsModel],
+        batch_dir: str,
+    ) -> Dict[str, str]:
+        """Downloads each network picture once for all the decks still to build"""
+        urls: List[str] = []
+        for pptx_model, export_key in zip(pptx_models, export_keys):
+            if not pptx_model:
+                continue
+            if await asyncio.to_thread(EXPORT_RESULT_CACHE.lookup, export_key):
+                continue
+            urls.extend(self._get_network_urls(pptx_model, export_options))
+
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        results = await ASSET_DOWNLOADER.download_all(urls, batch_dir)
+        return {result.url: result.path for result in results if result.ok}
+
+    async def _export_deck(
+        self,
+        semaphore: asyncio.Semaphore,
+        deck: BatchExportDeckResultModel,
+        pptx_model: Optional[PptxPresentationModel],
+        export_key: Optional[str],
+        export_options: Optional[PptxExportOptionsModel],
+        asset_paths: Dict[str, str],
+        batch_dir: str,
+    ) -> Optional[str]:
+        if not pptx_model:
+            return None
+
+        async with semaphore:
+            deck.status = ExportJobStatus.RUNNING
+            started_at = time.perf_counter()
+            temp_dir = TEMP_FILE_SERVICE.create_dir_in_dir(batch_dir, f"deck-{deck.index}")
+            pptx_creator = PptxPresentationCreator(
+                pptx_model, temp_dir, export_options, asset_paths=asset_paths
+            )
+
+            async def build(path: str):
+                await pptx_creator.create_ppt()
+                await asyncio.to_thread(pptx_creator.save, path)
+
+            try:
+                cache_path, deck.cache = await EXPORT_RESULT_CACHE.get_or_build(
+                    export_key, build
+                )
+                deck.file_bytes = os.path.getsize(cache_path)
+                deck.status = ExportJobStatus.COMPLETED
+                return cache_path
+            except Exception as e:
+                deck.error = str(e)
+                deck.status = ExportJobStatus.FAILED
+                print(f"Batch export of deck {deck.index} failed: {e}")
+                return None
+            finally:
+                deck.timings = dict(pptx_creator.timings)
+                deck.seconds = time.perf_counter() - started_at
+
+    @staticmethod
+    def _get_filenames(
+        decks: List[BatchExportDeckResultModel], cache_paths: List[Optional[str]]
+    ) -> List[Optional[str]]:
+        """Decks sharing a name are numbered so none overwrites another"""
+        filenames = []
+        used = set()
+        for deck, cache_path in zip(decks, cache_paths):
+            if not cache_path:
+                filenames.append(None)
+                continue
+            stem = os.path.basename(deck.name or f"presentation-{deck.index + 1}")
+            filename = f"{stem}.pptx"
+            copy = 2
+            while filename in used:
+                filename = f"{stem} ({copy}).pptx"
+                copy += 1
+            used.add(filename)
+            filenames.append(filename)
+        return filenames
+
+    @staticmethod
+    def _write_zip(
+        zip_path: str,
+        result: BatchExportResultModel,
+        cache_paths: List[Optional[str]],
+    ):
+        filenames = BatchExportService._get_filenames(result.decks, cache_paths)
+        # Decks are zip files already, they are stored as they are
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as zip_file:
+            for deck, cache_path, filename in zip(result.decks, cache_paths, filenames):
+                if not cache_path:
+                    continue
+                zip_file.write(cache_path, filename)
+                deck.path = filename
+            zip_file.writestr(
+                "manifest.json",
+                result.model_dump_json(indent=2),
+                compress_type=zipfile.ZIP_DEFLATED,
+            )
+
+
+BATCH_EXPORT_SERVICE = BatchExportService()
@@ -0,0 +1,81 @@
+import os
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Imported so their tables are created
+from models.sql.key_value import KeyValueSqlModel  # noqa: F401
+from models.sql.ollama_pull_status import OllamaPullStatus  # noqa: F401
+from models.sql.presentation_layout_code import PresentationLayoutCodeModel  # noqa: F401
+from models.sql.presentation_sql import PresentationSqlModel  # noqa: F401
+from models.sql.slide import SlideModel  # noqa: F401
+from models.sql.template import TemplateModel  # noqa: F401
+from utils.get_env import get_app_data_directory_env, get_database_url_env
+
+# Sync driver urls are switched to their asyncio driver
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+_ENGINE: Optional[AsyncEngine] = None
+_SESSION_MAKER: Optional[async_sessionmaker] = None
+
+
+def get_database_url() -> str:
+    """DATABASE_URL if set, a SQLite file in the app data directory otherwise"""
+    database_url = get_database_url_env()
+    if not database_url:
+        return "sqlite+aiosqlite:///" + os.path.join(
+            get_app_data_directory_env(), "td_smart_ppt.db"
+        )
+    scheme, separator, rest = database_url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+def _set_sqlite_pragmas(dbapi_connection, _):
+    cursor = dbapi_connection.cursor()
+    # Readers never wait on the writer, workers share the file safely
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def get_engine() -> AsyncEngine:
+    """Shared async engine, created on first use"""
+    global _ENGINE
+    if _ENGINE is None:
+        database_url = get_database_url()
+        _ENGINE = create_async_engine(database_url)
+        if database_url.startswith("sqlite"):
+            event.listen(_ENGINE.sync_engine, "connect", _set_sqlite_pragmas)
+    return _ENGINE
+
+
+def get_session() -> AsyncSession:
+    global _SESSION_MAKER
+    if _SESSION_MAKER is None:
+        _SESSION_MAKER = async_sessionmaker(
+            get_engine(), class_=AsyncSession, expire_on_commit=False
+        )
+    return _SESSION_MAKER()
+
+
+async def create_tables():
+    async with get_engine().begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+
+async def dispose_engine():
+    global _ENGINE, _SESSION_MAKER
+    if _ENGINE is not None:
+        await _ENGINE.dispose()
+    _ENGINE = None
+    _SESSION_MAKER = None
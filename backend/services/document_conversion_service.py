@@ -0,0 +1,202 @@
+import asyncio
+import os
+import shutil
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from enums.conversion_format import ConversionFormat
+from services.office_worker import UNO_IN_PROCESS, OfficeWorker, find_uno_python
+from utils.asset_directory_utils import get_office_profiles_directory
+from utils.get_env import (
+    get_document_conversion_queue_size_env,
+    get_document_conversion_timeout_env,
+    get_document_conversion_workers_env,
+    get_soffice_path_env,
+    get_uno_python_path_env,
+)
+
+
+def remove_stale_profiles(profiles_directory: str):
+    """Profiles left behind by processes that exited without stopping the pool"""
+    for name in os.listdir(profiles_directory):
+        pid = name.split("-")[0]
+        if not pid.isdigit():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            shutil.rmtree(os.path.join(profiles_directory, name), True)
+        except PermissionError:
+            pass
+
+
+class DocumentConversionService:
+    """
+    Converts generated decks to PDF, or to a PNG per slide, with a pool of
+    headless LibreOffice workers started once and reused.
+    - Conversions wait in a bounded queue, submitting to a full queue fails
+    right away instead of piling up work.
+    - A conversion running past `timeout` seconds kills and restarts its
+    worker's process and fails.
+    - A worker whose process crashed is restarted and the conversion retried
+    once.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.workers = workers or int(get_document_conversion_workers_env() or 2)
+        self.queue_size = queue_size or int(
+            get_document_conversion_queue_size_env() or 16
+        )
+        self.timeout = timeout or float(get_document_conversion_timeout_env() or 120)
+        self.soffice_path = (
+            get_soffice_path_env()
+            or shutil.which("soffice")
+            or shutil.which("libreoffice")
+        )
+        self.uno_python: Optional[str] = None
+        self._office_workers: List[OfficeWorker] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def available(self) -> bool:
+        return bool(self.soffice_path)
+
+    @property
+    def queued_jobs(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self):
+        """Starts the workers on the running loop, safe to call more than once"""
+        if self._tasks or not self.available:
+            return
+        profiles_directory = get_office_profiles_directory()
+        remove_stale_profiles(profiles_directory)
+        self.uno_python = find_uno_python(self.soffice_path, get_uno_python_path_env())
+        if self.uno_python:
+            print(f"LibreOffice workers convert through {self.uno_python}")
+        elif not UNO_IN_PROCESS:
+            print(
+                "WARNING: no python with python3-uno found, LibreOffice starts for "
+                "every conversion. Install python3-uno or set UNO_PYTHON_PATH."
+            )
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._office_workers = [
+            OfficeWorker(
+                index,
+                self.soffice_path,
+                # Profiles are per process, uvicorn workers may run side by side
+                os.path.join(profiles_directory, f"{os.getpid()}-{index}"),
+                self.uno_python,
+            )
+            for index in range(self.workers)
+        ]
+        self._tasks = [
+            asyncio.create_task(self._run_worker(office_worker))
+            for office_worker in self._office_workers
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for office_worker in self._office_workers:
+            await office_worker.stop()
+            await asyncio.to_thread(
+                shutil.rmtree, office_worker.profile_directory, True
+            )
+        self._tasks = []
+        self._office_workers = []
+        self._queue = None
+
+    async def convert(
+        self,
+        input_path: str,
+        output_directory: str,
+        conversion_format: ConversionFormat,
+        width: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Queues a conversion and waits for the converted files, raises
+        asyncio.QueueFull when the queue is at capacity.
+        """
+        self.start()
+        if not self.available:
+            raise HTTPException(
+                status_code=503, detail="LibreOffice is not installed on the server"
+            )
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(
+            (input_path, output_directory, conversion_format, width, future)
+        )
+        return await future
+
+    async def _run_worker(self, office_worker: OfficeWorker):
+        try:
+            await office_worker.start()
+        except Exception as e:
+            # Retried by the first conversion the worker takes
+            print(f"LibreOffice worker {office_worker.index} failed to start: {e}")
+
+        while True:
+            input_path, output_directory, conversion_format, width, future = (
+                await self._queue.get()
+            )
+            try:
+                # The caller went away while queued
+                if future.done():
+                    continue
+                paths = await self._convert(
+                    office_worker, input_path, output_directory, conversion_format, width
+                )
+                if not future.done():
+                    future.set_result(paths)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _convert(
+        self,
+        office_worker: OfficeWorker,
+        input_path: str,
+        output_directory: str,
+        conversion_format: ConversionFormat,
+        width: Optional[int],
+    ) -> List[str]:
+        for attempt in range(2):
+            if not office_worker.healthy:
+                await office_worker.restart()
+            try:
+                return await asyncio.wait_for(
+                    office_worker.convert(
+                        input_path, output_directory, conversion_format, width
+                    ),
+                    self.timeout,
+                )
+            except asyncio.TimeoutError:
+                print(
+                    f"LibreOffice worker {office_worker.index} timed out converting "
+                    f"{input_path}, restarting"
+                )
+                await office_worker.restart()
+                raise RuntimeError(f"Conversion timed out after {self.timeout}s")
+            except Exception as e:
+                # A document that fails to convert is not retried, a crash is
+                if office_worker.healthy or attempt:
+                    raise
+                print(f"LibreOffice worker {office_worker.index} crashed: {e}")
+
+
+DOCUMENT_CONVERSION_SERVICE = DocumentConversionService()
@@ -0,0 +1,186 @@
+import asyncio
+from collections import OrderedDict
+import os
+from typing import Dict, List, Optional
+import uuid
+
+from enums.export_job_status import ExportJobStatus
+from models.export_job import ExportJobModel
+from models.pptx_export_options import PptxExportOptionsModel
+from models.pptx_models import PptxPresentationModel
+from services.export_result_cache import EXPORT_RESULT_CACHE
+from services.pptx_presentation_creator import PptxPresentationCreator
+from services.temp_file_service import TEMP_FILE_SERVICE
+from utils.asset_directory_utils import get_exports_directory
+from utils.datetime_utils import get_current_utc_datetime
+from utils.get_env import (
+    get_export_job_concurrency_env,
+    get_export_job_queue_size_env,
+)
+
+# Finished jobs kept around for polling and result downloads
+MAX_FINISHED_JOBS = 256
+
+# Share of the overall progress reached at the start of each phase
+PHASE_PROGRESS = {
+    "download": (0.0, 0.1),
+    "pictures": (0.1, 0.4),
+    "assembly": (0.4, 0.9),
+    "save": (0.9, 1.0),
+}
+
+
+class ExportJobService:
+    """
+    Runs pptx exports as background jobs.
+    - A fixed number of workers take jobs from a bounded queue, so heavy
+    exports never run more than `concurrency` at a time.
+    - Submitting to a full queue fails right away instead of piling up work.
+    - Progress is read from the running creator, per phase and per slide.
+    """
+
+    def __init__(
+        self, concurrency: Optional[int] = None, queue_size: Optional[int] = None
+    ):
+        self.concurrency = concurrency or int(get_export_job_concurrency_env() or 2)
+        self.queue_size = queue_size or int(get_export_job_queue_size_env() or 32)
+        self._jobs: "OrderedDict[str, ExportJobModel]" = OrderedDict()
+        self._creators: Dict[str, PptxPresentationCreator] = {}
+        self._file_paths: Dict[str, str] = {}
+        self._filenames: Dict[str, str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        """Starts the workers on the running loop, safe to call more than once"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._run_worker()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def submit(
+        self,
+        pptx_model: PptxPresentationModel,
+        export_options: Optional[PptxExportOptionsModel] = None,
+    ) -> ExportJobModel:
+        """Queues an export, raises asyncio.QueueFull when the queue is at capacity"""
+        self.start()
+
+        job = ExportJobModel(id=str(uuid.uuid4()), total_slides=len(pptx_model.slides))
+        self._queue.put_nowait((job.id, pptx_model, export_options))
+        self._jobs[job.id] = job
+        return job
+
+    def get_job(self, job_id: str) -> Optional[ExportJobModel]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        pptx_creator = self._creators.get(job_id)
+        if pptx_creator and pptx_creator.phase:
+            job.phase = pptx_creator.phase
+            job.completed_slides = pptx_creator.completed_slides
+            job.progress = round(self._get_progress(pptx_creator), 3)
+        return job
+
+    def get_file_path(self, job_id: str) -> Optional[str]:
+        return self._file_paths.get(job_id)
+
+    def get_filename(self, job_id: str) -> Optional[str]:
+        """Download name of the result, the file itself is unique to the job"""
+        return self._filenames.get(job_id)
+
+    @property
+    def queued_jobs(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    @property
+    def running_jobs(self) -> int:
+        return len(self._creators)
+
+    def _get_progress(self, pptx_creator: PptxPresentationCreator) -> float:
+        start, end = PHASE_PROGRESS.get(pptx_creator.phase, (0.0, 0.0))
+        if pptx_creator.phase == "assembly" and pptx_creator.total_slides:
+            return start + (end - start) * (
+                pptx_creator.completed_slides / pptx_creator.total_slides
+            )
+        return start
+
+    async def _run_worker(self):
+        while True:
+            job_id, pptx_model, export_options = await self._queue.get()
+            try:
+                await self._run_job(job_id, pptx_model, export_options)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(
+        self,
+        job_id: str,
+        pptx_model: PptxPresentationModel,
+        export_options: Optional[PptxExportOptionsModel],
+    ):
+        job = self._jobs[job_id]
+        job.status = ExportJobStatus.RUNNING
+        job.started_at = get_current_utc_datetime()
+
+        temp_dir = TEMP_FILE_SERVICE.create_temp_dir(job_id)
+        export_key = EXPORT_RESULT_CACHE.get_key(pptx_model, export_options)
+        pptx_creator = PptxPresentationCreator(pptx_model, temp_dir, export_options)
+        self._creators[job_id] = pptx_creator
+
+        async def build(path: str):
+            await pptx_creator.create_ppt()
+            await asyncio.to_thread(pptx_creator.save, path)
+
+        try:
+            cache_path, cache_status = await EXPORT_RESULT_CACHE.get_or_build(
+                export_key, build
+            )
+            # Jobs for decks with the same name must not share the file
+            stored_filename = f"{job_id}.pptx"
+            if pptx_model.name:
+                stored_filename = f"{pptx_model.name}-{job_id}.pptx"
+            pptx_path = os.path.join(get_exports_directory(), stored_filename)
+            await asyncio.to_thread(EXPORT_RESULT_CACHE.publish, cache_path, pptx_path)
+
+            self.get_job(job_id)
+            self._file_paths[job_id] = pptx_path
+            self._filenames[job_id] = f"{pptx_model.name or job_id}.pptx"
+            job.path = f"./api/app_data/exports/{stored_filename}"
+            job.progress = 1.0
+            job.status = ExportJobStatus.COMPLETED
+            print(
+                f"Export job {job_id} finished ({cache_status}): {pptx_creator.timings}"
+            )
+        except Exception as e:
+            self.get_job(job_id)
+            job.error = str(e)
+            job.status = ExportJobStatus.FAILED
+            print(f"Export job {job_id} failed: {e}")
+        finally:
+            job.timings = dict(pptx_creator.timings)
+            job.peak_memory_bytes = pptx_creator.peak_memory_bytes
+            job.finished_at = get_current_utc_datetime()
+            self._creators.pop(job_id, None)
+            self._remove_finished_jobs()
+            await TEMP_FILE_SERVICE.remove_temp_dir(temp_dir)
+
+    def _remove_finished_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            self._jobs.pop(job_id, None)
+            self._file_paths.pop(job_id, None)
+            self._filenames.pop(job_id, None)
+
+
+EXPORT_JOB_SERVICE = ExportJobService()
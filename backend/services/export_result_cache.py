@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import uuid
+
+from models.pptx_export_options import PptxExportOptionsModel
+from models.pptx_models import PptxPresentationModel
+from services.processed_image_cache import link_or_copy
+from utils.asset_directory_utils import get_export_cache_directory
+from utils.get_env import get_export_result_cache_ttl_env
+
+# Bump when the creator output changes, old decks are then never hit
+EXPORT_RESULT_CACHE_VERSION = 1
+
+
+class ExportResultCache:
+    """
+    Finished decks keyed by a canonical hash of the pptx model and the export
+    options.
+    - A hit reuses the deck built earlier, within `ttl` seconds since remote
+    pictures may change behind the same url.
+    - Concurrent identical exports wait on the one build in flight, which
+    outlives a cancelled caller while others still wait on it.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None):
+        self._directory = directory
+        self.ttl = ttl or float(get_export_result_cache_ttl_env() or 3600)
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> str:
+        if not self._directory:
+            self._directory = get_export_cache_directory()
+        return self._directory
+
+    @staticmethod
+    def get_key(
+        pptx_model: PptxPresentationModel,
+        export_options: Optional[PptxExportOptionsModel] = None,
+    ) -> str:
+        """Computed before the export, the creator mutates the model"""
+        parameters = {
+            "version": EXPORT_RESULT_CACHE_VERSION,
+            "model": pptx_model.model_dump(mode="json"),
+            "export_options": (
+                export_options.model_dump(mode="json") if export_options else None
+            ),
+        }
+        return hashlib.sha256(
+            json.dumps(
+                parameters, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pptx")
+
+    def lookup(self, key: str) -> Optional[str]:
+        path = self.get_path(key)
+        try:
+            modified_at = os.stat(path).st_mtime
+        except OSError:
+            return None
+        if time.time() - modified_at > self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return path
+
+    async def get_or_build(
+        self, key: str, build: Callable[[str], Awaitable[None]]
+    ) -> Tuple[str, str]:
+        """
+        Returns the cached deck path and how it was obtained: "hit",
+        "coalesced" or "miss". On a miss `build` saves the deck to the path
+        it is given.
+        """
+        while True:
+            path = await asyncio.to_thread(self.lookup, key)
+            if path:
+                self.hits += 1
+                return path, "hit"
+
+            pending = self._pending.get(key)
+            if not pending:
+                break
+            self.coalesced += 1
+            self._waiters[key] = self._waiters.get(key, 0) + 1
+            try:
+                # Shielded, a cancelled waiter does not cancel the shared build
+                return await asyncio.shield(pending), "coalesced"
+            except asyncio.CancelledError:
+                # The build was abandoned by its caller, this waiter builds
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            finally:
+                self._waiters[key] -= 1
+                if not self._waiters[key]:
+                    del self._waiters[key]
+
+        self.misses += 1
+        pending = asyncio.create_task(self._build(key, build))
+        self._pending[key] = pending
+        try:
+            return await asyncio.shield(pending), "miss"
+        except asyncio.CancelledError:
+            # `build` may use files its caller removes once this returns, the
+            # build is finished for the waiters or stopped before returning
+            if not self._waiters.get(key):
+                pending.cancel()
+            await asyncio.wait({pending})
+            raise
+        finally:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+            if pending.done() and not pending.cancelled():
+                # Waiters get the error, nobody else has to retrieve it
+                pending.exception()
+
+    async def _build(self, key: str, build: Callable[[str], Awaitable[None]]) -> str:
+        path = self.get_path(key)
+        temp_path = f"{path}.{uuid.uuid4()}.tmp"
+        try:
+            await build(temp_path)
+            await asyncio.to_thread(os.replace, temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return path
+
+    @staticmethod
+    def publish(cache_path: str, export_path: str):
+        """Links a cached deck to its export path, unless it is already there"""
+        try:
+            if os.path.samefile(cache_path, export_path):
+                return
+        except OSError:
+            pass
+        temp_path = f"{export_path}.{uuid.uuid4()}.tmp"
+        link_or_copy(cache_path, temp_path)
+        os.replace(temp_path, export_path)
+
+
+EXPORT_RESULT_CACHE = ExportResultCache()
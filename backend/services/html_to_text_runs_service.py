@@ -1,8 +1,14 @@
 from html.parser import HTMLParser
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from models.pptx_models import PptxFontModel, PptxTextRunModel
 
+BOLD_TAGS = frozenset(("strong", "b"))
+ITALIC_TAGS = frozenset(("em", "i"))
+UNDERLINE_TAGS = frozenset(("u",))
+STRIKE_TAGS = frozenset(("s", "strike", "del"))
+CODE_TAGS = frozenset(("code",))
+
 
 class InlineHTMLToRunsParser(HTMLParser):
     def __init__(self, base_font: PptxFontModel):
@@ -10,32 +16,47 @@ class InlineHTMLToRunsParser(HTMLParser):
         self.base_font = base_font
         self.tag_stack: List[str] = []
         self.text_runs: List[PptxTextRunModel] = []
+        # (bold, italic, underline, strike, code) -> derived font
+        self._fonts: Dict[Tuple[bool, ...], PptxFontModel] = {}
 
     def _current_font(self) -> PptxFontModel:
-        font_json = self.base_font.model_dump()
-        is_bold = any(tag in ("strong", "b") for tag in self.tag_stack)
-        is_italic = any(tag in ("em", "i") for tag in self.tag_stack)
-        is_underline = any(tag == "u" for tag in self.tag_stack)
-        is_strike = any(tag in ("s", "strike", "del") for tag in self.tag_stack)
-        is_code = any(tag == "code" for tag in self.tag_stack)
+        tags = set(self.tag_stack)
+        style = (
+            not tags.isdisjoint(BOLD_TAGS),
+            not tags.isdisjoint(ITALIC_TAGS),
+            not tags.isdisjoint(UNDERLINE_TAGS),
+            not tags.isdisjoint(STRIKE_TAGS),
+            not tags.isdisjoint(CODE_TAGS),
+        )
+        font = self._fonts.get(style)
+        if font is None:
+            font = self._fonts[style] = self._derive_font(*style)
+        return font
 
+    def _derive_font(
+        self, is_bold: bool, is_italic: bool, is_underline: bool, is_strike: bool, is_code: bool
+    ) -> PptxFontModel:
+        update = {}
         if is_bold:
-            font_json["font_weight"] = 700
+            update["font_weight"] = 700
         if is_italic:
-            font_json["italic"] = True
+            update["italic"] = True
         if is_underline:
-            font_json["underline"] = True
+            update["underline"] = True
         if is_strike:
-            font_json["strike"] = True
+            update["strike"] = True
         if is_code:
-            font_json["name"] = "Courier New"
+            update["name"] = "Courier New"
 
-        return PptxFontModel(**font_json)
+        # Fonts are only read by the creator, unstyled text shares the base font
+        if not update:
+            return self.base_font
+        return self.base_font.model_copy(update=update)
 
     def handle_starttag(self, tag, attrs):
         tag = tag.lower()
         if tag == "br":
-            self.text_runs.append(PptxTextRunModel(text="\n"))
+            self.text_runs.append(PptxTextRunModel.model_construct(text="\n", font=None))
             return
         self.tag_stack.append(tag)
 
@@ -49,17 +70,35 @@ class InlineHTMLToRunsParser(HTMLParser):
     def handle_data(self, data):
         if data == "":
             return
-        self.text_runs.append(PptxTextRunModel(text=data, font=self._current_font()))
+        self.text_runs.append(
+            PptxTextRunModel.model_construct(text=data, font=self._current_font())
+        )
+
+
+def parse_plain_text_to_text_runs(
+    text: str, base_font: PptxFontModel
+) -> List[PptxTextRunModel]:
+    """Same runs as the parser gives for text without tags or entities"""
+    text_runs = []
+    for index, line in enumerate(text.split("\n")):
+        if index > 0:
+            text_runs.append(PptxTextRunModel.model_construct(text="\n", font=None))
+        if line:
+            text_runs.append(PptxTextRunModel.model_construct(text=line, font=base_font))
+    return text_runs
 
 
 def parse_html_text_to_text_runs(
     text: str, base_font: Optional[PptxFontModel] = None
 ) -> List[PptxTextRunModel]:
     normalized_text = text.replace("\r\n", "\n").replace("\r", "\n")
+    base_font = base_font if base_font else PptxFontModel()
+
+    if "<" not in normalized_text and "&" not in normalized_text:
+        return parse_plain_text_to_text_runs(normalized_text, base_font)
+
     normalized_text = normalized_text.replace("\n", "<br>")
 
-    parser = InlineHTMLToRunsParser(base_font if base_font else PptxFontModel())
+    parser = InlineHTMLToRunsParser(base_font)
     parser.feed(normalized_text)
     return parser.text_runs
-
-
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import List, Optional
+import uuid
+
+import numpy as np
+
+from services.icon_vector_index import IconVectorIndex
+from utils.get_env import get_icon_embeddings_directory_env
+
+# Bump when the artifact layout or the icon documents change
+ARTIFACT_VERSION = 1
+ICONS_CATALOGUE_PATH = "assets/icons.json"
+
+EMBEDDINGS_FILENAME = "embeddings.npy"
+IDS_FILENAME = "ids.json"
+MANIFEST_FILENAME = "manifest.json"
+
+
+def get_icon_embeddings_directory() -> str:
+    return get_icon_embeddings_directory_env() or "assets/icon_embeddings"
+
+
+def get_artifact_key(model_name: str, catalogue_path: str = ICONS_CATALOGUE_PATH) -> str:
+    """Hash of the icon catalogue, the embedding model and the artifact version"""
+    sha256 = hashlib.sha256(f"v{ARTIFACT_VERSION}:{model_name}:".encode("utf-8"))
+    with open(catalogue_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()[:16]
+
+
+def get_artifact_dir(key: str) -> str:
+    return os.path.join(get_icon_embeddings_directory(), key)
+
+
+def load_icon_embedding_artifact(key: str) -> Optional[IconVectorIndex]:
+    """
+    Memory maps a prebuilt artifact, so every worker shares the same pages.
+    Returns None when no artifact exists for the key.
+    """
+    artifact_dir = get_artifact_dir(key)
+    embeddings_path = os.path.join(artifact_dir, EMBEDDINGS_FILENAME)
+    if not os.path.exists(embeddings_path):
+        return None
+
+    embeddings = np.load(embeddings_path, mmap_mode="r")
+    with open(os.path.join(artifact_dir, IDS_FILENAME), "r") as f:
+        ids = json.load(f)
+
+    if len(ids) != len(embeddings):
+        print(f"Icon embedding artifact {key} is corrupted, ignoring it")
+        return None
+    return IconVectorIndex.from_normalized(ids, embeddings)
+
+
+def save_icon_embedding_artifact(
+    key: str, ids: List[str], embeddings, model_name: str
+) -> str:
+    artifact_dir = get_artifact_dir(key)
+    if os.path.exists(os.path.join(artifact_dir, EMBEDDINGS_FILENAME)):
+        return artifact_dir
+
+    # Written aside and renamed in place, workers starting together never
+    # read a partial artifact
+    scratch_dir = f"{artifact_dir}.{uuid.uuid4()}"
+    os.makedirs(scratch_dir)
+    try:
+        np.save(
+            os.path.join(scratch_dir, EMBEDDINGS_FILENAME),
+            IconVectorIndex.normalize(embeddings),
+        )
+        with open(os.path.join(scratch_dir, IDS_FILENAME), "w") as f:
+            json.dump(ids, f)
+        with open(os.path.join(scratch_dir, MANIFEST_FILENAME), "w") as f:
+            json.dump(
+                {
+                    "version": ARTIFACT_VERSION,
+                    "key": key,
+                    "model": model_name,
+                    "count": len(ids),
+                },
+                f,
+            )
+        try:
+            os.rename(scratch_dir, artifact_dir)
+        except OSError:
+            # Another worker published the same artifact first
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        raise
+
+    return artifact_dir
+
+
+def main():
+    """Precomputes the icon embeddings artifact: python -m services.icon_embedding_artifact"""
+    from services.icon_finder_service import IconFinderService
+
+    artifact_dir = IconFinderService().build_embedding_artifact()
+    print(f"Icon embedding artifact written to {artifact_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,173 @@
 import asyncio
 import json
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+from typing import List, Optional, Tuple
+
+from constants.images import PLACEHOLDER_ICON_URL
+from enums.icon_service_state import IconServiceState
+from models.icon_search_stats import IconSearchStats
+from models.icon_service_status import IconServiceStatus
+from services.icon_embedding_artifact import (
+    ICONS_CATALOGUE_PATH,
+    get_artifact_key,
+    load_icon_embedding_artifact,
+    save_icon_embedding_artifact,
+)
+from services.icon_lexical_index import IconLexicalIndex
+from services.icon_vector_index import IconVectorIndex
+from utils.get_env import get_icon_cache_size_env, get_icon_search_backend_env
+from utils.lru_cache import LRUCache
+
+EMBEDDING_BATCH_SIZE = 256
 
 
 class IconFinderService:
+    """
+    Icon search over the bold icon catalogue.
+    Construction is cheap, the embedding model and indexes are loaded by
+    warm_up, which the app starts in the background on startup. Until it is
+    ready, queries without a lexical match get placeholder icons.
+    """
+
     def __init__(self):
         self.collection_name = "icons"
-        self.client = chromadb.PersistentClient(
-            path="chroma", settings=Settings(anonymized_telemetry=False)
+        # "numpy" keeps an in-process index, "chroma" queries the persistent store
+        self.backend = (get_icon_search_backend_env() or "numpy").lower()
+        self.client = None
+        self.collection = None
+        self.embedding_function = None
+        self.index: Optional[IconVectorIndex] = None
+        self.lexical_index: Optional[IconLexicalIndex] = None
+        # query -> icon urls, in front of both the lexical and semantic search
+        self.cache: LRUCache[List[str]] = LRUCache(
+            int(get_icon_cache_size_env() or 2048)
+        )
+        self.lexical_hits = 0
+        self.semantic_lookups = 0
+        self.placeholder_lookups = 0
+
+        self.state = IconServiceState.PENDING
+        self.progress = 0.0
+        self.step: Optional[str] = None
+        self.error: Optional[str] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == IconServiceState.READY
+
+    def get_status(self) -> IconServiceStatus:
+        return IconServiceStatus(
+            state=self.state,
+            progress=round(self.progress, 3),
+            step=self.step,
+            error=self.error,
+            ready=self.ready,
+        )
+
+    def start_warm_up(self) -> asyncio.Task:
+        """Starts warm up in a worker thread, safe to call more than once"""
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(asyncio.to_thread(self.warm_up))
+        return self._warm_up_task
+
+    def warm_up(self):
+        if self.state in (IconServiceState.WARMING_UP, IconServiceState.READY):
+            return
+        self.state = IconServiceState.WARMING_UP
+        self.error = None
+        try:
+            print("Initializing icons collection...")
+            self._set_progress(0.0, "lexical_index")
+            self._initialize_lexical_index()
+            self._initialize_icons_collection()
+            self._set_progress(1.0, None)
+            self.state = IconServiceState.READY
+            print("Icons collection initialized.")
+        except Exception as e:
+            self.error = str(e)
+            self.state = IconServiceState.FAILED
+            print(f"Could not initialize icons collection: {e}")
+
+    def _set_progress(self, progress: float, step: Optional[str]):
+        self.progress = progress
+        self.step = step
+
+    def _load_embedding_function(self):
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+        if self.embedding_function is None:
+            embedding_function = ONNXMiniLM_L6_V2()
+            embedding_function.DOWNLOAD_PATH = "chroma/models"
+            embedding_function._download_model_if_not_exists()
+            self.embedding_function = embedding_function
+        return self.embedding_function
+
+    def _get_model_name(self) -> str:
+        return getattr(self.embedding_function, "MODEL_NAME", "all-MiniLM-L6-v2")
+
+    def _load_embedding_artifact(self) -> Optional[IconVectorIndex]:
+        try:
+            return load_icon_embedding_artifact(get_artifact_key(self._get_model_name()))
+        except Exception as e:
+            print(f"Could not load icon embedding artifact: {e}")
+            return None
+
+    def _save_embedding_artifact(self):
+        try:
+            save_icon_embedding_artifact(
+                get_artifact_key(self._get_model_name()),
+                self.index.ids,
+                self.index.embeddings,
+                self._get_model_name(),
+            )
+        except Exception as e:
+            print(f"Could not save icon embedding artifact: {e}")
+
+    def build_embedding_artifact(self) -> str:
+        """Embeds the icon catalogue into a versioned, memory mappable artifact"""
+        self._load_embedding_function()
+        ids, documents = self._load_icon_documents()
+        return save_icon_embedding_artifact(
+            get_artifact_key(self._get_model_name()),
+            ids,
+            self._embed_documents(documents),
+            self._get_model_name(),
         )
-        print("Initializing icons collection...")
-        self._initialize_icons_collection()
-        print("Icons collection initialized.")
 
     def _initialize_icons_collection(self):
-        self.embedding_function = ONNXMiniLM_L6_V2()
-        self.embedding_function.DOWNLOAD_PATH = "chroma/models"
-        self.embedding_function._download_model_if_not_exists()
+        self._set_progress(0.1, "embedding_model")
+        self._load_embedding_function()
+
+        if self.backend != "chroma":
+            # A prebuilt artifact means nothing has to be embedded on startup
+            self._set_progress(0.3, "embedding_artifact")
+            self.index = self._load_embedding_artifact()
+            if self.index is not None:
+                return
+
+        # Imported here, chromadb alone takes seconds to import
+        import chromadb
+        from chromadb.config import Settings
+
+        self._set_progress(0.3, "collection")
+        self.client = chromadb.PersistentClient(
+            path="chroma", settings=Settings(anonymized_telemetry=False)
+        )
         try:
             self.collection = self.client.get_collection(
                 self.collection_name, embedding_function=self.embedding_function
             )
         except Exception:
-            with open("assets/icons.json", "r") as f:
-                icons = json.load(f)
-
-            documents = []
-            ids = []
+            ids, documents = self._load_icon_documents()
 
-            for i, each in enumerate(icons["icons"]):
-                if each["name"].split("-")[-1] == "bold":
-                    doc_text = f"{each['name']} {each['tags']}"
-                    documents.append(doc_text)
-                    ids.append(each["name"])
+            if self.backend != "chroma":
+                # No need to build the HNSW store, embed straight into the index
+                if documents:
+                    self.index = IconVectorIndex(
+                        ids, self._embed_documents(documents)
+                    )
+                    self._save_embedding_artifact()
+                return
 
             if documents:
                 self.collection = self.client.create_collection(
@@ -44,13 +177,137 @@ class IconFinderService:
                 )
                 self.collection.add(documents=documents, ids=ids)
 
-    async def search_icons(self, query: str, k: int = 1):
-        result = await asyncio.to_thread(
-            self.collection.query,
-            query_texts=[query],
-            n_results=k,
+        if self.backend != "chroma" and self.collection:
+            self._set_progress(0.6, "vector_index")
+            stored = self.collection.get(include=["embeddings"])
+            self.index = IconVectorIndex(stored["ids"], stored["embeddings"])
+            self._save_embedding_artifact()
+
+    def _embed_documents(self, documents: List[str]):
+        import numpy as np
+
+        embeddings = []
+        for start in range(0, len(documents), EMBEDDING_BATCH_SIZE):
+            self._set_progress(
+                0.3 + 0.7 * start / len(documents), "embedding_icons"
+            )
+            embeddings.extend(
+                self.embedding_function(
+                    documents[start : start + EMBEDDING_BATCH_SIZE]
+                )
+            )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _initialize_lexical_index(self):
+        try:
+            self.lexical_index = IconLexicalIndex(self._load_icons())
+        except Exception as e:
+            print(f"Could not build icons lexical index: {e}")
+
+    def _load_icons(self) -> List[dict]:
+        with open(ICONS_CATALOGUE_PATH, "r") as f:
+            icons = json.load(f)
+
+        return [
+            each for each in icons["icons"] if each["name"].split("-")[-1] == "bold"
+        ]
+
+    def _load_icon_documents(self) -> Tuple[List[str], List[str]]:
+        documents = []
+        ids = []
+
+        for each in self._load_icons():
+            doc_text = f"{each['name']} {each['tags']}"
+            documents.append(doc_text)
+            ids.append(each["name"])
+
+        return ids, documents
+
+    def _search_index(self, queries: List[str], k: int) -> List[List[str]]:
+        # One batched ONNX run embeds every query
+        query_embeddings = self.embedding_function(queries)
+        return self.index.search(query_embeddings, k)
+
+    def _search_collection(self, queries: List[str], k: int) -> List[List[str]]:
+        result = self.collection.query(query_texts=queries, n_results=k)
+        return result["ids"]
+
+    async def search_icons_batch(
+        self, queries: List[str], k: int = 1
+    ) -> List[List[str]]:
+        """
+        Searches icons for all queries at once, results follow queries order.
+        - Cached results answer first.
+        - Then an exact or lexical match on icon names and tags.
+        - Only the remaining queries are embedded for the semantic search,
+        or get a placeholder icon while the service is still warming up.
+        """
+        if not queries:
+            return []
+
+        icon_urls = {}
+        semantic_queries = []
+        for query in dict.fromkeys(queries):
+            cache_key = self._get_cache_key(query, k)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                icon_urls[query] = cached
+                continue
+
+            icon_ids = self.lexical_index.search(query, k) if self.lexical_index else None
+            if icon_ids:
+                self.lexical_hits += 1
+                icon_urls[query] = self._get_icon_urls(icon_ids)
+                self.cache.set(cache_key, icon_urls[query])
+                continue
+
+            semantic_queries.append(query)
+
+        if semantic_queries and not self.ready:
+            # Not cached, the real icons are found once warm up is done
+            self.placeholder_lookups += len(semantic_queries)
+            for query in semantic_queries:
+                icon_urls[query] = [PLACEHOLDER_ICON_URL]
+            semantic_queries = []
+
+        if semantic_queries:
+            self.semantic_lookups += len(semantic_queries)
+            if self.index is not None:
+                semantic_ids = await asyncio.to_thread(
+                    self._search_index, semantic_queries, k
+                )
+            else:
+                semantic_ids = await asyncio.to_thread(
+                    self._search_collection, semantic_queries, k
+                )
+            for query, icon_ids in zip(semantic_queries, semantic_ids):
+                icon_urls[query] = self._get_icon_urls(icon_ids)
+                self.cache.set(self._get_cache_key(query, k), icon_urls[query])
+
+        return [icon_urls[query] for query in queries]
+
+    def _get_cache_key(self, query: str, k: int):
+        return " ".join(query.lower().split()), k
+
+    def _get_icon_urls(self, icon_ids: List[str]) -> List[str]:
+        return [f"/static/icons/bold/{each}.svg" for each in icon_ids]
+
+    def get_stats(self) -> IconSearchStats:
+        lookups = self.cache.hits + self.cache.misses
+        return IconSearchStats(
+            lookups=lookups,
+            cache_hits=self.cache.hits,
+            lexical_hits=self.lexical_hits,
+            semantic_lookups=self.semantic_lookups,
+            placeholder_lookups=self.placeholder_lookups,
+            cache_hit_ratio=self.cache.hits / lookups if lookups else 0.0,
+            lexical_hit_ratio=self.lexical_hits / lookups if lookups else 0.0,
+            semantic_ratio=self.semantic_lookups / lookups if lookups else 0.0,
+            cache_size=len(self.cache),
         )
-        return [f"/static/icons/bold/{each}.svg" for each in result["ids"][0]]
+
+    async def search_icons(self, query: str, k: int = 1):
+        return (await self.search_icons_batch([query], k))[0]
 
 
 ICON_FINDER_SERVICE = IconFinderService()
@@ -0,0 +1,91 @@
+import re
+from typing import Dict, List, Optional, Set
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class IconLexicalIndex:
+    """
+    Inverted index over icon names and tags.
+    Answers queries whose every token is found in an icon name or its tags,
+    anything else is left to the semantic search.
+    """
+
+    def __init__(self, icons: List[dict]):
+        self.ids: List[str] = []
+        self._name_token_counts: List[int] = []
+        self._names: Dict[str, int] = {}
+        self._name_postings: Dict[str, Set[int]] = {}
+        self._tag_postings: Dict[str, Set[int]] = {}
+
+        for index, each in enumerate(icons):
+            self.ids.append(each["name"])
+
+            # "chart-line-bold" is found by "chart line"
+            name_tokens = tokenize(each["name"])
+            if name_tokens and name_tokens[-1] == "bold":
+                name_tokens = name_tokens[:-1]
+            self._names.setdefault("-".join(name_tokens), index)
+            self._name_token_counts.append(len(name_tokens))
+            for token in name_tokens:
+                self._name_postings.setdefault(token, set()).add(index)
+
+            tags = each.get("tags") or []
+            if isinstance(tags, str):
+                tags = [tags]
+            for tag in tags:
+                for token in tokenize(tag):
+                    self._tag_postings.setdefault(token, set()).add(index)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _get_token_postings(self, token: str):
+        name_postings = self._name_postings.get(token)
+        tag_postings = self._tag_postings.get(token)
+        if not name_postings and not tag_postings and token.endswith("s"):
+            # Cheap plural handling, "charts" -> "chart"
+            return self._get_token_postings(token[:-1])
+        return name_postings or set(), tag_postings or set()
+
+    def search(self, query: str, k: int = 1) -> Optional[List[str]]:
+        """Returns k icon ids or None when the query has no full lexical match"""
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+
+        exact_index = self._names.get("-".join(tokens))
+        if exact_index is not None and k == 1:
+            return [self.ids[exact_index]]
+
+        scores: Dict[int, int] = {}
+        candidates: Optional[Set[int]] = None
+        for token in tokens:
+            name_postings, tag_postings = self._get_token_postings(token)
+            matches = name_postings | tag_postings
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return None
+            # Matches on the name weigh more than matches on tags
+            for index in name_postings:
+                scores[index] = scores.get(index, 0) + 2
+            for index in tag_postings:
+                scores[index] = scores.get(index, 0) + 1
+
+        if len(candidates) < k:
+            return None
+
+        ranked = sorted(
+            candidates,
+            key=lambda index: (
+                index != exact_index,
+                -scores[index],
+                self._name_token_counts[index],
+                self.ids[index],
+            ),
+        )
+        return [self.ids[index] for index in ranked[:k]]
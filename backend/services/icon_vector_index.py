@@ -0,0 +1,57 @@
+from typing import List, Sequence
+
+import numpy as np
+
+
+class IconVectorIndex:
+    """
+    In-memory cosine similarity index over icon embeddings.
+    Embeddings are kept as a row normalised float32 matrix so a batch of
+    queries is scored with a single matrix multiply.
+    """
+
+    def __init__(self, ids: Sequence[str], embeddings: np.ndarray):
+        if len(ids) != len(embeddings):
+            raise ValueError("Icon Vector Index - ids and embeddings length differ")
+
+        self.ids = list(ids)
+        self.embeddings = self.normalize(embeddings)
+
+    @classmethod
+    def from_normalized(cls, ids: Sequence[str], embeddings: np.ndarray):
+        """Wraps already normalised float32 embeddings (e.g. a memory map) without copying"""
+        index = cls.__new__(cls)
+        index.ids = list(ids)
+        index.embeddings = embeddings
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def normalize(embeddings) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+    def search(self, query_embeddings, k: int = 1) -> List[List[str]]:
+        """Returns the ids of the k most similar icons for every query row"""
+        if not self.ids:
+            return [[] for _ in range(len(query_embeddings))]
+
+        k = max(1, min(k, len(self.ids)))
+        scores = self.normalize(query_embeddings) @ self.embeddings.T
+
+        if k == 1:
+            top_indexes = np.argmax(scores, axis=1).reshape(-1, 1)
+        else:
+            top_indexes = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top_indexes, axis=1)
+            top_indexes = np.take_along_axis(
+                top_indexes, np.argsort(-top_scores, axis=1), axis=1
+            )
+
+        return [[self.ids[index] for index in row] for row in top_indexes]
@@ -0,0 +1,321 @@
+import asyncio
+from contextlib import contextmanager
+import fcntl
+import json
+import os
+import re
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple
+import uuid
+
+from PIL import Image
+
+from constants.images import IMAGE_VARIANT_JPEG_QUALITY, IMAGE_VARIANT_MAX_SIZES
+from enums.image_variant import ImageVariant
+from models.sql.image_asset import ImageAsset
+from utils.asset_directory_utils import get_assets_directory
+from utils.etag_utils import hash_file
+
+MANIFEST_FILENAME = "manifest.json"
+CONTENT_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+CONTENT_HASH_PATH_PATTERN = re.compile(r"assets/[0-9a-f]{2}/([0-9a-f]{64})(?:/|$)")
+
+
+class ImageAssetStore:
+    """
+    Content addressed image store.
+    - Every image is stored once under the sha256 of its bytes.
+    - Thumbnail and slide sized variants are generated once on ingest.
+    - Presentations hold references, an asset is deleted with its last reference.
+    - References change under a file lock on the manifest read from disk, so
+    workers sharing the store never act on each other's stale copy.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None):
+        self._base_dir = base_dir
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # content hash -> ((inode, mtime) of the manifest file, manifest)
+        self._manifests: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+
+    @property
+    def base_dir(self) -> str:
+        if not self._base_dir:
+            self._base_dir = get_assets_directory()
+        return self._base_dir
+
+    def get_asset_dir(self, content_hash: str) -> str:
+        return os.path.join(self.base_dir, content_hash[:2], content_hash)
+
+    @staticmethod
+    def is_content_hash(value: str) -> bool:
+        return bool(CONTENT_HASH_PATTERN.match(value))
+
+    @staticmethod
+    def find_content_hash(path: str) -> Optional[str]:
+        """Returns the content hash if path (or url) points inside the store"""
+        match = CONTENT_HASH_PATH_PATTERN.search(path.replace("\\", "/"))
+        return match.group(1) if match else None
+
+    @staticmethod
+    def get_variant_for_box(width: float, height: float) -> ImageVariant:
+        """Smallest variant that still covers a box of the given size in points"""
+        required_size = max(width, height)
+        for variant, max_size in IMAGE_VARIANT_MAX_SIZES.items():
+            if max_size is None or required_size <= max_size:
+                return variant
+        return ImageVariant.FULL
+
+    def get_manifest(self, content_hash: str) -> Optional[dict]:
+        """
+        Manifest as currently on disk, the memo is only used while the file
+        is unchanged since other workers add and release references.
+        """
+        manifest_path = os.path.join(self.get_asset_dir(content_hash), MANIFEST_FILENAME)
+        try:
+            stat = os.stat(manifest_path)
+        except FileNotFoundError:
+            self._manifests.pop(content_hash, None)
+            return None
+        # Manifests are replaced on write, a new inode means new contents
+        version = (stat.st_ino, stat.st_mtime_ns)
+        memo = self._manifests.get(content_hash)
+        if memo and memo[0] == version:
+            return memo[1]
+
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            self._manifests.pop(content_hash, None)
+            return None
+        self._manifests[content_hash] = (version, manifest)
+        return manifest
+
+    def get_variant_paths(self, content_hash: str) -> Optional[Dict[str, str]]:
+        manifest = self.get_manifest(content_hash)
+        if not manifest:
+            return None
+        asset_dir = self.get_asset_dir(content_hash)
+        return {
+            variant: os.path.join(asset_dir, filename)
+            for variant, filename in manifest["variants"].items()
+        }
+
+    def get_variant_path(
+        self, content_hash: str, variant: ImageVariant
+    ) -> Optional[str]:
+        variant_paths = self.get_variant_paths(content_hash)
+        if not variant_paths:
+            return None
+        return variant_paths.get(variant.value)
+
+    def get_variant_path_for_box(
+        self, path: str, width: float, height: float
+    ) -> Optional[str]:
+        content_hash = self.find_content_hash(path)
+        if not content_hash:
+            return None
+        return self.get_variant_path(
+            content_hash, self.get_variant_for_box(width, height)
+        )
+
+    async def ingest_file(
+        self,
+        file_path: str,
+        presentation_id: Optional[uuid.UUID] = None,
+        extras: Optional[dict] = None,
+    ) -> ImageAsset:
+        content_hash = await asyncio.to_thread(hash_file, file_path)
+
+        async with self._get_lock(content_hash):
+            variant_paths = await asyncio.to_thread(
+                self._ingest,
+                content_hash,
+                file_path,
+                str(presentation_id) if presentation_id else None,
+            )
+
+        return ImageAsset(
+            path=variant_paths[ImageVariant.FULL.value],
+            content_hash=content_hash,
+            variants=variant_paths,
+            extras=extras,
+        )
+
+    async def add_reference(self, content_hash: str, presentation_id: uuid.UUID):
+        async with self._get_lock(content_hash):
+            await asyncio.to_thread(
+                self._update_references, content_hash, str(presentation_id), True
+            )
+
+    async def add_references(
+        self, assets: List[ImageAsset], presentation_id: uuid.UUID
+    ):
+        for asset in assets:
+            if asset.content_hash:
+                await self.add_reference(asset.content_hash, presentation_id)
+
+    async def release_presentation(self, presentation_id: uuid.UUID) -> List[str]:
+        """Drops all references of a presentation, returns hashes of deleted assets"""
+        presentation_id = str(presentation_id)
+        deleted = []
+        for content_hash in await asyncio.to_thread(self._list_content_hashes):
+            manifest = await asyncio.to_thread(self.get_manifest, content_hash)
+            if not manifest or presentation_id not in manifest["references"]:
+                continue
+            async with self._get_lock(content_hash):
+                if await asyncio.to_thread(
+                    self._update_references, content_hash, presentation_id, False
+                ):
+                    deleted.append(content_hash)
+        return deleted
+
+    def _get_lock(self, content_hash: str) -> asyncio.Lock:
+        return self._locks.setdefault(content_hash, asyncio.Lock())
+
+    @contextmanager
+    def _lock_asset(self, content_hash: str) -> Iterator[None]:
+        """
+        Locks an asset across workers. The lock file sits next to the asset
+        dir, so it outlives the asset being removed.
+        """
+        prefix_dir = os.path.join(self.base_dir, content_hash[:2])
+        os.makedirs(prefix_dir, exist_ok=True)
+        with open(os.path.join(prefix_dir, f"{content_hash}.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _ingest(
+        self, content_hash: str, file_path: str, presentation_id: Optional[str]
+    ) -> Dict[str, str]:
+        with self._lock_asset(content_hash):
+            # Stored again if another worker released it in the meantime
+            if not self.get_manifest(content_hash):
+                self._store_asset(content_hash, file_path)
+            if presentation_id:
+                self._change_reference(content_hash, presentation_id, True)
+            return self.get_variant_paths(content_hash)
+
+    def _update_references(
+        self, content_hash: str, presentation_id: str, add: bool
+    ) -> bool:
+        with self._lock_asset(content_hash):
+            return self._change_reference(content_hash, presentation_id, add)
+
+    def _change_reference(
+        self, content_hash: str, presentation_id: str, add: bool
+    ) -> bool:
+        """
+        Adds or removes a reference, called holding the asset lock. Returns
+        True when the asset was removed with its last reference.
+        """
+        manifest = self.get_manifest(content_hash)
+        if not manifest or (presentation_id in manifest["references"]) == add:
+            return False
+        references = [
+            each for each in manifest["references"] if each != presentation_id
+        ]
+        if add:
+            references.append(presentation_id)
+        elif not references:
+            self._manifests.pop(content_hash, None)
+            shutil.rmtree(self.get_asset_dir(content_hash), True)
+            return True
+        self._write_manifest(content_hash, {**manifest, "references": references})
+        return False
+
+    def _list_content_hashes(self) -> List[str]:
+        content_hashes = []
+        for prefix in os.listdir(self.base_dir):
+            prefix_dir = os.path.join(self.base_dir, prefix)
+            if os.path.isdir(prefix_dir):
+                content_hashes.extend(
+                    each for each in os.listdir(prefix_dir) if len(each) == 64
+                )
+        return content_hashes
+
+    def _write_manifest(self, content_hash: str, manifest: dict):
+        manifest_path = os.path.join(self.get_asset_dir(content_hash), MANIFEST_FILENAME)
+        temp_path = f"{manifest_path}.{uuid.uuid4()}"
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, manifest_path)
+
+    def _store_asset(self, content_hash: str, file_path: str) -> dict:
+        asset_dir = self.get_asset_dir(content_hash)
+        # Variants are built in a scratch dir and moved in place atomically,
+        # so a concurrent worker never sees a half written asset
+        scratch_dir = f"{asset_dir}.{uuid.uuid4()}"
+        os.makedirs(scratch_dir)
+
+        try:
+            with Image.open(file_path) as image:
+                image_format = (image.format or "").lower()
+                extension = {"jpeg": "jpg"}.get(image_format, image_format)
+                if not extension:
+                    extension = os.path.splitext(file_path)[1].lstrip(".") or "bin"
+
+                original_filename = f"original.{extension}"
+                shutil.copyfile(file_path, os.path.join(scratch_dir, original_filename))
+
+                variants = {}
+                for variant, max_size in IMAGE_VARIANT_MAX_SIZES.items():
+                    if max_size is None or max(image.size) <= max_size:
+                        variants[variant.value] = original_filename
+                        continue
+                    variants[variant.value] = self._save_variant(
+                        image, variant, max_size, scratch_dir
+                    )
+
+            manifest = {
+                "content_hash": content_hash,
+                "variants": variants,
+                "references": [],
+            }
+            with open(os.path.join(scratch_dir, MANIFEST_FILENAME), "w") as f:
+                json.dump(manifest, f)
+
+            os.makedirs(os.path.dirname(asset_dir), exist_ok=True)
+            try:
+                os.rename(scratch_dir, asset_dir)
+            except OSError:
+                # Another worker stored the same content first
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+                with open(os.path.join(asset_dir, MANIFEST_FILENAME), "r") as f:
+                    manifest = json.load(f)
+            return manifest
+
+        except Exception:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+            raise
+
+    def _save_variant(
+        self,
+        image: Image.Image,
+        variant: ImageVariant,
+        max_size: int,
+        directory: str,
+    ) -> str:
+        variant_image = image.copy()
+        variant_image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        has_alpha = variant_image.mode in ("RGBA", "LA", "PA") or (
+            variant_image.mode == "P" and "transparency" in variant_image.info
+        )
+        if has_alpha:
+            filename = f"{variant.value}.png"
+            variant_image.save(os.path.join(directory, filename), optimize=True)
+        else:
+            filename = f"{variant.value}.jpg"
+            variant_image.convert("RGB").save(
+                os.path.join(directory, filename),
+                quality=IMAGE_VARIANT_JPEG_QUALITY,
+                optimize=True,
+            )
+        return filename
+
+
+IMAGE_ASSET_STORE = ImageAssetStore()
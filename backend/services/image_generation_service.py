@@ -6,6 +6,7 @@ from google.genai.types import GenerateContentConfig
 from openai import AsyncOpenAI
 from models.image_prompt import ImagePrompt
 from models.sql.image_asset import ImageAsset
+from services.image_asset_store import IMAGE_ASSET_STORE
 from utils.download_helpers import download_file
 from utils.get_env import get_pexels_api_key_env
 from utils.get_env import get_pixabay_api_key_env
@@ -58,9 +59,8 @@ class ImageGenerationService:
                 if image_path.startswith("http"):
                     return image_path
                 elif os.path.exists(image_path):
-                    return ImageAsset(
-                        path=image_path,
-                        is_uploaded=False,
+                    return await IMAGE_ASSET_STORE.ingest_file(
+                        image_path,
                         extras={
                             "prompt": prompt.prompt,
                             "theme_prompt": prompt.theme_prompt,
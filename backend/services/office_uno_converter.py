@@ -0,0 +1,140 @@
+"""
+Converts documents through the UNO socket of a running soffice.
+
+Only needs python3-uno and the standard library, so it is imported in
+process when uno is importable and otherwise run as a long lived helper by
+a python that has it, e.g. `python3 office_uno_converter.py <port>`. The
+helper answers one JSON request per line on stdin with one JSON line on
+stdout.
+"""
+
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+
+import uno
+from com.sun.star.beans import PropertyValue
+
+PDF_FILTER_NAME = "impress_pdf_Export"
+DEFAULT_PNG_WIDTH = 1280
+CONNECT_TIMEOUT = 60
+
+
+def get_properties(**values) -> tuple:
+    return tuple(PropertyValue(Name=name, Value=value) for name, value in values.items())
+
+
+class UnoConverter:
+    def __init__(self, port: int):
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        self.context = resolver.resolve(
+            f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+        )
+        self.desktop = self.context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", self.context
+        )
+
+    def convert(
+        self,
+        input_path: str,
+        output_directory: str,
+        conversion_format: str,
+        width: Optional[int] = None,
+    ) -> List[str]:
+        """Paths of the converted files, the pdf or a png per slide in order"""
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(input_path)),
+            "_blank",
+            0,
+            get_properties(Hidden=True, ReadOnly=True),
+        )
+        if document is None:
+            raise RuntimeError(f"LibreOffice could not open {input_path}")
+
+        try:
+            if conversion_format == "pdf":
+                stem = os.path.splitext(os.path.basename(input_path))[0]
+                output_path = os.path.join(
+                    os.path.abspath(output_directory), f"{stem}.pdf"
+                )
+                document.storeToURL(
+                    uno.systemPathToFileUrl(output_path),
+                    get_properties(FilterName=PDF_FILTER_NAME),
+                )
+                return [output_path]
+
+            pages = document.getDrawPages()
+            paths = []
+            for index in range(pages.getCount()):
+                page = pages.getByIndex(index)
+                pixel_width = width or DEFAULT_PNG_WIDTH
+                filter_data = uno.Any(
+                    "[]com.sun.star.beans.PropertyValue",
+                    get_properties(
+                        PixelWidth=pixel_width,
+                        PixelHeight=round(pixel_width * page.Height / page.Width),
+                    ),
+                )
+                output_path = os.path.join(output_directory, f"slide-{index + 1}.png")
+                exporter = self.context.ServiceManager.createInstanceWithContext(
+                    "com.sun.star.drawing.GraphicExportFilter", self.context
+                )
+                exporter.setSourceDocument(page)
+                # FilterData is typed Any, it has to be passed through invoke
+                uno.invoke(
+                    exporter,
+                    "filter",
+                    (
+                        get_properties(
+                            URL=uno.systemPathToFileUrl(output_path),
+                            MediaType="image/png",
+                            FilterData=filter_data,
+                        ),
+                    ),
+                )
+                paths.append(output_path)
+            return paths
+        finally:
+            document.close(True)
+
+
+def connect(port: int, timeout: float = CONNECT_TIMEOUT) -> UnoConverter:
+    """Waits for a soffice that is still starting to accept connections"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return UnoConverter(port)
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.25)
+
+
+def main():
+    converter = connect(int(sys.argv[1]))
+    sys.stdout.write(json.dumps({"ready": True}) + "\n")
+    sys.stdout.flush()
+    for line in sys.stdin:
+        request = json.loads(line)
+        try:
+            response = {
+                "paths": converter.convert(
+                    request["input_path"],
+                    request["output_directory"],
+                    request["format"],
+                    request.get("width"),
+                )
+            }
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import asyncio
+import glob
+import json
+import os
+import pathlib
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+from typing import List, Optional
+
+from enums.conversion_format import ConversionFormat
+
+try:
+    from services import office_uno_converter
+except ImportError:
+    # uno is usually installed for the system python only, conversions then
+    # go through a helper run by a python that has it
+    office_uno_converter = None
+
+UNO_IN_PROCESS = office_uno_converter is not None
+DEFAULT_PNG_WIDTH = 1280
+STARTUP_TIMEOUT = 60
+UNO_CONVERTER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "office_uno_converter.py"
+)
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def kill_process_group(process: asyncio.subprocess.Process):
+    """soffice forks, the whole session started for it is killed"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def find_uno_python(soffice_path: str, uno_python_path: Optional[str]) -> Optional[str]:
+    """
+    A python that can import uno: UNO_PYTHON_PATH, the one bundled with
+    LibreOffice or the system python3. None when uno imports in process.
+    """
+    if UNO_IN_PROCESS:
+        return None
+    program_directory = os.path.dirname(os.path.realpath(soffice_path))
+    candidates = [
+        uno_python_path,
+        os.path.join(program_directory, "python"),
+        "/usr/bin/python3",
+        shutil.which("python3"),
+    ]
+    for candidate in candidates:
+        if not candidate or not os.path.isfile(candidate):
+            continue
+        if os.path.realpath(candidate) == os.path.realpath(sys.executable):
+            continue
+        try:
+            result = subprocess.run(
+                [candidate, "-c", "import uno"], capture_output=True, timeout=30
+            )
+        except (OSError, subprocess.SubprocessError):
+            continue
+        if result.returncode == 0:
+            return candidate
+    return None
+
+
+class OfficeWorker:
+    """
+    One headless LibreOffice with its own user profile, so workers never
+    share or lock each other's profile.
+    - A soffice process is kept running and documents are converted through
+    its UNO socket, in process when uno is importable or through a helper
+    run by `uno_python` otherwise.
+    - Without any python that has uno, soffice is run per conversion, the
+    profile created on start spares it the first start setup.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        soffice_path: str,
+        profile_directory: str,
+        uno_python: Optional[str] = None,
+    ):
+        self.index = index
+        self.soffice_path = soffice_path
+        self.profile_directory = profile_directory
+        self.uno_python = uno_python
+        self.port: Optional[int] = None
+        self.conversions = 0
+        self.restarts = 0
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._converter = None
+        self._helper: Optional[asyncio.subprocess.Process] = None
+        self._crashed = False
+
+    @property
+    def persistent(self) -> bool:
+        return UNO_IN_PROCESS or self.uno_python is not None
+
+    @property
+    def healthy(self) -> bool:
+        if not self.persistent:
+            return not self._crashed
+        if self._process is None or self._process.returncode is not None:
+            return False
+        if self._helper is not None:
+            return self._helper.returncode is None
+        return self._converter is not None
+
+    def _get_args(self, *args: str) -> List[str]:
+        return [
+            self.soffice_path,
+            f"-env:UserInstallation={pathlib.Path(self.profile_directory).as_uri()}",
+            "--headless",
+            "--invisible",
+            "--nocrashreport",
+            "--nodefault",
+            "--nologo",
+            "--nofirststartwizard",
+            "--norestore",
+            *args,
+        ]
+
+    async def start(self):
+        os.makedirs(self.profile_directory, exist_ok=True)
+        self._crashed = False
+        if not self.persistent:
+            if not os.path.isdir(os.path.join(self.profile_directory, "user")):
+                await asyncio.wait_for(
+                    self._run(self._get_args("--terminate_after_init")),
+                    STARTUP_TIMEOUT,
+                )
+            return
+
+        self.port = get_free_port()
+        self._process = await asyncio.create_subprocess_exec(
+            *self._get_args(
+                f"--accept=socket,host=127.0.0.1,port={self.port};"
+                "urp;StarOffice.ComponentContext"
+            ),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        try:
+            if self.uno_python:
+                await asyncio.wait_for(self._start_helper(), STARTUP_TIMEOUT)
+            else:
+                self._converter = await asyncio.to_thread(
+                    office_uno_converter.connect, self.port, STARTUP_TIMEOUT
+                )
+        except Exception:
+            await self.stop()
+            raise RuntimeError(f"LibreOffice worker {self.index} did not start")
+        print(f"LibreOffice worker {self.index} listening on port {self.port}")
+
+    async def _start_helper(self):
+        self._helper = await asyncio.create_subprocess_exec(
+            self.uno_python,
+            UNO_CONVERTER_SCRIPT,
+            str(self.port),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        response = await self._read_helper_response()
+        if not response.get("ready"):
+            raise RuntimeError("UNO helper did not connect")
+
+    async def _read_helper_response(self) -> dict:
+        while True:
+            line = await self._helper.stdout.readline()
+            if not line:
+                raise RuntimeError(
+                    f"UNO helper exited with {await self._helper.wait()}"
+                )
+            # Anything else LibreOffice prints is skipped
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(response, dict):
+                return response
+
+    async def stop(self):
+        self._converter = None
+        helper, self._helper = self._helper, None
+        process, self._process = self._process, None
+        for each in (helper, process):
+            if each and each.returncode is None:
+                kill_process_group(each)
+                await each.wait()
+
+    async def restart(self):
+        self.restarts += 1
+        await self.stop()
+        await self.start()
+
+    async def convert(
+        self,
+        input_path: str,
+        output_directory: str,
+        conversion_format: ConversionFormat,
+        width: Optional[int] = None,
+    ) -> List[str]:
+        """Paths of the converted files, the pdf or a png per slide in order"""
+        os.makedirs(output_directory, exist_ok=True)
+        if not self.persistent:
+            paths = await self._convert_with_soffice(
+                input_path, output_directory, conversion_format, width
+            )
+        else:
+            try:
+                if self._helper is not None:
+                    paths = await self._convert_with_helper(
+                        input_path, output_directory, conversion_format, width
+                    )
+                else:
+                    paths = await asyncio.to_thread(
+                        self._converter.convert,
+                        input_path,
+                        output_directory,
+                        conversion_format.value,
+                        width,
+                    )
+            except Exception:
+                # A crashed soffice may not be reaped yet, healthy has to
+                # tell a crash from a document that fails to convert
+                if self._process and self._process.returncode is None:
+                    try:
+                        await asyncio.wait_for(self._process.wait(), 0.5)
+                    except asyncio.TimeoutError:
+                        pass
+                raise
+        self.conversions += 1
+        return paths
+
+    async def _convert_with_helper(
+        self,
+        input_path: str,
+        output_directory: str,
+        conversion_format: ConversionFormat,
+        width: Optional[int],
+    ) -> List[str]:
+        request = {
+            "input_path": os.path.abspath(input_path),
+            "output_directory": os.path.abspath(output_directory),
+            "format": conversion_format.value,
+            "width": width,
+        }
+        self._helper.stdin.write((json.dumps(request) + "\n").encode())
+        await self._helper.stdin.drain()
+        response = await self._read_helper_response()
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["paths"]
+
+    async def _convert_with_soffice(
+        self,
+        input_path: str,
+        output_directory: str,
+        conversion_format: ConversionFormat,
+        width: Optional[int],
+    ) -> List[str]:
+        pdf_directory = output_directory
+        if conversion_format == ConversionFormat.PNG:
+            pdf_directory = os.path.join(output_directory, "pdf")
+        await self._run(
+            self._get_args("--convert-to", "pdf", "--outdir", pdf_directory, input_path)
+        )
+        pdf_path = self._get_pdf_path(input_path, pdf_directory)
+        if not os.path.isfile(pdf_path):
+            raise RuntimeError(f"LibreOffice did not convert {input_path}")
+        if conversion_format == ConversionFormat.PDF:
+            return [pdf_path]
+
+        # Impress only exports the first slide as an image, pages are
+        # rasterised from the pdf instead
+        pdftoppm_path = shutil.which("pdftoppm")
+        if not pdftoppm_path:
+            raise RuntimeError("pdftoppm is required for PNG conversion without python3-uno")
+        prefix = os.path.join(pdf_directory, "page")
+        await self._run(
+            [
+                pdftoppm_path,
+                "-png",
+                "-scale-to-x",
+                str(width or DEFAULT_PNG_WIDTH),
+                "-scale-to-y",
+                "-1",
+                pdf_path,
+                prefix,
+            ]
+        )
+        pages = sorted(
+            glob.glob(f"{glob.escape(prefix)}-*.png"),
+            key=lambda path: int(re.search(r"-(\d+)\.png$", path).group(1)),
+        )
+        paths = []
+        for index, page_path in enumerate(pages):
+            output_path = os.path.join(output_directory, f"slide-{index + 1}.png")
+            os.replace(page_path, output_path)
+            paths.append(output_path)
+        return paths
+
+    @staticmethod
+    def _get_pdf_path(input_path: str, output_directory: str) -> str:
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        return os.path.join(os.path.abspath(output_directory), f"{stem}.pdf")
+
+    async def _run(self, args: List[str]):
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True,
+        )
+        try:
+            output, _ = await process.communicate()
+        except asyncio.CancelledError:
+            # Timed out, nothing may be left running
+            kill_process_group(process)
+            await process.wait()
+            raise
+        if process.returncode != 0:
+            # Killed by a signal, the next conversion restarts the worker
+            if process.returncode < 0:
+                self._crashed = True
+            raise RuntimeError(
+                f"{os.path.basename(args[0])} exited with {process.returncode}: "
+                f"{output.decode(errors='replace')[-500:]}"
+            )
@@ -0,0 +1,75 @@
+from copy import deepcopy
+import re
+import threading
+from typing import Dict, Optional
+
+from pptx import Presentation
+from pptx.opc.package import OpcPackage
+from pptx.opc.packuri import PackURI
+from pptx.presentation import Presentation as PresentationType
+from pptx.util import Pt
+
+SLIDE_WIDTH = Pt(1280)
+SLIDE_HEIGHT = Pt(720)
+
+
+class PartnameAllocator:
+    """
+    Replaces `OpcPackage.next_partname`, which walks every part of the package
+    on each call and makes adding slides and notes quadratic in the deck size.
+    Existing partnames are scanned once per template, later calls count up.
+    """
+
+    def __init__(self, package: OpcPackage):
+        self._package = package
+        # template -> last number handed out
+        self._counters: Dict[str, int] = {}
+
+    def __call__(self, tmpl: str) -> PackURI:
+        last = self._counters.get(tmpl)
+        if last is None:
+            last = self._get_last_number(tmpl)
+        self._counters[tmpl] = last + 1
+        return PackURI(tmpl % (last + 1))
+
+    def _get_last_number(self, tmpl: str) -> int:
+        pattern = re.compile(re.escape(tmpl).replace("%d", r"(\d+)") + "$")
+        numbers = [
+            int(match.group(1))
+            for part in self._package.iter_parts()
+            if (match := pattern.match(part.partname))
+        ]
+        return max(numbers, default=0)
+
+
+class PptxBasePresentation:
+    """
+    Empty 1280x720 deck from the default template, parsed once and deep copied
+    for each export instead of unzipping and parsing the template every time.
+    """
+
+    def __init__(self):
+        self._prototype: Optional[PresentationType] = None
+        self._lock = threading.Lock()
+
+    def _get_prototype(self) -> PresentationType:
+        if self._prototype is None:
+            with self._lock:
+                if self._prototype is None:
+                    prototype = Presentation()
+                    prototype.slide_width = SLIDE_WIDTH
+                    prototype.slide_height = SLIDE_HEIGHT
+                    self._prototype = prototype
+        return self._prototype
+
+    def clone(self) -> PresentationType:
+        """Independent copy of the base deck, safe to modify and save"""
+        prototype = self._get_prototype()
+        with self._lock:
+            presentation = deepcopy(prototype)
+        package = presentation.part.package
+        package.next_partname = PartnameAllocator(package)
+        return presentation
+
+
+PPTX_BASE_PRESENTATION = PptxBasePresentation()
@@ -0,0 +1,48 @@
+import os
+from typing import Optional
+import uuid
+
+from models.pptx_models import PptxPresentationModel
+from utils.asset_directory_utils import get_pptx_models_directory
+
+
+class PptxModelStore:
+    """
+    Latest pptx model exported for each presentation, the models are built by
+    the editor so batch exports by presentation id re-export these.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+
+    @property
+    def directory(self) -> str:
+        if not self._directory:
+            self._directory = get_pptx_models_directory()
+        return self._directory
+
+    def get_path(self, presentation_id: uuid.UUID) -> str:
+        return os.path.join(self.directory, f"{presentation_id}.json")
+
+    def save(self, presentation_id: uuid.UUID, pptx_model: PptxPresentationModel):
+        path = self.get_path(presentation_id)
+        temp_path = f"{path}.{uuid.uuid4()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(pptx_model.model_dump_json())
+        os.replace(temp_path, path)
+
+    def load(self, presentation_id: uuid.UUID) -> Optional[PptxPresentationModel]:
+        try:
+            with open(self.get_path(presentation_id), "r", encoding="utf-8") as f:
+                return PptxPresentationModel.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def delete(self, presentation_id: uuid.UUID):
+        try:
+            os.remove(self.get_path(presentation_id))
+        except FileNotFoundError:
+            pass
+
+
+PPTX_MODEL_STORE = PptxModelStore()
@@ -0,0 +1,154 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import shutil
+import time
+from typing import IO, Callable, Deque, Dict, Optional, Union
+import zipfile
+
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.package import Package
+
+from utils.get_env import get_pptx_compress_level_env, get_pptx_compress_workers_env
+
+# Media that is compressed already, deflating it again only costs time
+STORED_EXTENSIONS = frozenset(
+    ("jpg", "jpeg", "png", "gif", "webp", "mp3", "m4a", "mp4", "m4v", "mov", "wmv")
+)
+
+def read_file(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+class PptxPackageWriter:
+    """
+    Writes a python-pptx package as a zip, one part at a time.
+    - JPEG, PNG and other compressed media are stored as they are, xml parts
+    are deflated at `compress_level` (PPTX_COMPRESS_LEVEL, default 6).
+    - Parts are serialized ahead in `workers` threads and written in order
+    through the public zipfile API, zlib releases the GIL so deflating a
+    part overlaps serializing the next ones.
+    - Parts listed in `part_files` are read from those files instead of being
+    held in memory, stored media is streamed from disk.
+    - Produces the same members in the same order as `Presentation.save`.
+    """
+
+    def __init__(
+        self,
+        package: Package,
+        part_files: Optional[Dict[str, str]] = None,
+        compress_level: Optional[int] = None,
+        workers: Optional[int] = None,
+    ):
+        self._package = package
+        # partname -> file holding the part blob
+        self._part_files = part_files or {}
+        if compress_level is None:
+            compress_level = int(get_pptx_compress_level_env() or 6)
+        self.compress_level = compress_level
+        self.workers = workers or int(
+            get_pptx_compress_workers_env() or min(4, os.cpu_count() or 1)
+        )
+        self._date_time = time.localtime(time.time())[:6]
+
+    def write(self, file: Union[str, IO[bytes]]):
+        parts = tuple(self._package.iter_parts())
+
+        # (membername, loader, stored, file streamed as it is)
+        members = [
+            (
+                CONTENT_TYPES_URI.membername,
+                lambda: serialize_part_xml(_ContentTypesItem.xml_for(parts)),
+                False,
+                None,
+            ),
+            (PACKAGE_URI.rels_uri.membername, lambda: self._package._rels.xml, False, None),
+        ]
+        for part in parts:
+            stored = part.partname.ext.lower() in STORED_EXTENSIONS
+            part_file = self._part_files.get(part.partname)
+            if stored and part_file:
+                members.append((part.partname.membername, None, True, part_file))
+            elif part_file:
+                members.append(
+                    (part.partname.membername, self._get_file_loader(part_file), False, None)
+                )
+            else:
+                members.append(
+                    (part.partname.membername, self._get_blob_loader(part), stored, None)
+                )
+            if part._rels:
+                members.append(
+                    (
+                        part.partname.rels_uri.membername,
+                        self._get_rels_loader(part),
+                        False,
+                        None,
+                    )
+                )
+
+        with zipfile.ZipFile(
+            file, "w", compression=zipfile.ZIP_DEFLATED
+        ) as zip_file, ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # Bounded look-ahead, compressed parts are not all held at once
+            pending: Deque = deque()
+            for member in members:
+                pending.append(self._submit(executor, member))
+                if len(pending) > self.workers * 2:
+                    self._write_pending(zip_file, *pending.popleft())
+            while pending:
+                self._write_pending(zip_file, *pending.popleft())
+
+    def _submit(self, executor: ThreadPoolExecutor, member: tuple) -> tuple:
+        membername, load, stored, part_file = member
+        if part_file:
+            return membername, part_file, None
+        return membername, None, executor.submit(self._load, load, stored)
+
+    def _write_pending(
+        self,
+        zip_file: zipfile.ZipFile,
+        membername: str,
+        part_file: Optional[str],
+        future: Optional[Future],
+    ):
+        if part_file:
+            self._write_file(zip_file, membername, part_file)
+        else:
+            self._write_member(zip_file, membername, future.result())
+
+    @staticmethod
+    def _load(load: Callable[[], bytes], stored: bool) -> tuple:
+        return load(), stored
+
+    @staticmethod
+    def _get_file_loader(file_path: str) -> Callable[[], bytes]:
+        return lambda: read_file(file_path)
+
+    @staticmethod
+    def _get_blob_loader(part) -> Callable[[], bytes]:
+        return lambda: part.blob
+
+    @staticmethod
+    def _get_rels_loader(part) -> Callable[[], bytes]:
+        return lambda: part.rels.xml
+
+    def _write_member(
+        self, zip_file: zipfile.ZipFile, membername: str, member: tuple
+    ):
+        data, stored = member
+        zinfo = zipfile.ZipInfo(membername, date_time=self._date_time)
+        zinfo.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+        zinfo.external_attr = 0o600 << 16
+        zip_file.writestr(zinfo, data, compresslevel=self.compress_level)
+
+    def _write_file(self, zip_file: zipfile.ZipFile, membername: str, file_path: str):
+        """Streams stored media from disk"""
+        zinfo = zipfile.ZipInfo(membername, date_time=self._date_time)
+        zinfo.compress_type = zipfile.ZIP_STORED
+        zinfo.file_size = os.path.getsize(file_path)
+        with open(file_path, "rb") as source, zip_file.open(zinfo, "w") as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
@@ -0,0 +1,124 @@
+import os
+from typing import IO, Dict, Optional, Tuple, Union
+
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.package import XmlPart
+from pptx.opc.packuri import PackURI
+from pptx.package import Package
+from pptx.parts.image import Image, ImagePart
+from pptx.parts.slide import SlidePart
+
+from services.processed_image_cache import link_or_copy
+
+
+class FileBackedImagePart(ImagePart):
+    """Image part whose bytes stay on disk until the package is written"""
+
+    def __init__(
+        self,
+        partname: PackURI,
+        package: Package,
+        file_path: str,
+        image: Image,
+    ):
+        super().__init__(partname, image.content_type, package, b"", image.filename)
+        self.file_path = file_path
+        self._sha1 = image.sha1
+        self._image_dpi = image.dpi
+        self._image_size = image.size
+
+    @property
+    def blob(self) -> bytes:
+        with open(self.file_path, "rb") as f:
+            return f.read()
+
+    @property
+    def image(self) -> Image:
+        return Image(self.blob, self.desc)
+
+    @property
+    def sha1(self) -> str:
+        return self._sha1
+
+    @property
+    def _dpi(self) -> Tuple[int, int]:
+        return self._image_dpi
+
+    @property
+    def _px_size(self) -> Tuple[int, int]:
+        return self._image_size
+
+
+class PptxPartSpill:
+    """
+    Keeps the memory of a package being assembled flat in the number of
+    slides.
+    - Pictures become file backed parts, one link or copy per distinct image.
+    - Finished slides and their notes are serialized to files and their xml
+    trees released, they must not be modified afterwards.
+    `part_files` maps partnames to the files PptxPackageWriter streams them from.
+    """
+
+    def __init__(self, package: Package, directory: str):
+        self._package = package
+        self._directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.part_files: Dict[str, str] = {}
+        # sha1 -> image part, python-pptx searches the whole package instead
+        self._image_parts: Dict[str, ImagePart] = {}
+        self._last_image_index: Optional[int] = None
+        package.get_or_add_image_part = self.get_or_add_image_part
+
+    def get_or_add_image_part(self, image_file: Union[str, IO[bytes]]) -> ImagePart:
+        image = Image.from_file(image_file)
+        image_part = self._image_parts.get(image.sha1)
+        if image_part:
+            return image_part
+
+        partname = self._next_image_partname(image.ext)
+        file_path = os.path.join(self._directory, partname.filename)
+        if isinstance(image_file, str):
+            link_or_copy(image_file, file_path)
+        else:
+            with open(file_path, "wb") as f:
+                f.write(image.blob)
+
+        image_part = FileBackedImagePart(partname, self._package, file_path, image)
+        self._image_parts[image.sha1] = image_part
+        self.part_files[partname] = file_path
+        return image_part
+
+    def _next_image_partname(self, ext: str) -> PackURI:
+        if self._last_image_index is None:
+            self._last_image_index = max(
+                (
+                    part.partname.idx or 0
+                    for part in self._package.iter_parts()
+                    if part.partname.startswith("/ppt/media/image")
+                ),
+                default=0,
+            )
+        self._last_image_index += 1
+        return PackURI(f"/ppt/media/image{self._last_image_index}.{ext}")
+
+    def spill_slide(self, slide_part: SlidePart):
+        """Moves a finished slide and its notes slide out of memory"""
+        self._spill_xml_part(slide_part)
+        try:
+            self._spill_xml_part(slide_part.part_related_by(RT.NOTES_SLIDE))
+        except KeyError:
+            pass
+
+    def _spill_xml_part(self, part: XmlPart):
+        file_path = os.path.join(
+            self._directory, part.partname.membername.replace("/", "_")
+        )
+        with open(file_path, "wb") as f:
+            f.write(serialize_part_xml(part._element))
+        self.part_files[part.partname] = file_path
+
+        # Drop the xml tree and the slide objects python-pptx cached on the part
+        part._element = None
+        part.__dict__.pop("slide", None)
+        part.__dict__.pop("notes_slide", None)
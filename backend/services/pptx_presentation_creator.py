@@ -1,25 +1,29 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
 import os
-from typing import List, Optional
-from lxml import etree
+import tempfile
+import time
+from typing import IO, Dict, List, Optional, Union
 from services.html_to_text_runs_service import (
     parse_html_text_to_text_runs as parse_inline_html_to_runs,
 )
 
-from pptx import Presentation
 from pptx.shapes.autoshape import Shape
 from pptx.slide import Slide
-from pptx.text.text import _Paragraph, TextFrame, Font, _Run
+from pptx.text.text import _Paragraph, TextFrame
 from pptx.opc.constants import RELATIONSHIP_TYPE as RT
 from lxml.etree import fromstring, tostring
-from PIL import Image
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
 from pptx.oxml.xmlchemy import OxmlElement
 
 from pptx.util import Pt
 from pptx.dml.color import RGBColor
 
+from models.download_result import DownloadResult
+from models.pptx_export_options import PptxExportOptionsModel
 from models.pptx_models import (
     PptxAutoShapeBoxModel,
-    PptxBoxShapeEnum,
     PptxConnectorModel,
     PptxFillModel,
     PptxFontModel,
@@ -27,22 +31,29 @@ from models.pptx_models import (
     PptxPictureBoxModel,
     PptxPositionModel,
     PptxPresentationModel,
-    PptxShadowModel,
     PptxSlideModel,
     PptxSpacingModel,
-    PptxStrokeModel,
     PptxTextBoxModel,
-    PptxTextRunModel,
 )
-from utils.download_helpers import download_files
-from utils.image_utils import (
-    clip_image,
-    create_circle_image,
-    fit_image,
-    invert_image,
-    round_image_corners,
-    set_image_opacity,
+from models.slide_part_cache_entry import SlidePartCacheEntry
+from services.asset_downloader import ASSET_DOWNLOADER
+from services.image_asset_store import IMAGE_ASSET_STORE
+from services.pptx_base_presentation import PPTX_BASE_PRESENTATION
+from services.pptx_package_writer import PptxPackageWriter
+from services.pptx_part_spill import PptxPartSpill
+from services.pptx_xml_templates import (
+    new_autoshape_sp,
+    new_character_properties,
+    new_text_run,
+    new_textbox_sp,
 )
+from services.processed_image_cache import PROCESSED_IMAGE_CACHE
+from services.slide_part_cache import SLIDE_PART_CACHE
+from utils.etag_utils import hash_file
+from utils.get_env import get_export_streaming_min_slides_env
+from utils.image_utils import picture_needs_effects, prepare_picture_file
+from utils.memory_utils import get_rss_bytes
+from utils.process_pool import get_process_pool, reset_process_pool
 import uuid
 
 BLANK_SLIDE_LAYOUT = 6
@@ -50,15 +61,60 @@ BLANK_SLIDE_LAYOUT = 6
 
 class PptxPresentationCreator:
 
-    def __init__(self, ppt_model: PptxPresentationModel, temp_dir: str):
+    def __init__(
+        self,
+        ppt_model: PptxPresentationModel,
+        temp_dir: str,
+        export_options: Optional[PptxExportOptionsModel] = None,
+        streaming: Optional[bool] = None,
+        asset_paths: Optional[Dict[str, str]] = None,
+    ):
+        """
+        With `streaming`, by default on for decks of EXPORT_STREAMING_MIN_SLIDES
+        slides or more, memory stays flat in the number of slides:
+        - Pictures and finished slides are spilled to the temp directory.
+        - Slide models are emptied once their slide is built.
+        - The package is written by streaming the spilled parts.
+        `asset_paths` maps network picture urls already downloaded, e.g. once
+        for a whole batch of decks, to their files.
+        """
         self._temp_dir = temp_dir
 
         self._ppt_model = ppt_model
         self._slide_models = ppt_model.slides
-
-        self._ppt = Presentation()
-        self._ppt.slide_width = Pt(1280)
-        self._ppt.slide_height = Pt(720)
+        self._export_options = export_options or PptxExportOptionsModel()
+        self._asset_paths = asset_paths or {}
+
+        # id(picture model) -> prepared image path, None if it could not be prepared
+        self._prepared_picture_paths: Dict[int, Optional[str]] = {}
+        # Seconds spent in each export phase
+        self.timings: Dict[str, float] = {}
+        # Bytes of the source pictures and of the pictures actually embedded
+        self.source_media_bytes = 0
+        self.embedded_media_bytes = 0
+        # Per url outcome and timing of the network pictures
+        self.download_results: List[DownloadResult] = []
+        # Current export phase and slides assembled so far, read by export jobs
+        self.phase: Optional[str] = None
+        self.completed_slides = 0
+        # Slide part cache keys and the entries found, by slide index
+        self._slide_keys: List[str] = []
+        self._cached_slides: Dict[int, SlidePartCacheEntry] = {}
+
+        # Resident memory high water mark sampled during the export
+        self.peak_memory_bytes = 0
+
+        self._ppt = PPTX_BASE_PRESENTATION.clone()
+
+        if streaming is None:
+            min_slides = int(get_export_streaming_min_slides_env() or 100)
+            streaming = len(self._slide_models) >= min_slides
+        self.streaming = streaming
+        self._part_spill = (
+            PptxPartSpill(self._ppt.part.package, os.path.join(temp_dir, "parts"))
+            if streaming
+            else None
+        )
 
     def get_sub_element(self, parent, tagname, **kwargs):
         """Helper method to create XML elements"""
@@ -86,7 +142,7 @@ class PptxPresentationCreator:
                         image_urls.append(image_path)
                         models_with_network_asset.append(each_shape)
 
-        for each_slide in self._slide_models:
+        for each_slide in self.get_uncached_slide_models():
             for each_shape in each_slide.shapes:
                 if isinstance(each_shape, PptxPictureBoxModel):
                     image_path = each_shape.picture.path
@@ -102,24 +158,322 @@ class PptxPresentationCreator:
                         models_with_network_asset.append(each_shape)
 
         if image_urls:
-            image_paths = await download_files(image_urls, self._temp_dir)
+            # Pictures sharing a url are downloaded once
+            image_paths = {
+                url: self._asset_paths[url]
+                for url in image_urls
+                if url in self._asset_paths
+            }
+            missing_urls = [
+                url for url in dict.fromkeys(image_urls) if url not in image_paths
+            ]
+            if missing_urls:
+                self.download_results = await ASSET_DOWNLOADER.download_all(
+                    missing_urls, self._temp_dir
+                )
+                image_paths.update(
+                    {result.url: result.path for result in self.download_results}
+                )
 
-            for each_shape, each_image_path in zip(
-                models_with_network_asset, image_paths
+            for each_shape, each_image_url in zip(
+                models_with_network_asset, image_urls
             ):
-                if each_image_path:
-                    each_shape.picture.path = each_image_path
+                if image_paths[each_image_url]:
+                    each_shape.picture.path = image_paths[each_image_url]
                     each_shape.picture.is_network = False
 
+            for result in self.download_results:
+                print(
+                    f"Downloaded {result.url}: {result.bytes} bytes in "
+                    f"{result.seconds:.3f}s, {result.attempts} attempt(s)"
+                )
+
+    @property
+    def total_slides(self) -> int:
+        return len(self._slide_models)
+
+    @property
+    def cached_slides(self) -> int:
+        return len(self._cached_slides)
+
+    def lookup_cached_slides(self):
+        """Unchanged slides are restored from the slide part cache"""
+        self._slide_keys = [
+            SLIDE_PART_CACHE.get_key(slide_model, self._export_options)
+            for slide_model in self._slide_models
+        ]
+        for index, key in enumerate(self._slide_keys):
+            entry = SLIDE_PART_CACHE.lookup(key)
+            if entry:
+                self._cached_slides[index] = entry
+
+    def get_uncached_slide_models(self) -> List[PptxSlideModel]:
+        return [
+            slide_model
+            for index, slide_model in enumerate(self._slide_models)
+            if index not in self._cached_slides
+        ]
+
     async def create_ppt(self):
-        await self.fetch_network_assets()
+        self.phase = "download"
+        # Keys are computed before the downloads rewrite picture paths
+        start_time = time.perf_counter()
+        await asyncio.to_thread(self.lookup_cached_slides)
+        self.timings["slide_cache"] = time.perf_counter() - start_time
 
-        for slide_model in self._slide_models:
+        start_time = time.perf_counter()
+        await self.fetch_network_assets()
+        self.timings["download"] = time.perf_counter() - start_time
+
+        self.phase = "pictures"
+        start_time = time.perf_counter()
+        await self.prepare_pictures()
+        self.timings["pictures"] = time.perf_counter() - start_time
+        self.sample_memory()
+
+        # Slide assembly is CPU bound, keep it off the event loop
+        self.phase = "assembly"
+        start_time = time.perf_counter()
+        await asyncio.to_thread(self.add_slides)
+        self.timings["assembly"] = time.perf_counter() - start_time
+
+    def add_slides(self):
+        for index, slide_model in enumerate(self._slide_models):
             # Adding global shapes to slide
             if self._ppt_model.shapes:
                 slide_model.shapes.append(self._ppt_model.shapes)
 
-            self.add_and_populate_slide(slide_model)
+            cached_slide = self._cached_slides.get(index)
+            if cached_slide:
+                slide = self.add_cached_slide(cached_slide, slide_model)
+            else:
+                slide = self.add_and_populate_slide(slide_model)
+                if self._slide_keys and self.slide_is_cacheable(slide_model):
+                    self.cache_slide(self._slide_keys[index], slide)
+
+            if self._part_spill:
+                self._part_spill.spill_slide(slide.part)
+                self.release_slide_model(slide_model)
+            self.completed_slides += 1
+            self.sample_memory()
+
+    def release_slide_model(self, slide_model: PptxSlideModel):
+        for each_shape in slide_model.shapes:
+            self._prepared_picture_paths.pop(id(each_shape), None)
+        slide_model.shapes = []
+
+    def sample_memory(self):
+        self.peak_memory_bytes = max(self.peak_memory_bytes, get_rss_bytes())
+
+    def slide_is_cacheable(self, slide_model: PptxSlideModel) -> bool:
+        # Slides missing a picture are built again next time
+        for each_shape in slide_model.shapes:
+            if isinstance(each_shape, PptxPictureBoxModel):
+                image_path = self._prepared_picture_paths.get(id(each_shape))
+                if not image_path or image_path.startswith("http"):
+                    return False
+        return True
+
+    def cache_slide(self, key: str, slide: Slide):
+        media = {}
+        for rel in slide.part.rels.values():
+            if rel.reltype == RT.IMAGE:
+                image_part = rel.target_part
+                media[rel.rId] = (
+                    f"{image_part.sha1}.{image_part.partname.ext}",
+                    image_part.blob,
+                )
+        try:
+            SLIDE_PART_CACHE.put(
+                key, tostring(slide._element, encoding="unicode"), media
+            )
+        except OSError as e:
+            print(f"Could not cache slide: {e}")
+
+    def add_cached_slide(
+        self, cached_slide: SlidePartCacheEntry, slide_model: PptxSlideModel
+    ) -> Slide:
+        slide = self._ppt.slides.add_slide(self._ppt.slide_layouts[BLANK_SLIDE_LAYOUT])
+        element = parse_xml(cached_slide.xml)
+
+        # Notes first, relationships are then added in the same order as a build
+        if slide_model.note:
+            slide.notes_slide.notes_text_frame.text = slide_model.note
+
+        # Media is related to the new slide part, rIds may differ from the cached ones
+        rIds = {}
+        for rId, filename in cached_slide.media.items():
+            _, rIds[rId] = slide.part.get_or_add_image_part(
+                SLIDE_PART_CACHE.get_path(filename)
+            )
+        if rIds:
+            for each in element.xpath(".//*[@r:embed or @r:link]"):
+                for attribute in (qn("r:embed"), qn("r:link")):
+                    if each.get(attribute) in rIds:
+                        each.set(attribute, rIds[each.get(attribute)])
+
+        slide._element[:] = element[:]
+        return slide
+
+    def get_picture_models(self) -> List[PptxPictureBoxModel]:
+        return [
+            each_shape
+            for each_slide in self.get_uncached_slide_models()
+            for each_shape in each_slide.shapes
+            if isinstance(each_shape, PptxPictureBoxModel)
+        ]
+
+    def get_picture_source_path(self, picture_model: PptxPictureBoxModel) -> str:
+        image_path = picture_model.picture.path
+        pixels_per_point = (self._export_options.target_dpi or 72) / 72.0
+        # Stored assets carry downsized variants, use the one that fits the box
+        return (
+            IMAGE_ASSET_STORE.get_variant_path_for_box(
+                image_path,
+                picture_model.position.width * pixels_per_point,
+                picture_model.position.height * pixels_per_point,
+            )
+            or image_path
+        )
+
+    def picture_needs_processing(self, picture_model: PptxPictureBoxModel) -> bool:
+        # With a target dpi every picture is resampled to its box
+        return bool(self._export_options.target_dpi) or picture_needs_effects(
+            picture_model
+        )
+
+    def prepare_picture(self, source_path: str, output_stem: str, picture_model):
+        return prepare_picture_file(
+            source_path,
+            output_stem,
+            picture_model,
+            self._export_options.target_dpi,
+            self._export_options.jpeg_quality,
+        )
+
+    def get_picture_source_hash(self, source_path: str) -> Optional[str]:
+        content_hash = IMAGE_ASSET_STORE.find_content_hash(source_path)
+        if content_hash:
+            # Variants of one asset share the hash, the file name tells them apart
+            return f"{content_hash}:{os.path.basename(source_path)}"
+        if not os.path.isfile(source_path):
+            return None
+        return hash_file(source_path)
+
+    def checkout_processed_pictures(self, pictures: list) -> list:
+        """
+        Gets cache keys for (picture model, source path, output stem) entries
+        and links cached results next to their output stems.
+        Returns (key, None) for misses and (None, linked path) for hits.
+        """
+        results = []
+        # Identical pictures within the deck are linked once
+        checked_out = {}
+        for picture_model, source_path, output_stem in pictures:
+            source_hash = self.get_picture_source_hash(source_path)
+            key = (
+                PROCESSED_IMAGE_CACHE.get_key(
+                    source_hash, picture_model, self._export_options
+                )
+                if source_hash
+                else ""
+            )
+            if key and key not in checked_out:
+                checked_out[key] = PROCESSED_IMAGE_CACHE.checkout(key, output_stem)
+            cached_path = checked_out.get(key)
+            results.append((None, cached_path) if cached_path else (key, None))
+        return results
+
+    async def prepare_pictures(self):
+        """
+        Runs the picture effects of the whole deck concurrently in the process
+        pool, slide assembly then only embeds the prepared files.
+        Results are cached across exports, the same picture is processed once.
+        """
+        loop = asyncio.get_running_loop()
+        process_pool = get_process_pool()
+
+        pictures = []
+        for picture_model in self.get_picture_models():
+            source_path = self.get_picture_source_path(picture_model)
+            if not self.picture_needs_processing(picture_model):
+                self._prepared_picture_paths[id(picture_model)] = source_path
+                continue
+            output_stem = os.path.join(self._temp_dir, str(uuid.uuid4()))
+            pictures.append((picture_model, source_path, output_stem))
+
+        lookups = await asyncio.to_thread(self.checkout_processed_pictures, pictures)
+
+        pending_tasks = {}
+        picture_tasks = []
+        for (picture_model, source_path, output_stem), (key, cached_path) in zip(
+            pictures, lookups
+        ):
+            if cached_path:
+                self._prepared_picture_paths[id(picture_model)] = cached_path
+                continue
+            # Identical pictures within the deck share one task
+            if not key or key not in pending_tasks:
+                task = loop.run_in_executor(
+                    process_pool,
+                    prepare_picture_file,
+                    source_path,
+                    output_stem,
+                    picture_model,
+                    self._export_options.target_dpi,
+                    self._export_options.jpeg_quality,
+                )
+                if not key:
+                    picture_tasks.append((picture_model, None, task))
+                    continue
+                pending_tasks[key] = task
+            picture_tasks.append((picture_model, key, pending_tasks[key]))
+
+        results = await asyncio.gather(
+            *(task for _, _, task in picture_tasks), return_exceptions=True
+        )
+
+        new_cache_entries = {}
+        for (picture_model, key, _), result in zip(picture_tasks, results):
+            if isinstance(result, BrokenProcessPool):
+                reset_process_pool()
+            if isinstance(result, Exception):
+                print(f"Could not prepare picture: {result}")
+                result = None
+            self._prepared_picture_paths[id(picture_model)] = result
+            # Unchanged sources are embedded as they are, nothing to cache
+            if key and result and result.startswith(self._temp_dir):
+                new_cache_entries[key] = result
+
+        if new_cache_entries:
+            await asyncio.to_thread(self.put_processed_pictures, new_cache_entries)
+
+        await asyncio.to_thread(self.measure_media_bytes)
+
+    def measure_media_bytes(self):
+        # Each file counts once, python-pptx embeds identical images once
+        source_paths = set()
+        embedded_paths = set()
+        for picture_model in self.get_picture_models():
+            embedded_path = self._prepared_picture_paths.get(id(picture_model))
+            if not embedded_path:
+                continue
+            source_paths.add(picture_model.picture.path)
+            embedded_paths.add(embedded_path)
+
+        self.source_media_bytes = sum(
+            os.path.getsize(path) for path in source_paths if os.path.isfile(path)
+        )
+        self.embedded_media_bytes = sum(
+            os.path.getsize(path) for path in embedded_paths if os.path.isfile(path)
+        )
+
+    def put_processed_pictures(self, entries: Dict[str, str]):
+        for key, path in entries.items():
+            try:
+                PROCESSED_IMAGE_CACHE.put(key, path)
+            except OSError as e:
+                print(f"Could not cache processed picture: {e}")
 
     def set_presentation_theme(self):
         slide_master = self._ppt.slide_master
@@ -141,8 +495,10 @@ class PptxPresentationCreator:
 
         theme_part._blob = tostring(theme)
 
-    def add_and_populate_slide(self, slide_model: PptxSlideModel):
+    def add_and_populate_slide(self, slide_model: PptxSlideModel) -> Slide:
         slide = self._ppt.slides.add_slide(self._ppt.slide_layouts[BLANK_SLIDE_LAYOUT])
+        # Shape ids are counted up instead of searched for on every shape
+        slide.shapes.turbo_add_enabled = True
 
         if slide_model.background:
             self.apply_fill_to_shape(slide.background, slide_model.background)
@@ -165,6 +521,8 @@ class PptxPresentationCreator:
             elif model_type is PptxConnectorModel:
                 self.add_connector(slide, shape_model)
 
+        return slide
+
     def add_connector(self, slide: Slide, connector_model: PptxConnectorModel):
         if connector_model.thickness == 0:
             return
@@ -176,48 +534,19 @@ class PptxPresentationCreator:
         self.set_fill_opacity(connector_shape, connector_model.opacity)
 
     def add_picture(self, slide: Slide, picture_model: PptxPictureBoxModel):
-        image_path = picture_model.picture.path
-        if (
-            picture_model.clip
-            or picture_model.border_radius
-            or picture_model.invert
-            or picture_model.opacity
-            or picture_model.object_fit
-            or picture_model.shape
-        ):
-            try:
-                image = Image.open(image_path)
-            except:
-                print(f"Could not open image: {image_path}")
-                return
-
-            image = image.convert("RGBA")
-            # ? Applying border radius twice to support both clip and object fit
-            if picture_model.border_radius:
-                image = round_image_corners(image, picture_model.border_radius)
-            if picture_model.object_fit:
-                image = fit_image(
-                    image,
-                    picture_model.position.width,
-                    picture_model.position.height,
-                    picture_model.object_fit,
-                )
-            elif picture_model.clip:
-                image = clip_image(
-                    image,
-                    picture_model.position.width,
-                    picture_model.position.height,
+        if id(picture_model) in self._prepared_picture_paths:
+            image_path = self._prepared_picture_paths[id(picture_model)]
+        else:
+            image_path = self.get_picture_source_path(picture_model)
+            if self.picture_needs_processing(picture_model):
+                image_path = self.prepare_picture(
+                    image_path,
+                    os.path.join(self._temp_dir, str(uuid.uuid4())),
+                    picture_model,
                 )
-            if picture_model.border_radius:
-                image = round_image_corners(image, picture_model.border_radius)
-            if picture_model.shape == PptxBoxShapeEnum.CIRCLE:
-                image = create_circle_image(image)
-            if picture_model.invert:
-                image = invert_image(image)
-            if picture_model.opacity:
-                image = set_image_opacity(image, picture_model.opacity)
-            image_path = os.path.join(self._temp_dir, f"{uuid.uuid4()}.png")
-            image.save(image_path)
+
+        if not image_path:
+            return
 
         margined_position = self.get_margined_position(
             picture_model.position, picture_model.margin
@@ -230,33 +559,36 @@ class PptxPresentationCreator:
         if autoshape_box_model.margin:
             position = self.get_margined_position(position, autoshape_box_model.margin)
 
-        autoshape = slide.shapes.add_shape(
-            autoshape_box_model.type, *position.to_pt_list()
+        sp = new_autoshape_sp(
+            slide.shapes._next_shape_id,
+            autoshape_box_model.type,
+            position,
+            autoshape_box_model.fill,
+            autoshape_box_model.stroke,
+            autoshape_box_model.shadow,
+            autoshape_box_model.margin,
+            autoshape_box_model.text_wrap,
         )
+        slide.shapes._spTree.insert_element_before(sp, "p:extLst")
+        autoshape = slide.shapes._shape_factory(sp)
 
-        textbox = autoshape.text_frame
-        textbox.word_wrap = autoshape_box_model.text_wrap
-
-        self.apply_fill_to_shape(autoshape, autoshape_box_model.fill)
-        self.apply_margin_to_text_box(textbox, autoshape_box_model.margin)
-        self.apply_stroke_to_shape(autoshape, autoshape_box_model.stroke)
-        self.apply_shadow_to_shape(autoshape, autoshape_box_model.shadow)
         self.apply_border_radius_to_shape(autoshape, autoshape_box_model.border_radius)
 
         if autoshape_box_model.paragraphs:
-            self.add_paragraphs(textbox, autoshape_box_model.paragraphs)
+            self.add_paragraphs(autoshape.text_frame, autoshape_box_model.paragraphs)
 
     def add_textbox(self, slide: Slide, textbox_model: PptxTextBoxModel):
-        position = textbox_model.position
-        textbox_shape = slide.shapes.add_textbox(*position.to_pt_list())
-        textbox_shape.width += Pt(2)
-
-        textbox = textbox_shape.text_frame
-        textbox.word_wrap = textbox_model.text_wrap
+        sp = new_textbox_sp(
+            slide.shapes._next_shape_id,
+            textbox_model.position,
+            textbox_model.fill,
+            textbox_model.margin,
+            textbox_model.text_wrap,
+        )
+        slide.shapes._spTree.insert_element_before(sp, "p:extLst")
+        textbox_shape = slide.shapes._shape_factory(sp)
 
-        self.apply_fill_to_shape(textbox_shape, textbox_model.fill)
-        self.apply_margin_to_text_box(textbox, textbox_model.margin)
-        self.add_paragraphs(textbox, textbox_model.paragraphs)
+        self.add_paragraphs(textbox_shape.text_frame, textbox_model.paragraphs)
 
     def add_paragraphs(
         self, textbox: TextFrame, paragraph_models: List[PptxParagraphModel]
@@ -289,17 +621,13 @@ class PptxPresentationCreator:
             text_runs = paragraph_model.text_runs
 
         for text_run_model in text_runs:
-            text_run = paragraph.add_run()
-            self.populate_text_run(text_run, text_run_model)
+            paragraph._p._insert_r(
+                new_text_run(text_run_model.text, text_run_model.font)
+            )
 
     def parse_html_text_to_text_runs(self, font: Optional[PptxFontModel], text: str):
         return parse_inline_html_to_runs(text, font)
 
-    def populate_text_run(self, text_run: _Run, text_run_model: PptxTextRunModel):
-        text_run.text = text_run_model.text
-        if text_run_model.font:
-            self.apply_font(text_run.font, text_run_model.font)
-
     def apply_border_radius_to_shape(self, shape: Shape, border_radius: Optional[int]):
         if not border_radius:
             return
@@ -319,101 +647,6 @@ class PptxPresentationCreator:
             shape.fill.fore_color.rgb = RGBColor.from_string(fill.color)
             self.set_fill_opacity(shape.fill, fill.opacity)
 
-    def apply_stroke_to_shape(
-        self, shape: Shape, stroke: Optional[PptxStrokeModel] = None
-    ):
-        if not stroke or stroke.thickness == 0:
-            shape.line.fill.background()
-        else:
-            shape.line.fill.solid()
-            shape.line.fill.fore_color.rgb = RGBColor.from_string(stroke.color)
-            shape.line.width = Pt(stroke.thickness)
-            self.set_fill_opacity(shape.line.fill, stroke.opacity)
-
-    def apply_shadow_to_shape(
-        self, shape: Shape, shadow: Optional[PptxShadowModel] = None
-    ):
-
-        # Access the XML for the shape
-        sp_element = shape._element
-        sp_pr = sp_element.xpath("p:spPr")[0]  # Shape properties XML element
-
-        nsmap = sp_pr.nsmap
-
-        # # Remove existing shadow effects if present
-        effect_list = sp_pr.find("a:effectLst", namespaces=nsmap)
-        if effect_list:
-            old_outer_shadow = effect_list.find("a:outerShdw")
-            if old_outer_shadow:
-                effect_list.remove(
-                    old_outer_shadow, namespaces=nsmap
-                )  # Remove the old shadow
-            old_inner_shadow = effect_list.find("a:innerShdw")
-            if old_inner_shadow:
-                effect_list.remove(
-                    old_inner_shadow, namespaces=nsmap
-                )  # Remove the old shadow
-            old_prst_shadow = effect_list.find("a:prstShdw")
-            if old_prst_shadow:
-                effect_list.remove(
-                    old_prst_shadow, namespaces=nsmap
-                )  # Remove the old shadow
-
-        if not effect_list:
-            effect_list = etree.SubElement(
-                sp_pr, f"{{{nsmap['a']}}}effectLst", nsmap=nsmap
-            )
-
-        if shadow is None:
-            # Apply shadow with zero values when shadow is None
-            outer_shadow = etree.SubElement(
-                effect_list,
-                f"{{{nsmap['a']}}}outerShdw",
-                {
-                    "blurRad": "0",
-                    "dist": "0",
-                    "dir": "0",
-                },
-                nsmap=nsmap,
-            )
-            color_element = etree.SubElement(
-                outer_shadow,
-                f"{{{nsmap['a']}}}srgbClr",
-                {"val": "000000"},
-                nsmap=nsmap,
-            )
-            etree.SubElement(
-                color_element,
-                f"{{{nsmap['a']}}}alpha",
-                {"val": "0"},
-                nsmap=nsmap,
-            )
-        else:
-            # Apply the provided shadow
-            outer_shadow = etree.SubElement(
-                effect_list,
-                f"{{{nsmap['a']}}}outerShdw",
-                {
-                    "blurRad": f"{Pt(shadow.radius)}",
-                    "dir": f"{shadow.angle * 1000}",
-                    "dist": f"{Pt(shadow.offset)}",
-                    "rotWithShape": "0",
-                },
-                nsmap=nsmap,
-            )
-            color_element = etree.SubElement(
-                outer_shadow,
-                f"{{{nsmap['a']}}}srgbClr",
-                {"val": f"{shadow.color}"},
-                nsmap=nsmap,
-            )
-            etree.SubElement(
-                color_element,
-                f"{{{nsmap['a']}}}alpha",
-                {"val": f"{int(shadow.opacity * 100000)}"},
-                nsmap=nsmap,
-            )
-
     def set_fill_opacity(self, fill, opacity):
         if opacity is None or opacity >= 1.0:
             return
@@ -440,14 +673,6 @@ class PptxPresentationCreator:
 
         return PptxPositionModel(left=left, top=top, width=width, height=height)
 
-    def apply_margin_to_text_box(
-        self, text_frame: TextFrame, margin: Optional[PptxSpacingModel]
-    ) -> PptxPositionModel:
-        text_frame.margin_left = Pt(margin.left if margin else 0)
-        text_frame.margin_right = Pt(margin.right if margin else 0)
-        text_frame.margin_top = Pt(margin.top if margin else 0)
-        text_frame.margin_bottom = Pt(margin.bottom if margin else 0)
-
     def apply_spacing_to_paragraph(
         self, paragraph: _Paragraph, spacing: PptxSpacingModel
     ):
@@ -455,28 +680,31 @@ class PptxPresentationCreator:
         paragraph.space_after = Pt(spacing.bottom)
 
     def apply_font_to_paragraph(self, paragraph: _Paragraph, font: PptxFontModel):
-        self.apply_font(paragraph.font, font)
-
-    def apply_font(self, font: Font, font_model: PptxFontModel):
-        font.name = font_model.name
-        font.color.rgb = RGBColor.from_string(font_model.color)
-        font.italic = font_model.italic
-        font.size = Pt(font_model.size)
-        font.bold = font_model.font_weight >= 600
-        if font_model.underline is not None:
-            font.underline = bool(font_model.underline)
-        if font_model.strike is not None:
-            self.apply_strike_to_font(font, font_model.strike)
-
-    def apply_strike_to_font(self, font: Font, strike: Optional[bool]):
+        pPr = paragraph._p.get_or_add_pPr()
+        pPr._remove_defRPr()
+        pPr._insert_defRPr(new_character_properties(font, "a:defRPr"))
+
+    def save(self, path: Union[str, IO[bytes]]):
+        self.phase = "save"
+        start_time = time.perf_counter()
+        PptxPackageWriter(
+            self._ppt.part.package,
+            self._part_spill.part_files if self._part_spill else None,
+        ).write(path)
+        self.timings["save"] = time.perf_counter() - start_time
+        self.sample_memory()
+
+    def save_to_buffer(self, max_memory_bytes: int) -> tempfile.SpooledTemporaryFile:
+        """
+        Saves into a buffer kept in memory up to max_memory_bytes and spilled
+        to the temp directory beyond, positioned at the end of the deck.
+        """
+        buffer = tempfile.SpooledTemporaryFile(
+            max_size=max_memory_bytes, dir=self._temp_dir
+        )
         try:
-            rPr = font._element
-            if strike is True:
-                rPr.set("strike", "sngStrike")
-            elif strike is False:
-                rPr.set("strike", "noStrike")
-        except Exception as e:
-            print(f"Could not apply strikethrough: {e}")
-
-    def save(self, path: str):
-        self._ppt.save(path)
+            self.save(buffer)
+        except Exception:
+            buffer.close()
+            raise
+        return buffer
@@ -0,0 +1,236 @@
+from copy import deepcopy
+from functools import lru_cache
+import re
+from typing import Optional
+from xml.sax.saxutils import quoteattr
+
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.shapes.autoshape import AutoShapeType
+from pptx.util import Pt
+
+from models.pptx_models import (
+    PptxFillModel,
+    PptxFontModel,
+    PptxPositionModel,
+    PptxShadowModel,
+    PptxSpacingModel,
+    PptxStrokeModel,
+)
+
+# Same shape XML python-pptx builds through its high level API, emitted in
+# one parse instead of dozens of element lookups and insertions per shape.
+
+AUTOSHAPE_TEMPLATE = (
+    f"<p:sp {nsdecls('a', 'p')}>"
+    "<p:nvSpPr>"
+    '<p:cNvPr id="{id}" name={name}/>'
+    "<p:cNvSpPr/>"
+    "<p:nvPr/>"
+    "</p:nvSpPr>"
+    "<p:spPr>"
+    '<a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="{prst}"><a:avLst/></a:prstGeom>'
+    "{fill}{line}{effects}"
+    "</p:spPr>"
+    "<p:style>"
+    '<a:lnRef idx="1"><a:schemeClr val="accent1"/></a:lnRef>'
+    '<a:fillRef idx="3"><a:schemeClr val="accent1"/></a:fillRef>'
+    '<a:effectRef idx="2"><a:schemeClr val="accent1"/></a:effectRef>'
+    '<a:fontRef idx="minor"><a:schemeClr val="lt1"/></a:fontRef>'
+    "</p:style>"
+    "<p:txBody>"
+    '<a:bodyPr rtlCol="0" anchor="ctr" {body_properties}/>'
+    "<a:lstStyle/>"
+    '<a:p><a:pPr algn="ctr"/></a:p>'
+    "</p:txBody>"
+    "</p:sp>"
+)
+
+TEXTBOX_TEMPLATE = (
+    f"<p:sp {nsdecls('a', 'p')}>"
+    "<p:nvSpPr>"
+    '<p:cNvPr id="{id}" name="TextBox {index}"/>'
+    '<p:cNvSpPr txBox="1"/>'
+    "<p:nvPr/>"
+    "</p:nvSpPr>"
+    "<p:spPr>"
+    '<a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom>'
+    "{fill}"
+    "</p:spPr>"
+    "<p:txBody>"
+    "<a:bodyPr {body_properties}><a:spAutoFit/></a:bodyPr>"
+    "<a:lstStyle/>"
+    "<a:p/>"
+    "</p:txBody>"
+    "</p:sp>"
+)
+
+NO_SHADOW_XML = (
+    "<a:effectLst>"
+    '<a:outerShdw blurRad="0" dist="0" dir="0">'
+    '<a:srgbClr val="000000"><a:alpha val="0"/></a:srgbClr>'
+    "</a:outerShdw>"
+    "</a:effectLst>"
+)
+
+
+RGB_HEX_PATTERN = re.compile(r"^[0-9A-Fa-f]{6}$")
+
+
+def get_color_xml(color: str, opacity: Optional[float] = None) -> str:
+    # Raises on bad input like RGBColor.from_string did, instead of writing
+    # a value PowerPoint rejects
+    if not isinstance(color, str) or not RGB_HEX_PATTERN.match(color):
+        raise ValueError(f"Invalid RGB color: {color!r}")
+    if opacity is None or opacity >= 1.0:
+        return f'<a:srgbClr val="{color}"/>'
+    return f'<a:srgbClr val="{color}"><a:alpha val="{int(opacity * 100000)}"/></a:srgbClr>'
+
+
+def get_fill_xml(fill: Optional[PptxFillModel]) -> str:
+    if not fill:
+        return "<a:noFill/>"
+    return f"<a:solidFill>{get_color_xml(fill.color, fill.opacity)}</a:solidFill>"
+
+
+def get_line_xml(stroke: Optional[PptxStrokeModel]) -> str:
+    if not stroke or stroke.thickness == 0:
+        return "<a:ln><a:noFill/></a:ln>"
+    return (
+        f'<a:ln w="{Pt(stroke.thickness)}">'
+        f"<a:solidFill>{get_color_xml(stroke.color, stroke.opacity)}</a:solidFill>"
+        "</a:ln>"
+    )
+
+
+def get_effect_list_xml(shadow: Optional[PptxShadowModel]) -> str:
+    if shadow is None:
+        return NO_SHADOW_XML
+    return (
+        "<a:effectLst>"
+        f'<a:outerShdw blurRad="{Pt(shadow.radius)}" dir="{shadow.angle * 1000}" '
+        f'dist="{Pt(shadow.offset)}" rotWithShape="0">'
+        f"{get_color_xml(shadow.color, None)[:-2]}>"
+        f'<a:alpha val="{int(shadow.opacity * 100000)}"/></a:srgbClr>'
+        "</a:outerShdw>"
+        "</a:effectLst>"
+    )
+
+
+def get_body_properties_xml(margin: Optional[PptxSpacingModel], text_wrap: bool) -> str:
+    margin = margin or PptxSpacingModel()
+    return (
+        f'wrap="{"square" if text_wrap else "none"}" '
+        f'lIns="{Pt(margin.left)}" rIns="{Pt(margin.right)}" '
+        f'tIns="{Pt(margin.top)}" bIns="{Pt(margin.bottom)}"'
+    )
+
+
+@lru_cache(maxsize=None)
+def get_autoshape_type(autoshape_type_id) -> AutoShapeType:
+    return AutoShapeType(autoshape_type_id)
+
+
+def new_autoshape_sp(
+    shape_id: int,
+    autoshape_type_id,
+    position: PptxPositionModel,
+    fill: Optional[PptxFillModel],
+    stroke: Optional[PptxStrokeModel],
+    shadow: Optional[PptxShadowModel],
+    margin: Optional[PptxSpacingModel],
+    text_wrap: bool,
+):
+    autoshape_type = get_autoshape_type(autoshape_type_id)
+    x, y, cx, cy = position.to_pt_list()
+    return parse_xml(
+        AUTOSHAPE_TEMPLATE.format(
+            id=shape_id,
+            name=quoteattr(f"{autoshape_type.basename} {shape_id - 1}"),
+            x=x,
+            y=y,
+            cx=cx,
+            cy=cy,
+            prst=autoshape_type.prst,
+            fill=get_fill_xml(fill),
+            line=get_line_xml(stroke),
+            effects=get_effect_list_xml(shadow),
+            body_properties=get_body_properties_xml(margin, text_wrap),
+        )
+    )
+
+
+def new_textbox_sp(
+    shape_id: int,
+    position: PptxPositionModel,
+    fill: Optional[PptxFillModel],
+    margin: Optional[PptxSpacingModel],
+    text_wrap: bool,
+):
+    x, y, cx, cy = position.to_pt_list()
+    return parse_xml(
+        TEXTBOX_TEMPLATE.format(
+            id=shape_id,
+            index=shape_id - 1,
+            x=x,
+            y=y,
+            # Textboxes are widened by 2pt so text does not wrap early
+            cx=cx + Pt(2),
+            cy=cy,
+            fill=get_fill_xml(fill),
+            body_properties=get_body_properties_xml(margin, text_wrap),
+        )
+    )
+
+
+@lru_cache(maxsize=4096)
+def _get_character_properties(
+    tag: str,
+    name: str,
+    size: int,
+    italic: bool,
+    color: str,
+    bold: bool,
+    underline: Optional[bool],
+    strike: Optional[bool],
+):
+    attributes = f'i="{int(italic)}" sz="{Pt(size).centipoints}" b="{int(bold)}"'
+    if underline is not None:
+        attributes += f' u="{"sng" if underline else "none"}"'
+    if strike is not None:
+        attributes += f' strike="{"sngStrike" if strike else "noStrike"}"'
+    return parse_xml(
+        f"<{tag} {nsdecls('a')} {attributes}>"
+        f"<a:solidFill>{get_color_xml(color)}</a:solidFill>"
+        f"<a:latin typeface={quoteattr(name)}/>"
+        f"</{tag}>"
+    )
+
+
+def new_character_properties(font: PptxFontModel, tag: str = "a:rPr"):
+    """`a:rPr` or `a:defRPr` for the font, copied from a compiled template"""
+    return deepcopy(
+        _get_character_properties(
+            tag,
+            font.name,
+            font.size,
+            font.italic,
+            font.color,
+            font.font_weight >= 600,
+            font.underline,
+            font.strike,
+        )
+    )
+
+
+_TEXT_RUN = parse_xml(f"<a:r {nsdecls('a')}><a:t/></a:r>")
+
+
+def new_text_run(text: str, font: Optional[PptxFontModel]):
+    r = deepcopy(_TEXT_RUN)
+    if font:
+        r.insert(0, new_character_properties(font))
+    r.text = text
+    return r
@@ -0,0 +1,138 @@
+from typing import Iterable, List, Optional
+import uuid
+
+from sqlalchemy import delete, func
+from sqlmodel import col, select
+
+from models.sql.presentation_sql import PresentationSqlModel
+from models.sql.slide import SlideModel
+from services.database import get_session
+
+
+class PresentationStore:
+    """
+    Presentation and slide rows behind the presentation caches, read and
+    written through the async engine.
+    - Every write bumps the presentation's version in the same transaction.
+    - Slides are saved incrementally, only the ones given are written.
+    """
+
+    async def get_version(self, presentation_id: uuid.UUID) -> Optional[int]:
+        async with get_session() as session:
+            result = await session.exec(
+                select(PresentationSqlModel.version).where(
+                    PresentationSqlModel.id == presentation_id
+                )
+            )
+            return result.first()
+
+    async def get_presentation(
+        self, presentation_id: uuid.UUID
+    ) -> Optional[PresentationSqlModel]:
+        async with get_session() as session:
+            return await session.get(PresentationSqlModel, presentation_id)
+
+    async def list_presentations(
+        self, with_slides: bool = False
+    ) -> List[PresentationSqlModel]:
+        statement = select(PresentationSqlModel).order_by(
+            col(PresentationSqlModel.created_at)
+        )
+        if with_slides:
+            statement = statement.where(col(PresentationSqlModel.has_slides))
+        async with get_session() as session:
+            return list((await session.exec(statement)).all())
+
+    async def count_presentations(self, with_slides: bool = False) -> int:
+        statement = select(func.count()).select_from(PresentationSqlModel)
+        if with_slides:
+            statement = statement.where(col(PresentationSqlModel.has_slides))
+        async with get_session() as session:
+            return (await session.exec(statement)).one()
+
+    async def save_presentation(
+        self, presentation_id: uuid.UUID, fields: dict
+    ) -> int:
+        """Inserts or updates the presentation, returns its new version"""
+        async with get_session() as session:
+            row = await self._save_row(session, presentation_id, fields)
+            await session.commit()
+            return row.version
+
+    async def delete_presentation(self, presentation_id: uuid.UUID) -> bool:
+        async with get_session() as session:
+            await session.exec(
+                delete(SlideModel).where(col(SlideModel.presentation) == presentation_id)
+            )
+            result = await session.exec(
+                delete(PresentationSqlModel).where(
+                    col(PresentationSqlModel.id) == presentation_id
+                )
+            )
+            await session.commit()
+            return result.rowcount > 0
+
+    async def get_slides(self, presentation_id: uuid.UUID) -> List[SlideModel]:
+        async with get_session() as session:
+            result = await session.exec(
+                select(SlideModel)
+                .where(col(SlideModel.presentation) == presentation_id)
+                .order_by(col(SlideModel.index))
+            )
+            return list(result.all())
+
+    async def save_slides(
+        self,
+        presentation_id: uuid.UUID,
+        fields: dict,
+        slides: Iterable[SlideModel],
+        removed_slide_ids: Iterable[uuid.UUID] = (),
+    ) -> int:
+        """
+        Saves the presentation with the slides that changed and removes the
+        slides that are gone, in one transaction. Returns the new version.
+        """
+        async with get_session() as session:
+            row = await self._save_row(session, presentation_id, fields)
+            row.has_slides = True
+            for slide in slides:
+                # Copies, the caller's slides stay out of the session
+                await session.merge(SlideModel.model_validate(slide.model_dump()))
+            removed_slide_ids = [uuid.UUID(str(each)) for each in removed_slide_ids]
+            if removed_slide_ids:
+                await session.exec(
+                    delete(SlideModel).where(col(SlideModel.id).in_(removed_slide_ids))
+                )
+            await session.commit()
+            return row.version
+
+    async def delete_slides(self, presentation_id: uuid.UUID) -> Optional[int]:
+        async with get_session() as session:
+            row = await session.get(PresentationSqlModel, presentation_id)
+            if row is None:
+                return None
+            await session.exec(
+                delete(SlideModel).where(col(SlideModel.presentation) == presentation_id)
+            )
+            row.has_slides = False
+            row.version += 1
+            await session.commit()
+            return row.version
+
+    @staticmethod
+    async def _save_row(
+        session, presentation_id: uuid.UUID, fields: dict
+    ) -> PresentationSqlModel:
+        fields = {key: value for key, value in fields.items() if key != "id"}
+        row = await session.get(PresentationSqlModel, presentation_id)
+        if row is None:
+            row = PresentationSqlModel(id=presentation_id, **fields)
+            session.add(row)
+        else:
+            for key, value in fields.items():
+                setattr(row, key, value)
+        row.version = (row.version or 0) + 1
+        return row
+
+
+PRESENTATION_STORE = PresentationStore()
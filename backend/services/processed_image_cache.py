@@ -0,0 +1,171 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Optional, Tuple
+import uuid
+
+from models.pptx_export_options import PptxExportOptionsModel
+from models.pptx_models import PptxPictureBoxModel
+from utils.asset_directory_utils import get_processed_images_directory
+from utils.get_env import get_processed_image_cache_max_bytes_env
+
+# Bump when apply_image_effects output changes, old entries are then never hit
+PROCESSED_IMAGE_CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def link_or_copy(source_path: str, destination_path: str):
+    try:
+        os.link(source_path, destination_path)
+    except OSError:
+        shutil.copyfile(source_path, destination_path)
+
+
+class ProcessedImageCache:
+    """
+    Disk cache of pictures with effects applied, shared by all exports.
+    - Keyed by the source content hash, the box size and the effect parameters.
+    - An in-memory LRU index tracks sizes, entries are evicted past the disk quota.
+    - Entries are handed out as hard links, so eviction never breaks an export.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self._directory = directory
+        self.max_bytes = max_bytes or int(
+            get_processed_image_cache_max_bytes_env() or DEFAULT_MAX_BYTES
+        )
+        self._lock = threading.Lock()
+        # key -> (file name, size in bytes), least recently used first
+        self._index: Optional["OrderedDict[str, Tuple[str, int]]"] = None
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted_bytes = 0
+
+    @property
+    def directory(self) -> str:
+        if not self._directory:
+            self._directory = get_processed_images_directory()
+        return self._directory
+
+    @staticmethod
+    def get_key(
+        source_hash: str,
+        picture_model: PptxPictureBoxModel,
+        export_options: Optional[PptxExportOptionsModel] = None,
+    ) -> str:
+        parameters = {
+            "version": PROCESSED_IMAGE_CACHE_VERSION,
+            "source": source_hash,
+            "width": picture_model.position.width,
+            "height": picture_model.position.height,
+            "clip": picture_model.clip,
+            "object_fit": (
+                picture_model.object_fit.model_dump(mode="json")
+                if picture_model.object_fit
+                else None
+            ),
+            "border_radius": picture_model.border_radius,
+            "shape": picture_model.shape.value if picture_model.shape else None,
+            "invert": picture_model.invert,
+            "opacity": picture_model.opacity,
+            "export_options": (
+                export_options.model_dump(mode="json") if export_options else None
+            ),
+        }
+        return hashlib.sha256(
+            json.dumps(parameters, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def _get_path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def _get_index(self) -> "OrderedDict[str, Tuple[str, int]]":
+        if self._index is None:
+            # Rebuilt from disk once, least recently used first
+            entries = []
+            for filename in os.listdir(self.directory):
+                key, extension = os.path.splitext(filename)
+                if extension not in (".png", ".jpg"):
+                    continue
+                stat = os.stat(self._get_path(filename))
+                entries.append((stat.st_mtime, key, filename, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict(
+                (key, (filename, size)) for _, key, filename, size in entries
+            )
+            self.total_bytes = sum(size for _, size in self._index.values())
+        return self._index
+
+    def checkout(self, key: str, destination_stem: str) -> Optional[str]:
+        """
+        Links a cached picture next to destination_stem, with the extension
+        of the cached file. Returns the linked path, or None on a miss.
+        """
+        with self._lock:
+            index = self._get_index()
+            if key not in index:
+                self.misses += 1
+                return None
+            index.move_to_end(key)
+            filename = index[key][0]
+
+        cached_path = self._get_path(filename)
+        destination_path = destination_stem + os.path.splitext(filename)[1]
+        try:
+            link_or_copy(cached_path, destination_path)
+            # mtime keeps the LRU order across restarts
+            os.utime(cached_path)
+        except OSError:
+            with self._lock:
+                entry = self._get_index().pop(key, None)
+                if entry:
+                    self.total_bytes -= entry[1]
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return destination_path
+
+    def put(self, key: str, file_path: str):
+        with self._lock:
+            if key in self._get_index():
+                return
+
+        filename = key + os.path.splitext(file_path)[1]
+        cached_path = self._get_path(filename)
+        temp_path = f"{cached_path}.{uuid.uuid4()}"
+        link_or_copy(file_path, temp_path)
+        os.replace(temp_path, cached_path)
+        size = os.path.getsize(cached_path)
+
+        with self._lock:
+            index = self._get_index()
+            if key not in index:
+                self.total_bytes += size
+            index[key] = (filename, size)
+            index.move_to_end(key)
+            evicted = self._evict()
+
+        for each_filename in evicted:
+            try:
+                os.remove(self._get_path(each_filename))
+            except OSError:
+                pass
+
+    def _evict(self) -> Tuple[str, ...]:
+        index = self._get_index()
+        evicted = []
+        while self.total_bytes > self.max_bytes and len(index) > 1:
+            _, (filename, size) = index.popitem(last=False)
+            self.total_bytes -= size
+            self.evicted_bytes += size
+            evicted.append(filename)
+        return tuple(evicted)
+
+
+PROCESSED_IMAGE_CACHE = ProcessedImageCache()
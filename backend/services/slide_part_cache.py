@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+import uuid
+
+from models.pptx_export_options import PptxExportOptionsModel
+from models.pptx_models import PptxSlideModel
+from models.slide_part_cache_entry import SlidePartCacheEntry
+from utils.asset_directory_utils import get_slide_cache_directory
+from utils.get_env import get_slide_cache_ttl_env
+
+# Bump when the slide xml the creator builds changes, old entries are then never hit
+SLIDE_PART_CACHE_VERSION = 1
+
+
+class SlidePartCache:
+    """
+    Built slide parts keyed by a hash of the slide model and the export
+    options, so a re-export only builds the slides that changed.
+    - An entry is the slide xml plus the media its relationships point to.
+    - Media files are named by content hash and shared between entries.
+    - Entries expire `ttl` seconds after they were built, remote pictures may
+    change behind the same url.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None):
+        self._directory = directory
+        self.ttl = ttl or float(get_slide_cache_ttl_env() or 3600)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> str:
+        if not self._directory:
+            self._directory = get_slide_cache_directory()
+        return self._directory
+
+    @staticmethod
+    def get_key(
+        slide_model: PptxSlideModel,
+        export_options: Optional[PptxExportOptionsModel] = None,
+    ) -> str:
+        """Computed before the export, the creator mutates the model"""
+        parameters = {
+            "version": SLIDE_PART_CACHE_VERSION,
+            "slide": slide_model.model_dump(mode="json"),
+            "export_options": (
+                export_options.model_dump(mode="json") if export_options else None
+            ),
+        }
+        return hashlib.sha256(
+            json.dumps(
+                parameters, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def get_path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def lookup(self, key: str) -> Optional[SlidePartCacheEntry]:
+        path = self.get_path(f"{key}.json")
+        try:
+            if time.time() - os.stat(path).st_mtime > self.ttl:
+                self.misses += 1
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                entry = SlidePartCacheEntry.model_validate_json(f.read())
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # Media may have been collected on its own
+        if not all(os.path.isfile(self.get_path(each)) for each in entry.media.values()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, xml: str, media: Dict[str, Tuple[str, bytes]]):
+        """
+        `media` maps relationship ids in the xml to (file name, blob), blobs
+        are only written for media not cached yet.
+        """
+        for filename, blob in media.values():
+            path = self.get_path(filename)
+            if os.path.isfile(path):
+                # Lives at least as long as the entries using it
+                os.utime(path)
+                continue
+            self._write(path, blob)
+
+        entry = SlidePartCacheEntry(
+            xml=xml, media={rId: filename for rId, (filename, _) in media.items()}
+        )
+        self._write(self.get_path(f"{key}.json"), entry.model_dump_json().encode("utf-8"))
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        temp_path = f"{path}.{uuid.uuid4()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+SLIDE_PART_CACHE = SlidePartCache()
@@ -0,0 +1,164 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import json
+import os
+import time
+from typing import List, Optional
+import uuid
+
+from enums.thumbnail_format import ThumbnailFormat
+from models.pptx_models import PptxPictureBoxModel, PptxSlideModel
+from services.asset_downloader import ASSET_DOWNLOADER
+from services.image_asset_store import IMAGE_ASSET_STORE
+from services.temp_file_service import TEMP_FILE_SERVICE
+from utils.asset_directory_utils import get_thumbnails_directory
+from utils.get_env import get_thumbnail_cache_ttl_env
+from utils.process_pool import get_process_pool, reset_process_pool
+from utils.slide_thumbnail_utils import SLIDE_WIDTH, render_slide_thumbnail
+
+# Bump when the renderer output changes, old thumbnails are then never hit
+THUMBNAIL_CACHE_VERSION = 1
+
+
+class SlideThumbnailService:
+    """
+    Slide thumbnails rendered in the process pool and cached by a hash of the
+    slide model, the width and the format.
+    - Network pictures of a batch of slides are downloaded once, stored
+    assets use their smallest variant covering the thumbnail.
+    - Thumbnails expire `ttl` seconds after they were rendered, remote
+    pictures may change behind the same url.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None):
+        self._directory = directory
+        self.ttl = ttl or float(get_thumbnail_cache_ttl_env() or 24 * 3600)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> str:
+        if not self._directory:
+            self._directory = get_thumbnails_directory()
+        return self._directory
+
+    @staticmethod
+    def get_key(
+        slide_model: PptxSlideModel, width: int, image_format: ThumbnailFormat
+    ) -> str:
+        """Computed before rendering, picture paths are rewritten for it"""
+        parameters = {
+            "version": THUMBNAIL_CACHE_VERSION,
+            "slide": slide_model.model_dump(mode="json"),
+            "width": width,
+            "format": image_format.value,
+        }
+        return hashlib.sha256(
+            json.dumps(
+                parameters, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+            ).encode("utf-8")
+        ).hexdigest()
+
+    def get_path(self, key: str, image_format: ThumbnailFormat) -> str:
+        return os.path.join(self.directory, f"{key}.{image_format.value}")
+
+    def lookup(self, key: str, image_format: ThumbnailFormat) -> Optional[str]:
+        path = self.get_path(key, image_format)
+        try:
+            if time.time() - os.stat(path).st_mtime > self.ttl:
+                return None
+        except OSError:
+            return None
+        return path
+
+    async def render_slides(
+        self,
+        slide_models: List[PptxSlideModel],
+        width: int,
+        image_format: ThumbnailFormat = ThumbnailFormat.PNG,
+    ) -> List[Optional[str]]:
+        """Thumbnail path of each slide, None for slides that could not be rendered"""
+        keys = [self.get_key(each, width, image_format) for each in slide_models]
+        paths: List[Optional[str]] = await asyncio.to_thread(
+            lambda: [self.lookup(key, image_format) for key in keys]
+        )
+        missing = [index for index, path in enumerate(paths) if not path]
+        self.hits += len(slide_models) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return paths
+
+        temp_dir = TEMP_FILE_SERVICE.create_temp_dir(f"thumbnails-{uuid.uuid4()}")
+        try:
+            missing_slides = [slide_models[index] for index in missing]
+            await self.resolve_pictures(missing_slides, width, temp_dir)
+
+            loop = asyncio.get_running_loop()
+            process_pool = get_process_pool()
+            results = await asyncio.gather(
+                *[
+                    loop.run_in_executor(
+                        process_pool,
+                        render_slide_thumbnail,
+                        slide_model,
+                        width,
+                        image_format.value,
+                        self.get_path(keys[index], image_format),
+                    )
+                    for index, slide_model in zip(missing, missing_slides)
+                ],
+                return_exceptions=True,
+            )
+        finally:
+            await TEMP_FILE_SERVICE.remove_temp_dir(temp_dir)
+
+        for index, result in zip(missing, results):
+            if isinstance(result, BrokenProcessPool):
+                reset_process_pool()
+            if isinstance(result, Exception):
+                print(f"Could not render slide thumbnail: {result}")
+                result = None
+            paths[index] = result
+        return paths
+
+    async def resolve_pictures(
+        self, slide_models: List[PptxSlideModel], width: int, temp_dir: str
+    ):
+        """Points the picture models at local files, downloading each url once"""
+        pixels_per_point = width / SLIDE_WIDTH
+        network_pictures: List[PptxPictureBoxModel] = []
+        for slide_model in slide_models:
+            for shape in slide_model.shapes:
+                if not isinstance(shape, PptxPictureBoxModel):
+                    continue
+                image_path = shape.picture.path
+                if image_path.startswith("http"):
+                    if "app_data/" not in image_path:
+                        network_pictures.append(shape)
+                        continue
+                    image_path = os.path.join(
+                        "/app_data", image_path.split("app_data/")[1]
+                    )
+                # Stored assets carry downsized variants, use the one that fits the box
+                shape.picture.path = (
+                    IMAGE_ASSET_STORE.get_variant_path_for_box(
+                        image_path,
+                        shape.position.width * pixels_per_point,
+                        shape.position.height * pixels_per_point,
+                    )
+                    or image_path
+                )
+
+        if network_pictures:
+            results = await ASSET_DOWNLOADER.download_all(
+                list(dict.fromkeys(each.picture.path for each in network_pictures)),
+                temp_dir,
+            )
+            image_paths = {result.url: result.path for result in results}
+            for shape in network_pictures:
+                # Pictures that could not be downloaded are drawn as placeholders
+                shape.picture.path = image_paths.get(shape.picture.path) or ""
+
+
+SLIDE_THUMBNAIL_SERVICE = SlideThumbnailService()
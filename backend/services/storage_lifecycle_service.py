@@ -0,0 +1,242 @@
+import asyncio
+import os
+import shutil
+import time
+from typing import Callable, List, Optional, Tuple
+
+from models.storage_stats import StorageAreaStats, StorageStats
+from services.export_result_cache import EXPORT_RESULT_CACHE
+from services.slide_part_cache import SLIDE_PART_CACHE
+from services.slide_thumbnail_service import SLIDE_THUMBNAIL_SERVICE
+from services.temp_file_service import TEMP_FILE_SERVICE
+from utils.asset_directory_utils import (
+    get_export_cache_directory,
+    get_exports_directory,
+    get_slide_cache_directory,
+    get_thumbnails_directory,
+)
+from utils.datetime_utils import get_current_utc_datetime
+from utils.get_env import (
+    get_export_cache_max_bytes_env,
+    get_exports_max_bytes_env,
+    get_exports_ttl_env,
+    get_slide_cache_max_bytes_env,
+    get_storage_gc_interval_env,
+    get_temp_file_ttl_env,
+    get_thumbnail_cache_max_bytes_env,
+)
+
+# Entries this recent are never evicted for the quota, they may be in use
+MIN_EVICTION_AGE = 60
+
+
+class StorageArea:
+    """
+    A directory whose entries expire after `ttl` seconds without changes.
+    - `depth` 2 means entries are grouped in namespaces, e.g. worker temp dirs.
+    - Past `max_bytes`, least recently used entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        get_directory: Callable[[], str],
+        ttl: float,
+        max_bytes: Optional[int] = None,
+        depth: int = 1,
+    ):
+        self.name = name
+        self.get_directory = get_directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.depth = depth
+        self.stats = StorageAreaStats(
+            name=name, directory="", ttl=ttl, max_bytes=max_bytes
+        )
+
+
+def get_entry_usage(path: str) -> Tuple[int, float, float]:
+    """Returns size, last modification and last use of a file or dir tree"""
+    stat = os.stat(path)
+    if not os.path.isdir(path):
+        return stat.st_size, stat.st_mtime, max(stat.st_mtime, stat.st_atime)
+
+    size = 0
+    modified_at = stat.st_mtime
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                each_stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            modified_at = max(modified_at, each_stat.st_mtime)
+            if name in files:
+                size += each_stat.st_size
+    return size, modified_at, modified_at
+
+
+def remove_entry(path: str) -> bool:
+    try:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        return True
+    except FileNotFoundError:
+        # Another worker collected it first
+        return False
+    except OSError as e:
+        print(f"Could not remove {path}: {e}")
+        return False
+
+
+class StorageLifecycleService:
+    """
+    Garbage collects temp files, exported decks and cached exports.
+    Every worker runs the collection in a background task, all file system
+    work happens in worker threads and concurrent removals are harmless.
+    """
+
+    def __init__(self, areas: Optional[List[StorageArea]] = None):
+        self.areas = areas if areas is not None else self._get_default_areas()
+        self.interval = float(get_storage_gc_interval_env() or 600)
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _get_default_areas() -> List[StorageArea]:
+        exports_max_bytes = get_exports_max_bytes_env()
+        export_cache_max_bytes = get_export_cache_max_bytes_env()
+        slide_cache_max_bytes = get_slide_cache_max_bytes_env()
+        thumbnail_cache_max_bytes = get_thumbnail_cache_max_bytes_env()
+        return [
+            StorageArea(
+                "temp",
+                lambda: TEMP_FILE_SERVICE.root_dir,
+                float(get_temp_file_ttl_env() or 6 * 3600),
+                depth=2,
+            ),
+            StorageArea(
+                "exports",
+                get_exports_directory,
+                float(get_exports_ttl_env() or 24 * 3600),
+                int(exports_max_bytes or 2 * 1024 * 1024 * 1024),
+            ),
+            StorageArea(
+                "export_cache",
+                get_export_cache_directory,
+                EXPORT_RESULT_CACHE.ttl,
+                int(export_cache_max_bytes or 2 * 1024 * 1024 * 1024),
+            ),
+            StorageArea(
+                "slide_cache",
+                get_slide_cache_directory,
+                SLIDE_PART_CACHE.ttl,
+                int(slide_cache_max_bytes or 1024 * 1024 * 1024),
+            ),
+            StorageArea(
+                "thumbnails",
+                get_thumbnails_directory,
+                SLIDE_THUMBNAIL_SERVICE.ttl,
+                int(thumbnail_cache_max_bytes or 256 * 1024 * 1024),
+            ),
+        ]
+
+    def start(self) -> asyncio.Task:
+        """Starts the periodic collection, safe to call more than once"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.collect()
+            except Exception as e:
+                print(f"Storage collection failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def collect(self) -> StorageStats:
+        for area in self.areas:
+            await asyncio.to_thread(self._collect_area, area)
+        return self.get_stats()
+
+    def _list_entries(self, area: StorageArea) -> List[str]:
+        directory = area.get_directory()
+        if not os.path.isdir(directory):
+            return []
+
+        entries = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if area.depth == 2 and os.path.isdir(path):
+                children = os.listdir(path)
+                if children:
+                    entries.extend(os.path.join(path, child) for child in children)
+                    continue
+            entries.append(path)
+        return entries
+
+    def _collect_area(self, area: StorageArea):
+        start_time = time.perf_counter()
+        now = time.time()
+        area.stats.directory = area.get_directory()
+
+        entries = []
+        for path in self._list_entries(area):
+            try:
+                entries.append((path, *get_entry_usage(path)))
+            except OSError:
+                continue
+
+        bytes_used = 0
+        live_entries = []
+        for path, size, modified_at, used_at in entries:
+            # The namespace of this worker is never removed for being empty
+            if path == TEMP_FILE_SERVICE.base_dir:
+                continue
+            if now - modified_at > area.ttl:
+                self._remove(area, path, size)
+            else:
+                bytes_used += size
+                live_entries.append((used_at, path, size))
+
+        evicted = 0
+        if area.max_bytes and bytes_used > area.max_bytes:
+            live_entries.sort()
+            for used_at, path, size in live_entries:
+                if bytes_used <= area.max_bytes:
+                    break
+                if now - used_at < MIN_EVICTION_AGE:
+                    continue
+                if self._remove(area, path, size):
+                    bytes_used -= size
+                    evicted += 1
+
+        area.stats.bytes_used = bytes_used
+        area.stats.entries = len(live_entries) - evicted
+        area.stats.last_collected_at = get_current_utc_datetime()
+        area.stats.last_duration = time.perf_counter() - start_time
+
+    def _remove(self, area: StorageArea, path: str, size: int) -> bool:
+        if not remove_entry(path):
+            return False
+        area.stats.reclaimed_bytes += size
+        area.stats.removed_entries += 1
+        return True
+
+    def get_stats(self) -> StorageStats:
+        areas = [area.stats.model_copy() for area in self.areas]
+        return StorageStats(
+            areas=areas,
+            bytes_used=sum(each.bytes_used for each in areas),
+            reclaimed_bytes=sum(each.reclaimed_bytes for each in areas),
+        )
+
+
+STORAGE_LIFECYCLE_SERVICE = StorageLifecycleService()
@@ -1,4 +1,6 @@
+import asyncio
 import os
+import shutil
 from typing import Optional, Union
 
 from utils.get_env import get_temp_directory_env
@@ -6,10 +8,16 @@ import uuid
 
 
 class TempFileService:
+    """
+    Temp files live in a namespace per worker process, so workers never touch
+    each other's files. Stale namespaces and dirs are removed by the storage
+    lifecycle service once they outlive their ttl.
+    """
 
     def __init__(self):
-        self.base_dir = get_temp_directory_env() or "/tmp/td-ppt"
-        self.cleanup_base_dir()
+        self.root_dir = get_temp_directory_env() or "/tmp/td-ppt"
+        self.namespace = f"worker-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.base_dir = os.path.join(self.root_dir, self.namespace)
         os.makedirs(self.base_dir, exist_ok=True)
 
     def create_dir_in_dir(self, base_dir: str, dir_name: Optional[str] = None) -> str:
@@ -66,5 +74,9 @@ class TempFileService:
     def cleanup_base_dir(self):
         self.cleanup_temp_dir(self.base_dir)
 
+    async def remove_temp_dir(self, dir_path: str):
+        """Removes a temp dir in a worker thread, keeping the event loop free"""
+        await asyncio.to_thread(shutil.rmtree, dir_path, True)
+
 
 TEMP_FILE_SERVICE = TempFileService()
@@ -17,3 +17,42 @@ def get_uploads_directory():
     uploads_directory = os.path.join(get_app_data_directory_env(), "uploads")
     os.makedirs(uploads_directory, exist_ok=True)
     return uploads_directory
+
+def get_assets_directory():
+    assets_directory = os.path.join(get_app_data_directory_env(), "assets")
+    os.makedirs(assets_directory, exist_ok=True)
+    return assets_directory
+
+def get_processed_images_directory():
+    processed_images_directory = os.path.join(
+        get_app_data_directory_env(), "processed_images"
+    )
+    os.makedirs(processed_images_directory, exist_ok=True)
+    return processed_images_directory
+
+def get_export_cache_directory():
+    export_cache_directory = os.path.join(get_app_data_directory_env(), "export_cache")
+    os.makedirs(export_cache_directory, exist_ok=True)
+    return export_cache_directory
+
+def get_slide_cache_directory():
+    slide_cache_directory = os.path.join(get_app_data_directory_env(), "slide_cache")
+    os.makedirs(slide_cache_directory, exist_ok=True)
+    return slide_cache_directory
+
+def get_pptx_models_directory():
+    pptx_models_directory = os.path.join(get_app_data_directory_env(), "pptx_models")
+    os.makedirs(pptx_models_directory, exist_ok=True)
+    return pptx_models_directory
+
+def get_thumbnails_directory():
+    thumbnails_directory = os.path.join(get_app_data_directory_env(), "thumbnails")
+    os.makedirs(thumbnails_directory, exist_ok=True)
+    return thumbnails_directory
+
+def get_office_profiles_directory():
+    office_profiles_directory = os.path.join(
+        get_app_data_directory_env(), "office_profiles"
+    )
+    os.makedirs(office_profiles_directory, exist_ok=True)
+    return office_profiles_directory
@@ -3,3 +3,10 @@ from datetime import datetime, timezone
 
 def get_current_utc_datetime():
     return datetime.now(timezone.utc)
+
+
+def as_utc_datetime(value: datetime) -> datetime:
+    """Datetimes read back without tzinfo, e.g. from SQLite, are UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
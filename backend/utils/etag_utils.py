@@ -0,0 +1,39 @@
+import asyncio
+import hashlib
+import os
+from typing import Optional
+
+from utils.lru_cache import LRUCache
+
+# (device, inode, size, mtime) -> etag, a rewritten file gets a new entry
+_ETAG_CACHE: LRUCache[str] = LRUCache(1024)
+
+
+def hash_file(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+async def get_file_etag(file_path: str) -> str:
+    """Strong ETag from the content hash, files are hashed once per version"""
+    stat = await asyncio.to_thread(os.stat, file_path)
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    etag = _ETAG_CACHE.get(key)
+    if etag is None:
+        etag = f'"{await asyncio.to_thread(hash_file, file_path)}"'
+        _ETAG_CACHE.set(key, etag)
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison, W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        each.strip().removeprefix("W/") == etag for each in if_none_match.split(",")
+    )
@@ -95,3 +95,135 @@ def get_extended_reasoning_env():
 
 def get_web_grounding_env():
     return os.getenv("WEB_GROUNDING")
+
+
+def get_icon_search_backend_env():
+    return os.getenv("ICON_SEARCH_BACKEND")
+
+
+def get_icon_cache_size_env():
+    return os.getenv("ICON_CACHE_SIZE")
+
+
+def get_icon_embeddings_directory_env():
+    return os.getenv("ICON_EMBEDDINGS_DIRECTORY")
+
+
+def get_export_process_workers_env():
+    return os.getenv("EXPORT_PROCESS_WORKERS")
+
+
+def get_processed_image_cache_max_bytes_env():
+    return os.getenv("PROCESSED_IMAGE_CACHE_MAX_BYTES")
+
+
+def get_export_job_concurrency_env():
+    return os.getenv("EXPORT_JOB_CONCURRENCY")
+
+
+def get_export_job_queue_size_env():
+    return os.getenv("EXPORT_JOB_QUEUE_SIZE")
+
+
+def get_export_spool_max_bytes_env():
+    return os.getenv("EXPORT_SPOOL_MAX_BYTES")
+
+
+def get_download_max_per_host_env():
+    return os.getenv("DOWNLOAD_MAX_PER_HOST")
+
+
+def get_download_max_bytes_env():
+    return os.getenv("DOWNLOAD_MAX_BYTES")
+
+
+def get_download_timeout_env():
+    return os.getenv("DOWNLOAD_TIMEOUT")
+
+
+def get_download_retries_env():
+    return os.getenv("DOWNLOAD_RETRIES")
+
+
+def get_export_result_cache_ttl_env():
+    return os.getenv("EXPORT_RESULT_CACHE_TTL")
+
+
+def get_temp_file_ttl_env():
+    return os.getenv("TEMP_FILE_TTL")
+
+
+def get_exports_ttl_env():
+    return os.getenv("EXPORTS_TTL")
+
+
+def get_exports_max_bytes_env():
+    return os.getenv("EXPORTS_MAX_BYTES")
+
+
+def get_export_cache_max_bytes_env():
+    return os.getenv("EXPORT_CACHE_MAX_BYTES")
+
+
+def get_storage_gc_interval_env():
+    return os.getenv("STORAGE_GC_INTERVAL")
+
+
+def get_slide_cache_ttl_env():
+    return os.getenv("SLIDE_CACHE_TTL")
+
+
+def get_slide_cache_max_bytes_env():
+    return os.getenv("SLIDE_CACHE_MAX_BYTES")
+
+
+def get_export_streaming_min_slides_env():
+    return os.getenv("EXPORT_STREAMING_MIN_SLIDES")
+
+
+def get_pptx_compress_level_env():
+    return os.getenv("PPTX_COMPRESS_LEVEL")
+
+
+def get_pptx_compress_workers_env():
+    return os.getenv("PPTX_COMPRESS_WORKERS")
+
+
+def get_batch_export_concurrency_env():
+    return os.getenv("BATCH_EXPORT_CONCURRENCY")
+
+
+def get_batch_export_max_decks_env():
+    return os.getenv("BATCH_EXPORT_MAX_DECKS")
+
+
+def get_thumbnail_cache_ttl_env():
+    return os.getenv("THUMBNAIL_CACHE_TTL")
+
+
+def get_thumbnail_cache_max_bytes_env():
+    return os.getenv("THUMBNAIL_CACHE_MAX_BYTES")
+
+
+def get_soffice_path_env():
+    return os.getenv("SOFFICE_PATH")
+
+
+def get_uno_python_path_env():
+    return os.getenv("UNO_PYTHON_PATH")
+
+
+def get_document_conversion_workers_env():
+    return os.getenv("DOCUMENT_CONVERSION_WORKERS")
+
+
+def get_document_conversion_queue_size_env():
+    return os.getenv("DOCUMENT_CONVERSION_QUEUE_SIZE")
+
+
+def get_document_conversion_timeout_env():
+    return os.getenv("DOCUMENT_CONVERSION_TIMEOUT")
+
+
+def get_presentation_cache_size_env():
+    return os.getenv("PRESENTATION_CACHE_SIZE")
@@ -1,8 +1,15 @@
-from typing import List
+import math
+from typing import List, Optional, Tuple
 
-from PIL import Image, ImageDraw
+import numpy as np
+from PIL import Image
 
-from models.pptx_models import PptxObjectFitEnum, PptxObjectFitModel
+from models.pptx_models import (
+    PptxBoxShapeEnum,
+    PptxObjectFitEnum,
+    PptxObjectFitModel,
+    PptxPictureBoxModel,
+)
 
 
 def clip_image(
@@ -46,130 +53,104 @@ def clip_image(
     return clipped_image
 
 
-def round_image_corners(image: Image.Image, radii: List[int]) -> Image.Image:
+def _clear_outside_rounded_rect(
+    alpha: np.ndarray,
+    rect: Tuple[float, float, float, float],
+    radii_x: List[float],
+    radii_y: List[float],
+):
+    """
+    Clears alpha outside of a rounded rectangle, corners are (elliptical) arcs.
+    - rect is (left, top, right, bottom) in pixels and may exceed the image.
+    - radii are ordered top-left, top-right, bottom-right, bottom-left.
+    Only the corner blocks are evaluated, so the cost is independent of image size.
+    """
+    h, w = alpha.shape
+    left, top, right, bottom = rect
+
+    # Everything outside the rectangle itself
+    alpha[:, : max(0, min(w, math.ceil(left)))] = 0
+    alpha[:, max(0, min(w, math.floor(right))) :] = 0
+    alpha[: max(0, min(h, math.ceil(top))), :] = 0
+    alpha[max(0, min(h, math.floor(bottom))) :, :] = 0
+
+    corners = [
+        (left, top, left + radii_x[0], top + radii_y[0]),
+        (right - radii_x[1], top, right, top + radii_y[1]),
+        (right - radii_x[2], bottom - radii_y[2], right, bottom),
+        (left, bottom - radii_y[3], left + radii_x[3], bottom),
+    ]
+    centers = [
+        (left + radii_x[0], top + radii_y[0]),
+        (right - radii_x[1], top + radii_y[1]),
+        (right - radii_x[2], bottom - radii_y[2]),
+        (left + radii_x[3], bottom - radii_y[3]),
+    ]
+    for (x0, y0, x1, y1), (cx, cy), rx, ry in zip(corners, centers, radii_x, radii_y):
+        if rx <= 0 or ry <= 0:
+            continue
+        bx0, bx1 = max(0, math.floor(x0)), min(w, math.ceil(x1))
+        by0, by1 = max(0, math.floor(y0)), min(h, math.ceil(y1))
+        if bx0 >= bx1 or by0 >= by1:
+            continue
+        xs = (np.arange(bx0, bx1, dtype=np.float32) + 0.5 - cx) / rx
+        ys = (np.arange(by0, by1, dtype=np.float32) + 0.5 - cy) / ry
+        outside = xs[np.newaxis, :] ** 2 + ys[:, np.newaxis] ** 2 > 1.0
+        alpha[by0:by1, bx0:bx1][outside] = 0
+
+
+def _clamp_radii(radii: List[int], width: int, height: int) -> List[int]:
     if len(radii) != 4:
         raise ValueError(
             "Image Border Radius - radii must contain exactly 4 values for each corner"
         )
+    # Clamp border radius to not exceed half the width or height
+    max_radius = min(width // 2, height // 2)
+    return [min(radius, max_radius) for radius in radii]
 
-    w, h = image.size
 
-    # Clamp border radius to not exceed half the width or height
-    max_radius = min(w // 2, h // 2)
-    clamped_radii = [min(radius, max_radius) for radius in radii]
+def _clear_outside_circle(alpha: np.ndarray):
+    h, w = alpha.shape
+    radius = min(w, h) // 2
+    xs = np.arange(w, dtype=np.float32) + 0.5 - w // 2
+    ys = np.arange(h, dtype=np.float32) + 0.5 - h // 2
+    outside = xs[np.newaxis, :] ** 2 + ys[:, np.newaxis] ** 2 > radius**2
+    alpha[outside] = 0
+
+
+def round_image_corners(image: Image.Image, radii: List[int]) -> Image.Image:
+    w, h = image.size
+    clamped_radii = _clamp_radii(radii, w, h)
 
     # Ensure the image has an alpha channel (RGBA)
     if image.mode != "RGBA":
         image = image.convert("RGBA")
 
-    # Create a mask for the rounded corners (start with fully transparent)
-    rounded_mask = Image.new("L", image.size, 0)
-
-    # Create a rectangular mask (fully opaque)
-    rectangular_mask = Image.new("L", image.size, 255)
-
-    # Process each corner
-    for i, radius in enumerate(clamped_radii):
-        if radius > 0:  # Only process if radius is positive
-            # Create a circle for this radius
-            circle = Image.new("L", (radius * 2, radius * 2), 0)
-            draw = ImageDraw.Draw(circle)
-            draw.ellipse((0, 0, radius * 2 - 1, radius * 2 - 1), fill=255)
-
-            # Calculate position based on corner index
-            if i == 0:  # top-left
-                rounded_mask.paste(circle.crop((0, 0, radius, radius)), (0, 0))
-                rectangular_mask.paste(0, (0, 0, radius, radius))
-            elif i == 1:  # top-right
-                rounded_mask.paste(
-                    circle.crop((radius, 0, radius * 2, radius)), (w - radius, 0)
-                )
-                rectangular_mask.paste(0, (w - radius, 0, w, radius))
-            elif i == 2:  # bottom-right
-                rounded_mask.paste(
-                    circle.crop((radius, radius, radius * 2, radius * 2)),
-                    (w - radius, h - radius),
-                )
-                rectangular_mask.paste(0, (w - radius, h - radius, w, h))
-            else:  # bottom-left
-                rounded_mask.paste(
-                    circle.crop((0, radius, radius, radius * 2)), (0, h - radius)
-                )
-                rectangular_mask.paste(0, (0, h - radius, radius, h))
-
-    # Get the original alpha channel
-    original_alpha = image.getchannel("A")
-
-    # Combine the rectangular mask with the rounded corners
-    corner_mask = Image.composite(rounded_mask, rectangular_mask, rounded_mask)
-
-    # Combine the corner mask with the original alpha channel
-    final_alpha = Image.composite(
-        original_alpha, Image.new("L", image.size, 0), corner_mask
-    )
-
-    # Create a new image with the modified alpha channel
-    result = Image.new("RGBA", image.size)
-    result.paste(image.convert("RGB"), (0, 0))
-    result.putalpha(final_alpha)
-
-    return result
+    pixels = np.array(image)
+    _clear_outside_rounded_rect(pixels[:, :, 3], (0, 0, w, h), clamped_radii, clamped_radii)
+    return Image.fromarray(pixels, "RGBA")
 
 
 def invert_image(img: Image.Image) -> Image.Image:
-    # Get image data
-    data = img.getdata()
-
-    # Process each pixel
-    new_data = []
-    for item in data:
-        # Get current pixel values
-        r, g, b, a = item
-
-        # Invert RGB values while preserving transparency
-        if a != 0:  # Skip fully transparent pixels
-            new_data.append((255 - r, 255 - g, 255 - b, a))
-        else:
-            new_data.append((0, 0, 0, 0))
+    pixels = np.array(img.convert("RGBA"))
+    _invert_pixels(pixels)
+    return Image.fromarray(pixels, "RGBA")
 
-    # Create new image with modified data
-    new_img = Image.new("RGBA", img.size)
-    new_img.putdata(new_data)
-    return new_img
+
+def _invert_pixels(pixels: np.ndarray):
+    # Invert RGB values while preserving transparency
+    np.subtract(255, pixels[:, :, :3], out=pixels[:, :, :3])
+    # Fully transparent pixels are cleared
+    pixels[pixels[:, :, 3] == 0] = 0
 
 
 def create_circle_image(
     image: Image.Image,
 ) -> Image.Image:
-    # Convert to RGBA if not already
-    img = image.convert("RGBA")
-    # Get the original image size
-    size = img.size
-    # Use the smaller dimension for the circle
-    circle_size = min(size)
-    # Create a transparent image of the same size as original
-    mask = Image.new("RGBA", size, color=(0, 0, 0, 0))
-    draw = ImageDraw.Draw(mask)
-
-    # Calculate center position
-    center_x = size[0] // 2
-    center_y = size[1] // 2
-    radius = circle_size // 2
-
-    # Create a circular mask
-    draw.ellipse(
-        (
-            center_x - radius,
-            center_y - radius,
-            center_x + radius,
-            center_y + radius,
-        ),
-        fill=(255, 255, 255, 255),
-    )
-
-    # Apply the circular mask
-    result = Image.composite(img, mask, mask)
-    return result
+    pixels = np.array(image.convert("RGBA"))
+    _clear_outside_circle(pixels[:, :, 3])
+    pixels[pixels[:, :, 3] == 0] = 0
+    return Image.fromarray(pixels, "RGBA")
 
 
 def set_image_opacity(image: Image.Image, opacity: float) -> Image.Image:
@@ -180,18 +161,178 @@ def set_image_opacity(image: Image.Image, opacity: float) -> Image.Image:
     if image.mode != "RGBA":
         image = image.convert("RGBA")
 
-    # Get the original alpha channel
-    original_alpha = image.getchannel("A")
+    # Point tables run in C, no per pixel python calls
+    table = [int(x * opacity) for x in range(256)]
+    r, g, b, a = image.split()
+    return Image.merge("RGBA", (r, g, b, a.point(table)))
+
+
+def _get_fit_geometry(
+    img_width: int,
+    img_height: int,
+    width: int,
+    height: int,
+    fit: Optional[PptxObjectFitEnum],
+    focus_x: float,
+    focus_y: float,
+):
+    """
+    Returns (resized width, resized height, left, top) of the whole image
+    placed in a width x height box, left and top may be negative when cropped.
+    """
+    img_aspect = img_width / img_height
+    box_aspect = width / height
+    focus_x = max(0.0, min(100.0, focus_x))
+    focus_y = max(0.0, min(100.0, focus_y))
+
+    if fit == PptxObjectFitEnum.FILL:
+        return width, height, 0, 0
+
+    if fit == PptxObjectFitEnum.CONTAIN:
+        if img_aspect > box_aspect:
+            new_width, new_height = width, int(width / img_aspect)
+        else:
+            new_width, new_height = int(height * img_aspect), height
+        return (
+            new_width,
+            new_height,
+            int((width - new_width) * (focus_x / 100.0)),
+            int((height - new_height) * (focus_y / 100.0)),
+        )
+
+    # Cover
+    if img_aspect > box_aspect:
+        new_width, new_height = int(height * img_aspect), height
+    else:
+        new_width, new_height = width, int(width / img_aspect)
+    return (
+        new_width,
+        new_height,
+        -int((new_width - width) * (focus_x / 100.0)),
+        -int((new_height - height) * (focus_y / 100.0)),
+    )
+
+
+def apply_image_effects(
+    image: Image.Image,
+    width: int,
+    height: int,
+    clip: bool = False,
+    object_fit: Optional[PptxObjectFitModel] = None,
+    border_radius: Optional[List[int]] = None,
+    circle: bool = False,
+    invert: bool = False,
+    opacity: Optional[float] = None,
+    dpi: Optional[int] = None,
+) -> Image.Image:
+    """
+    Fused picture effects, equivalent to applying round_image_corners,
+    fit_image or clip_image, round_image_corners, create_circle_image,
+    invert_image and set_image_opacity one after another.
+    - Resize and crop are a single resample of the visible source region.
+    - All masks and the opacity are combined into the alpha channel in one pass.
+    - width and height are in points, rendered one pixel per point unless a
+    dpi is given. With a dpi, images are never upscaled past their source
+    resolution and images without a fit are downsampled to the box.
+    """
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGBA")
+    img_width, img_height = image.size
+
+    fit = None
+    focus_x, focus_y = 50.0, 50.0
+    if object_fit:
+        fit = object_fit.fit
+        if object_fit.focus and len(object_fit.focus) == 2:
+            focus_x, focus_y = object_fit.focus[0], object_fit.focus[1]
+    elif clip:
+        fit = PptxObjectFitEnum.COVER
+
+    # Pixels per point
+    box_scale = 1.0
+    if dpi and width > 0 and height > 0:
+        box_scale = dpi / 72.0
+        if fit:
+            new_width, _, _, _ = _get_fit_geometry(
+                img_width, img_height, width, height, fit, focus_x, focus_y
+            )
+            upscale = new_width * box_scale / img_width
+            if upscale > 1.0:
+                box_scale = max(1.0, box_scale / upscale)
+        width = max(1, round(width * box_scale))
+        height = max(1, round(height * box_scale))
+
+    if fit and width > 0 and height > 0:
+        new_width, new_height, left, top = _get_fit_geometry(
+            img_width, img_height, width, height, fit, focus_x, focus_y
+        )
+        scale_x, scale_y = new_width / img_width, new_height / img_height
+        if fit == PptxObjectFitEnum.CONTAIN:
+            resized = image.resize((new_width, new_height), Image.LANCZOS)
+            result = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+            result.paste(resized.convert("RGBA"), (left, top))
+        else:
+            # Only the visible part of the source is resampled
+            source_box = (
+                -left / scale_x,
+                -top / scale_y,
+                min(img_width, (width - left) / scale_x),
+                min(img_height, (height - top) / scale_y),
+            )
+            result = image.resize((width, height), Image.LANCZOS, box=source_box)
+        content_rect = (left, top, left + new_width, top + new_height)
+    elif dpi and width > 0 and height > 0 and (img_width > width or img_height > height):
+        # The picture is stretched to its box anyway, only keep the pixels shown
+        new_width, new_height = min(img_width, width), min(img_height, height)
+        result = image.resize((new_width, new_height), Image.LANCZOS)
+        scale_x, scale_y = new_width / img_width, new_height / img_height
+        content_rect = (0, 0, new_width, new_height)
+    else:
+        result = image
+        scale_x = scale_y = 1.0
+        content_rect = (0, 0, img_width, img_height)
+
+    out_width, out_height = result.size
+    needs_mask = bool(border_radius) or circle
+    if not (needs_mask or invert or opacity):
+        return result if dpi else result.convert("RGBA")
+
+    pixels = np.array(result.convert("RGBA"))
+    alpha = pixels[:, :, 3]
+
+    if border_radius:
+        # Corners of the source image, as they land in the box
+        source_radii = _clamp_radii(border_radius, img_width, img_height)
+        _clear_outside_rounded_rect(
+            alpha,
+            content_rect,
+            [radius * scale_x for radius in source_radii],
+            [radius * scale_y for radius in source_radii],
+        )
+        # Corners of the box itself
+        box_radii = _clamp_radii(
+            [round(radius * box_scale) for radius in border_radius],
+            out_width,
+            out_height,
+        )
+        _clear_outside_rounded_rect(
+            alpha, (0, 0, out_width, out_height), box_radii, box_radii
+        )
+
+    if circle:
+        _clear_outside_circle(alpha)
 
-    # Create new alpha channel with adjusted opacity
-    new_alpha = original_alpha.point(lambda x: int(x * opacity))
+    if needs_mask:
+        pixels[alpha == 0] = 0
 
-    # Create new image with modified alpha channel
-    result = Image.new("RGBA", image.size)
-    result.paste(image.convert("RGB"), (0, 0))
-    result.putalpha(new_alpha)
+    if invert:
+        _invert_pixels(pixels)
 
-    return result
+    if opacity:
+        opacity = max(0.0, min(1.0, opacity))
+        np.multiply(alpha, opacity, out=alpha, casting="unsafe")
+
+    return Image.fromarray(pixels, "RGBA")
 
 
 def fit_image(
@@ -256,3 +397,68 @@ def fit_image(
         return image.resize((width, height), Image.LANCZOS)
 
     return image
+
+
+def picture_needs_effects(picture_model: PptxPictureBoxModel) -> bool:
+    return bool(
+        picture_model.clip
+        or picture_model.border_radius
+        or picture_model.invert
+        or picture_model.opacity
+        or picture_model.object_fit
+        or picture_model.shape
+    )
+
+
+def prepare_picture_file(
+    image_path: str,
+    output_stem: str,
+    picture_model: PptxPictureBoxModel,
+    dpi: Optional[int] = None,
+    jpeg_quality: Optional[int] = None,
+) -> Optional[str]:
+    """
+    Applies the picture effects and saves the result next to output_stem.
+    - Saved as PNG, or as JPEG when a jpeg_quality is given and the result
+    has no transparency.
+    - Returns image_path itself when nothing had to change.
+    Runs in a worker process, so it only takes picklable arguments.
+    """
+    try:
+        image = Image.open(image_path)
+    except Exception:
+        print(f"Could not open image: {image_path}")
+        return None
+
+    if dpi and not picture_needs_effects(picture_model):
+        width = picture_model.position.width * dpi / 72.0
+        height = picture_model.position.height * dpi / 72.0
+        if image.width <= width and image.height <= height:
+            return image_path
+
+    image = apply_image_effects(
+        image,
+        picture_model.position.width,
+        picture_model.position.height,
+        clip=picture_model.clip,
+        object_fit=picture_model.object_fit,
+        border_radius=picture_model.border_radius,
+        circle=picture_model.shape == PptxBoxShapeEnum.CIRCLE,
+        invert=picture_model.invert,
+        opacity=picture_model.opacity,
+        dpi=dpi,
+    )
+
+    if jpeg_quality and not image_has_transparency(image):
+        output_path = f"{output_stem}.jpg"
+        image.convert("RGB").save(output_path, quality=jpeg_quality, optimize=True)
+    else:
+        output_path = f"{output_stem}.png"
+        image.save(output_path)
+    return output_path
+
+
+def image_has_transparency(image: Image.Image) -> bool:
+    if image.mode in ("RGBA", "LA"):
+        return image.getchannel("A").getextrema()[0] < 255
+    return image.mode == "P" and "transparency" in image.info
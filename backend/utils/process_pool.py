@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from utils.get_env import get_export_process_workers_env
+
+# Imported once by the fork server, workers start with them loaded
+PRELOADED_MODULES = ["utils.image_utils", "utils.slide_thumbnail_utils"]
+
+_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def get_mp_context():
+    """
+    Workers are never forked from the app, its threads (icon warm-up, to_thread
+    workers, aiohttp) may hold locks the children would inherit held.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(PRELOADED_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared pool for CPU bound export work, started by the app lifespan"""
+    global _PROCESS_POOL
+    if _PROCESS_POOL is None:
+        max_workers = int(get_export_process_workers_env() or 0) or os.cpu_count()
+        _PROCESS_POOL = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=get_mp_context()
+        )
+    return _PROCESS_POOL
+
+
+def reset_process_pool():
+    """Drops a broken pool, the next call to get_process_pool starts a new one"""
+    global _PROCESS_POOL
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown(wait=False, cancel_futures=True)
+        _PROCESS_POOL = None
+
+
+def shutdown_process_pool():
+    """Stops the workers, waiting for the work already running"""
+    global _PROCESS_POOL
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown(wait=True, cancel_futures=True)
+        _PROCESS_POOL = None
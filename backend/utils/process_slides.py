@@ -1,6 +1,8 @@
 import asyncio
 from typing import List, Tuple
+from constants.images import PLACEHOLDER_ICON_URL, PLACEHOLDER_IMAGE_URL
 from models.image_prompt import ImagePrompt
+from models.json_path_guide import JsonPathGuide
 from models.sql.image_asset import ImageAsset
 from models.sql.slide import SlideModel
 from services.icon_finder_service import ICON_FINDER_SERVICE
@@ -13,35 +15,51 @@ async def process_slide_and_fetch_assets(
     image_generation_service: ImageGenerationService,
     slide: SlideModel,
 ) -> List[ImageAsset]:
+    return await process_slides_and_fetch_assets(image_generation_service, [slide])
 
-    async_tasks = []
 
-    image_paths = get_dict_paths_with_key(slide.content, "__image_prompt__")
-    icon_paths = get_dict_paths_with_key(slide.content, "__icon_query__")
-
-    for image_path in image_paths:
-        __image_prompt__parent = get_dict_at_path(slide.content, image_path)
-        async_tasks.append(
-            image_generation_service.generate_image(
-                ImagePrompt(
-                    prompt=__image_prompt__parent["__image_prompt__"],
+async def process_slides_and_fetch_assets(
+    image_generation_service: ImageGenerationService,
+    slides: List[SlideModel],
+) -> List[ImageAsset]:
+    """
+    Fetches images and icons for all slides.
+    Icon queries of every slide are searched in a single batch.
+    """
+
+    image_tasks = []
+    image_targets: List[Tuple[SlideModel, JsonPathGuide]] = []
+    icon_queries: List[str] = []
+    icon_targets: List[Tuple[SlideModel, JsonPathGuide]] = []
+
+    for slide in slides:
+        image_paths = get_dict_paths_with_key(slide.content, "__image_prompt__")
+        icon_paths = get_dict_paths_with_key(slide.content, "__icon_query__")
+
+        for image_path in image_paths:
+            __image_prompt__parent = get_dict_at_path(slide.content, image_path)
+            image_tasks.append(
+                image_generation_service.generate_image(
+                    ImagePrompt(
+                        prompt=__image_prompt__parent["__image_prompt__"],
+                    )
                 )
             )
-        )
+            image_targets.append((slide, image_path))
 
-    for icon_path in icon_paths:
-        __icon_query__parent = get_dict_at_path(slide.content, icon_path)
-        async_tasks.append(
-            ICON_FINDER_SERVICE.search_icons(__icon_query__parent["__icon_query__"])
-        )
+        for icon_path in icon_paths:
+            __icon_query__parent = get_dict_at_path(slide.content, icon_path)
+            icon_queries.append(__icon_query__parent["__icon_query__"])
+            icon_targets.append((slide, icon_path))
 
-    results = await asyncio.gather(*async_tasks)
-    results.reverse()
+    image_results, icon_results = await asyncio.gather(
+        asyncio.gather(*image_tasks),
+        ICON_FINDER_SERVICE.search_icons_batch(icon_queries),
+    )
 
     return_assets = []
-    for image_path in image_paths:
+    for (slide, image_path), result in zip(image_targets, image_results):
         image_dict = get_dict_at_path(slide.content, image_path)
-        result = results.pop()
         if isinstance(result, ImageAsset):
             return_assets.append(result)
             image_dict["__image_url__"] = result.path
@@ -49,9 +67,9 @@ async def process_slide_and_fetch_assets(
             image_dict["__image_url__"] = result
         set_dict_at_path(slide.content, image_path, image_dict)
 
-    for icon_path in icon_paths:
+    for (slide, icon_path), result in zip(icon_targets, icon_results):
         icon_dict = get_dict_at_path(slide.content, icon_path)
-        icon_dict["__icon_url__"] = results.pop()[0]
+        icon_dict["__icon_url__"] = result[0]
         set_dict_at_path(slide.content, icon_path, icon_dict)
 
     return return_assets
@@ -100,8 +118,8 @@ async def process_old_and_new_slides_and_fetch_assets(
     async_image_fetch_tasks = []
     new_images_fetch_status = []
 
-    # Creates async tasks for fetching new icons
-    async_icon_fetch_tasks = []
+    # Collects new icon queries to be searched in one batch
+    new_icon_queries = []
     new_icons_fetch_status = []
 
     # Creates async tasks for fetching new images
@@ -135,13 +153,11 @@ async def process_old_and_new_slides_and_fetch_assets(
             new_icons_fetch_status.append(False)
             continue
 
-        async_icon_fetch_tasks.append(
-            ICON_FINDER_SERVICE.search_icons(new_icon["__icon_query__"])
-        )
+        new_icon_queries.append(new_icon["__icon_query__"])
         new_icons_fetch_status.append(True)
 
     new_images = await asyncio.gather(*async_image_fetch_tasks)
-    new_icons = await asyncio.gather(*async_icon_fetch_tasks)
+    new_icons = await ICON_FINDER_SERVICE.search_icons_batch(new_icon_queries)
 
     # list of new assets
     new_assets = []
@@ -177,10 +193,10 @@ def process_slide_add_placeholder_assets(slide: SlideModel):
 
     for image_path in image_paths:
         image_dict = get_dict_at_path(slide.content, image_path)
-        image_dict["__image_url__"] = "/static/images/placeholder.jpg"
+        image_dict["__image_url__"] = PLACEHOLDER_IMAGE_URL
         set_dict_at_path(slide.content, image_path, image_dict)
 
     for icon_path in icon_paths:
         icon_dict = get_dict_at_path(slide.content, icon_path)
-        icon_dict["__icon_url__"] = "/static/icons/placeholder.svg"
+        icon_dict["__icon_url__"] = PLACEHOLDER_ICON_URL
         set_dict_at_path(slide.content, icon_path, icon_dict)
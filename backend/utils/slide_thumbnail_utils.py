@@ -0,0 +1,347 @@
+from functools import lru_cache
+import os
+import re
+from typing import List, Optional, Tuple
+import uuid
+
+from PIL import Image, ImageDraw, ImageFont
+from pptx.enum.shapes import MSO_AUTO_SHAPE_TYPE
+from pptx.enum.text import PP_ALIGN
+
+from models.pptx_models import (
+    PptxAutoShapeBoxModel,
+    PptxBoxShapeEnum,
+    PptxConnectorModel,
+    PptxFontModel,
+    PptxParagraphModel,
+    PptxPictureBoxModel,
+    PptxSlideModel,
+    PptxSpacingModel,
+    PptxTextBoxModel,
+    PptxTextRunModel,
+)
+from services.html_to_text_runs_service import parse_html_text_to_text_runs
+from utils.image_utils import apply_image_effects
+
+# Slides are laid out in points on a 1280x720 canvas
+SLIDE_WIDTH = 1280
+SLIDE_HEIGHT = 720
+
+DEFAULT_LINE_HEIGHT = 1.2
+
+TOKEN_PATTERN = re.compile(r"\n|[^\S\n]+|\S+")
+
+# (token, font, font model) laid out on one line
+LineToken = Tuple[str, ImageFont.FreeTypeFont, PptxFontModel]
+
+
+def get_color(color: str, opacity: Optional[float] = None) -> Tuple[int, int, int, int]:
+    color = color.lstrip("#")[:6].ljust(6, "0")
+    alpha = 1.0 if opacity is None else max(0.0, min(1.0, opacity))
+    return (
+        int(color[0:2], 16),
+        int(color[2:4], 16),
+        int(color[4:6], 16),
+        round(alpha * 255),
+    )
+
+
+@lru_cache(maxsize=256)
+def get_font(name: str, size: int, bold: bool, italic: bool) -> ImageFont.FreeTypeFont:
+    """Installed font of that name if any, the bundled default otherwise"""
+    style = ("Bold" if bold else "") + ("Italic" if italic else "")
+    candidates = [f"{name}-{style}.ttf"] if style else []
+    candidates.append(f"{name}.ttf")
+    candidates.append(f"{name.replace(' ', '')}.ttf")
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=32)
+def _load_picture(path: str, modified_at: int, width: int, height: int) -> Image.Image:
+    image = Image.open(path)
+    # JPEGs are decoded at a reduced scale close to the thumbnail size
+    image.draft("RGB", (width, height))
+    image.load()
+    return image
+
+
+def load_picture(path: str, width: int, height: int) -> Image.Image:
+    """Decoded picture, shared by the slides of a worker using the same file"""
+    return _load_picture(path, os.stat(path).st_mtime_ns, width, height)
+
+
+def get_text_runs(paragraph_model: PptxParagraphModel) -> List[PptxTextRunModel]:
+    if paragraph_model.text:
+        return parse_html_text_to_text_runs(paragraph_model.text, paragraph_model.font)
+    return paragraph_model.text_runs or []
+
+
+class SlideThumbnailRenderer:
+    """
+    Rasterises a slide model with PIL, an approximation of the exported slide
+    meant for previews.
+    - Boxes, connectors and pictures are drawn at their position.
+    - Text is wrapped with the font metrics of the installed fonts, falling
+    back to the bundled default font.
+    - Shadows and non rectangular autoshapes other than ovals are drawn as
+    plain boxes.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self.height = round(width * SLIDE_HEIGHT / SLIDE_WIDTH)
+        # Pixels per point
+        self.scale = width / SLIDE_WIDTH
+
+    def render(self, slide_model: PptxSlideModel) -> Image.Image:
+        background = slide_model.background
+        image = Image.new(
+            "RGB",
+            (self.width, self.height),
+            get_color(background.color)[:3] if background else (255, 255, 255),
+        )
+        # RGBA drawing blends translucent fills onto the slide
+        draw = ImageDraw.Draw(image, "RGBA")
+
+        for shape in slide_model.shapes:
+            if isinstance(shape, PptxPictureBoxModel):
+                self.draw_picture(image, shape)
+            elif isinstance(shape, PptxAutoShapeBoxModel):
+                self.draw_autoshape(draw, shape)
+            elif isinstance(shape, PptxTextBoxModel):
+                if shape.fill:
+                    draw.rectangle(
+                        self.get_box(shape.position),
+                        fill=get_color(shape.fill.color, shape.fill.opacity),
+                    )
+                self.draw_paragraphs(
+                    draw, shape.position, shape.margin, shape.paragraphs,
+                    shape.text_wrap, centered=False,
+                )
+            elif isinstance(shape, PptxConnectorModel):
+                self.draw_connector(draw, shape)
+        return image
+
+    def get_box(self, position) -> Tuple[int, int, int, int]:
+        left = round(position.left * self.scale)
+        top = round(position.top * self.scale)
+        return (
+            left,
+            top,
+            max(left, round((position.left + position.width) * self.scale) - 1),
+            max(top, round((position.top + position.height) * self.scale) - 1),
+        )
+
+    def draw_autoshape(self, draw: ImageDraw.ImageDraw, shape: PptxAutoShapeBoxModel):
+        box = self.get_box(shape.position)
+        fill = get_color(shape.fill.color, shape.fill.opacity) if shape.fill else None
+        outline = None
+        stroke_width = 0
+        if shape.stroke and shape.stroke.thickness > 0:
+            outline = get_color(shape.stroke.color, shape.stroke.opacity)
+            stroke_width = max(1, round(shape.stroke.thickness * self.scale))
+
+        if shape.type == MSO_AUTO_SHAPE_TYPE.OVAL:
+            draw.ellipse(box, fill=fill, outline=outline, width=stroke_width)
+        elif shape.border_radius or shape.type == MSO_AUTO_SHAPE_TYPE.ROUNDED_RECTANGLE:
+            radius = (
+                shape.border_radius
+                if shape.border_radius
+                # PowerPoint's default adjustment, a sixth of the shorter side
+                else min(shape.position.width, shape.position.height) / 6
+            )
+            draw.rounded_rectangle(
+                box, radius=round(radius * self.scale), fill=fill,
+                outline=outline, width=stroke_width,
+            )
+        else:
+            draw.rectangle(box, fill=fill, outline=outline, width=stroke_width)
+
+        if shape.paragraphs:
+            self.draw_paragraphs(
+                draw, shape.position, shape.margin, shape.paragraphs,
+                shape.text_wrap, centered=True,
+            )
+
+    def draw_connector(self, draw: ImageDraw.ImageDraw, shape: PptxConnectorModel):
+        left, top, right, bottom = self.get_box(shape.position)
+        draw.line(
+            (left, top, right, bottom),
+            fill=get_color(shape.color, shape.opacity),
+            width=max(1, round(shape.thickness * self.scale)),
+        )
+
+    def draw_picture(self, image: Image.Image, shape: PptxPictureBoxModel):
+        left, top, right, bottom = self.get_box(shape.position)
+        size = (right - left + 1, bottom - top + 1)
+        try:
+            picture = apply_image_effects(
+                load_picture(shape.picture.path, size[0] * 2, size[1] * 2),
+                shape.position.width,
+                shape.position.height,
+                clip=shape.clip,
+                object_fit=shape.object_fit,
+                border_radius=shape.border_radius,
+                circle=shape.shape == PptxBoxShapeEnum.CIRCLE,
+                invert=shape.invert,
+                opacity=shape.opacity,
+                dpi=72 * self.scale,
+            )
+        except Exception:
+            ImageDraw.Draw(image).rectangle((left, top, right, bottom), fill=(229, 231, 235))
+            return
+
+        if picture.size != size:
+            picture = picture.resize(size, Image.BILINEAR)
+        if picture.mode in ("RGBA", "LA"):
+            image.paste(picture, (left, top), picture)
+        else:
+            image.paste(picture, (left, top))
+
+    def draw_paragraphs(
+        self,
+        draw: ImageDraw.ImageDraw,
+        position,
+        margin: Optional[PptxSpacingModel],
+        paragraph_models: List[PptxParagraphModel],
+        text_wrap: bool,
+        centered: bool,
+    ):
+        margin = margin or PptxSpacingModel()
+        left = (position.left + margin.left) * self.scale
+        top = (position.top + margin.top) * self.scale
+        max_width = (position.width - margin.left - margin.right) * self.scale
+        max_height = (position.height - margin.top - margin.bottom) * self.scale
+
+        # (x offset, line top, line height, max font size, tokens, line width)
+        lines = []
+        y = 0.0
+        for paragraph_model in paragraph_models:
+            spacing = paragraph_model.spacing or PptxSpacingModel()
+            y += spacing.top * self.scale
+            line_height = paragraph_model.line_height or DEFAULT_LINE_HEIGHT
+            default_size = (paragraph_model.font or PptxFontModel()).size * self.scale
+            for tokens, line_width in self.wrap_text_runs(
+                get_text_runs(paragraph_model), max_width if text_wrap else None
+            ):
+                font_size = max(
+                    (font.size for _, font, _ in tokens), default=default_size
+                )
+                height = font_size * line_height
+                lines.append(
+                    (
+                        self.get_line_offset(
+                            paragraph_model.alignment, centered, max_width, line_width
+                        ),
+                        y,
+                        height,
+                        font_size,
+                        tokens,
+                        line_width,
+                    )
+                )
+                y += height
+            y += spacing.bottom * self.scale
+
+        # Autoshape text is anchored in the middle, textboxes at the top
+        if centered:
+            top += (max_height - y) / 2
+
+        for x_offset, line_top, height, font_size, tokens, _ in lines:
+            x = left + x_offset
+            baseline = top + line_top + (height - font_size) / 2 + font_size * 0.8
+            for token, font, font_model in tokens:
+                token_width = font.getlength(token)
+                if not token.isspace():
+                    color = get_color(font_model.color)
+                    draw.text((x, baseline), token, font=font, fill=color, anchor="ls")
+                    line_width = max(1, round(font.size / 14))
+                    if font_model.underline:
+                        y_line = baseline + font.size * 0.1
+                        draw.line((x, y_line, x + token_width, y_line), fill=color, width=line_width)
+                    if font_model.strike:
+                        y_line = baseline - font.size * 0.3
+                        draw.line((x, y_line, x + token_width, y_line), fill=color, width=line_width)
+                x += token_width
+
+    def wrap_text_runs(
+        self, text_runs: List[PptxTextRunModel], max_width: Optional[float]
+    ) -> List[Tuple[List[LineToken], float]]:
+        """Lines of (tokens, width), words wrap at `max_width` unless it is None"""
+        lines: List[Tuple[List[LineToken], float]] = [([], 0.0)]
+        for text_run in text_runs:
+            font_model = text_run.font or PptxFontModel()
+            font = get_font(
+                font_model.name,
+                max(1, round(font_model.size * self.scale)),
+                (font_model.font_weight or 400) >= 600,
+                font_model.italic,
+            )
+            for token in TOKEN_PATTERN.findall(text_run.text):
+                tokens, line_width = lines[-1]
+                if token == "\n":
+                    lines[-1] = (self._strip_trailing_space(tokens), line_width)
+                    lines.append(([], 0.0))
+                    continue
+                is_space = token.isspace()
+                if is_space and not tokens:
+                    continue
+                token_width = font.getlength(token)
+                if (
+                    max_width is not None
+                    and not is_space
+                    and tokens
+                    and line_width + token_width > max_width
+                ):
+                    lines[-1] = (self._strip_trailing_space(tokens), line_width)
+                    tokens, line_width = [], 0.0
+                    lines.append((tokens, line_width))
+                tokens.append((token, font, font_model))
+                lines[-1] = (tokens, line_width + token_width)
+
+        return [
+            (tokens, sum(font.getlength(token) for token, font, _ in tokens))
+            for tokens, _ in lines
+        ]
+
+    @staticmethod
+    def _strip_trailing_space(tokens: List[LineToken]) -> List[LineToken]:
+        while tokens and tokens[-1][0].isspace():
+            tokens.pop()
+        return tokens
+
+    @staticmethod
+    def get_line_offset(
+        alignment: Optional[PP_ALIGN], centered: bool, max_width: float, line_width: float
+    ) -> float:
+        if alignment == PP_ALIGN.RIGHT:
+            return max_width - line_width
+        if alignment == PP_ALIGN.CENTER or (alignment is None and centered):
+            return (max_width - line_width) / 2
+        return 0.0
+
+
+def render_slide_thumbnail(
+    slide_model: PptxSlideModel, width: int, image_format: str, output_path: str
+) -> str:
+    """
+    Renders the slide and saves it to output_path as PNG or WEBP.
+    Runs in a worker process, so it only takes picklable arguments.
+    """
+    image = SlideThumbnailRenderer(width).render(slide_model)
+    temp_path = f"{output_path}.{uuid.uuid4()}.tmp"
+    try:
+        if image_format == "webp":
+            image.save(temp_path, "WEBP", quality=80, method=4)
+        else:
+            image.save(temp_path, "PNG")
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return output_path